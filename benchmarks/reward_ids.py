@@ -0,0 +1,112 @@
+"""
+Compares importing rewards with random (version 4) and time ordered (version 7) ids.
+
+Codes are loaded in batches, as the import agents do, into a table shaped as `reward`'s primary key and unique
+constraint, first with version 4 then with version 7 ids. The load speed, WAL written, primary key index size and
+leaf density (from pgstattuple, when the extension is available) are reported for each.
+
+Runs against the configured database (SQLALCHEMY_DATABASE_URI), creating and dropping its own tables.
+
+Usage: `python -m benchmarks.reward_ids [--rows 2000000] [--batch-size 10000]`
+"""
+import argparse
+import csv
+import time
+import uuid
+
+from collections.abc import Callable
+from io import StringIO
+from typing import TYPE_CHECKING, NamedTuple
+
+from sqlalchemy import text
+
+from carina.core.ids import uuid7
+from carina.db.session import sync_engine
+
+if TYPE_CHECKING:  # pragma: no cover
+    from sqlalchemy.engine import Connection
+
+TABLE_NAME = "benchmark_reward_ids"
+
+
+class Result(NamedTuple):
+    rows_per_second: float
+    wal_bytes: int
+    index_bytes: int
+    leaf_density: float | None
+
+
+def _create_table(connection: "Connection") -> None:
+    connection.execute(text(f"DROP TABLE IF EXISTS {TABLE_NAME}"))
+    connection.execute(
+        text(
+            f"CREATE TABLE {TABLE_NAME} (id UUID PRIMARY KEY, code VARCHAR NOT NULL, retailer_id INTEGER NOT NULL, "
+            "reward_config_id INTEGER NOT NULL, UNIQUE (code, retailer_id, reward_config_id))"
+        )
+    )
+    connection.commit()
+
+
+def _leaf_density(connection: "Connection") -> float | None:
+    if not connection.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pgstattuple'")).first():
+        return None
+
+    return connection.execute(
+        text(f"SELECT avg_leaf_density FROM pgstatindex('{TABLE_NAME}_pkey')")  # noqa: S608
+    ).scalar_one()
+
+
+def load(new_id: Callable[[], uuid.UUID], rows: int, batch_size: int) -> Result:
+    with sync_engine.connect() as connection:
+        _create_table(connection)
+        wal_start = connection.execute(text("SELECT pg_current_wal_lsn()")).scalar_one()
+        connection.commit()
+
+        start = time.perf_counter()
+        for batch_start in range(0, rows, batch_size):
+            buffer = StringIO()
+            csv.writer(buffer).writerows(
+                (new_id(), f"CODE{i:012d}", 1, 1) for i in range(batch_start, min(batch_start + batch_size, rows))
+            )
+            buffer.seek(0)
+            with connection.connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY {TABLE_NAME} (id, code, retailer_id, reward_config_id) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+            connection.commit()
+        elapsed = time.perf_counter() - start
+
+        wal_bytes = connection.execute(
+            text("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), :wal_start)"), {"wal_start": wal_start}
+        ).scalar_one()
+        index_bytes = connection.execute(text(f"SELECT pg_relation_size('{TABLE_NAME}_pkey')")).scalar_one()
+        result = Result(rows / elapsed, int(wal_bytes), index_bytes, _leaf_density(connection))
+        connection.execute(text(f"DROP TABLE {TABLE_NAME}"))
+        connection.commit()
+
+    return result
+
+
+def _describe(name: str, result: Result) -> str:
+    leaf_density = f"{result.leaf_density:.1f}%" if result.leaf_density is not None else "n/a"
+    return (
+        f"{name}: {result.rows_per_second:>10,.0f} rows/s, WAL {result.wal_bytes / 2**20:>8,.1f} MiB, "
+        f"pkey {result.index_bytes / 2**20:>8,.1f} MiB, leaf density {leaf_density}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    before = load(uuid.uuid4, args.rows, args.batch_size)
+    after = load(uuid7, args.rows, args.batch_size)
+    print(f"{args.rows} rows in batches of {args.batch_size}")  # noqa: T201
+    print(_describe("uuid4", before))  # noqa: T201
+    print(_describe("uuid7", after))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
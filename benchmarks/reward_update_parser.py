@@ -0,0 +1,81 @@
+"""
+Compares the throughput of the reward update file parser with per row `RewardUpdateSchema` validation.
+
+Usage: `python -m benchmarks.reward_update_parser [--rows 500000] [--distinct-dates 30] [--repeat 3]`
+"""
+import argparse
+import csv
+import random
+import time
+
+from collections import defaultdict
+from collections.abc import Callable
+from datetime import date, timedelta
+from io import StringIO
+
+from pydantic import ValidationError
+
+from carina.enums import RewardUpdateStatuses
+from carina.imports.agents.update_parser import RewardUpdateRow, parse_reward_update_rows
+from carina.schemas import RewardUpdateSchema
+
+Rows = list[tuple[int, list[str]]]
+
+
+def make_rows(n_rows: int, distinct_dates: int) -> Rows:
+    dates = [(date(2023, 1, 1) + timedelta(days=i)).isoformat() for i in range(distinct_dates)]
+    statuses = [status.value for status in RewardUpdateStatuses]
+    content = "".join(
+        f"CODE{i:010d},{random.choice(dates)},{random.choice(statuses)}\n" for i in range(n_rows)  # noqa: S311
+    )
+    return list(enumerate(csv.reader(StringIO(content), delimiter=",", quotechar="|"), start=1))
+
+
+def parse_with_schema(rows: Rows) -> tuple[defaultdict, list[tuple[int, Exception]]]:
+    """The previous per row pydantic validation, for reference"""
+    reward_update_rows_by_code: defaultdict = defaultdict(list[RewardUpdateRow])
+    invalid_rows: list[tuple[int, Exception]] = []
+    for row_num, row in rows:
+        try:
+            data = RewardUpdateSchema(
+                code=row[0].strip(),
+                date=row[1].strip(),
+                status=RewardUpdateStatuses(row[2].strip().lower()),
+            )
+        except (ValidationError, IndexError, ValueError) as ex:
+            invalid_rows.append((row_num, ex))
+        else:
+            reward_update_rows_by_code[data.dict()["code"]].append(RewardUpdateRow(data, row_num=row_num))
+
+    return reward_update_rows_by_code, invalid_rows
+
+
+def rows_per_second(parse: Callable[[Rows], tuple], rows: Rows, repeat: int) -> float:
+    best = min(_time(parse, rows) for _ in range(repeat))
+    return len(rows) / best
+
+
+def _time(parse: Callable[[Rows], tuple], rows: Rows) -> float:
+    start = time.perf_counter()
+    parse(rows)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--distinct-dates", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.distinct_dates)
+
+    before = rows_per_second(parse_with_schema, rows, args.repeat)
+    after = rows_per_second(parse_reward_update_rows, rows, args.repeat)
+    print(f"{args.rows} rows, {args.distinct_dates} distinct dates, best of {args.repeat}")  # noqa: T201
+    print(f"RewardUpdateSchema per row: {before:>12,.0f} rows/s")  # noqa: T201
+    print(f"parse_reward_update_rows:   {after:>12,.0f} rows/s ({after / before:.1f}x)")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,8 @@ from carina.core.exception_handlers import (
     request_validation_handler,
     unexpected_exception_handler,
 )
+from carina.core.profiling import register_api_routes, setup_profiler
+from carina.core.tracing import setup_tracing
 from carina.version import __version__
 
 
@@ -35,4 +37,8 @@ def create_app() -> FastAPI:
     # Prevent 307 temporary redirects if URLs have slashes on the end
     app.router.redirect_slashes = False
 
+    register_api_routes(app)
+    setup_profiler("api")
+    setup_tracing(app)
+
     return app
@@ -1,6 +1,7 @@
 from cosmos_message_lib import get_connection_and_exchange, verify_payload_and_send_activity
 
 from carina.core.config import settings
+from carina.core.tracing import SpanKind, tracer
 
 connection, exchange = get_connection_and_exchange(
     rabbitmq_dsn=settings.RABBITMQ_DSN,
@@ -9,4 +10,9 @@ connection, exchange = get_connection_and_exchange(
 
 
 def sync_send_activity(payload: dict, *, routing_key: str) -> None:
-    verify_payload_and_send_activity(connection, exchange, payload, routing_key)
+    with tracer.start_as_current_span(
+        f"publish {routing_key}",
+        kind=SpanKind.PRODUCER,
+        attributes={"messaging.destination": settings.MESSAGE_EXCHANGE_NAME, "messaging.routing_key": routing_key},
+    ):
+        verify_payload_and_send_activity(connection, exchange, payload, routing_key)
@@ -0,0 +1,87 @@
+"""Add reward code_hash
+
+Revision ID: 4d9a7c1e3b58
+Revises: c3e8a5b2d7f4
+Create Date: 2026-10-19 16:02:11.427381
+
+"""
+import uuid
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4d9a7c1e3b58"
+down_revision = "c3e8a5b2d7f4"
+branch_labels = None
+depends_on = None
+
+# A stored generated column would rewrite the reward table under an ACCESS EXCLUSIVE lock, code_hash is maintained
+# by a trigger instead so that rewards can still be allocated and imported while the existing ones are backfilled.
+# Should the concurrent index build fail, the invalid index it leaves behind has to be dropped before running the
+# migration again.
+
+BACKFILL_BATCH_SIZE = 10_000
+
+
+def _backfill_code_hashes(conn: sa.engine.Connection) -> None:
+    """Sets the code_hash of the rewards inserted before the trigger, a batch per transaction"""
+    last_id = uuid.UUID(int=0)
+    while ids := (
+        conn.execute(
+            sa.text("SELECT id FROM reward WHERE id > :last_id ORDER BY id LIMIT :batch_size"),
+            {"last_id": last_id, "batch_size": BACKFILL_BATCH_SIZE},
+        )
+        .scalars()
+        .all()
+    ):
+        conn.execute(
+            sa.text(
+                "UPDATE reward SET code_hash = hashtextextended(code, retailer_id) "
+                "WHERE id = ANY(:ids) AND code_hash IS NULL"
+            ),
+            {"ids": ids},
+        )
+        last_id = ids[-1]
+
+
+def upgrade() -> None:
+    op.add_column("reward", sa.Column("code_hash", sa.BigInteger(), nullable=True))
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION reward_code_hash() RETURNS trigger AS $$
+        BEGIN
+            NEW.code_hash := hashtextextended(NEW.code, NEW.retailer_id);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER reward_code_hash BEFORE INSERT OR UPDATE OF code, retailer_id ON reward "
+        "FOR EACH ROW EXECUTE FUNCTION reward_code_hash()"
+    )
+
+    # the trigger is committed before the backfill so that no reward is left without a code_hash
+    with op.get_context().autocommit_block():
+        _backfill_code_hashes(op.get_bind())
+        op.create_index(
+            op.f("ix_reward_code_hash"), "reward", ["code_hash"], unique=False, postgresql_concurrently=True
+        )
+
+    # the validated check constraint lets SET NOT NULL skip its full table scan under an ACCESS EXCLUSIVE lock,
+    # VALIDATE CONSTRAINT scans the table without blocking writes
+    op.execute("ALTER TABLE reward ADD CONSTRAINT reward_code_hash_not_null CHECK (code_hash IS NOT NULL) NOT VALID")
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE reward VALIDATE CONSTRAINT reward_code_hash_not_null")
+    op.alter_column("reward", "code_hash", existing_type=sa.BigInteger(), nullable=False)
+    op.drop_constraint("reward_code_hash_not_null", "reward", type_="check")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f("ix_reward_code_hash"), table_name="reward", postgresql_concurrently=True)
+    op.execute("DROP TRIGGER reward_code_hash ON reward")
+    op.execute("DROP FUNCTION reward_code_hash()")
+    op.drop_column("reward", "code_hash")
@@ -0,0 +1,45 @@
+"""Add failed reward_file_log status
+
+Revision ID: 5c7e1b9d2f40
+Revises: 8b1f6e2a9d35
+Create Date: 2026-10-19 19:12:36.204817
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5c7e1b9d2f40"
+down_revision = "8b1f6e2a9d35"
+branch_labels = None
+depends_on = None
+
+
+old_options = ("IN_PROGRESS", "COMPLETED")
+enum_name = "rewardfilelogstatuses"
+
+old_type = sa.Enum(*old_options, name=enum_name)
+tmp_type = sa.Enum(*old_options, name="_rewardfilelogstatuses")
+
+
+def upgrade() -> None:
+    # a value added to an enum can't be used within the transaction adding it
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE rewardfilelogstatuses ADD VALUE IF NOT EXISTS 'FAILED'")
+
+
+def downgrade() -> None:
+    op.execute("UPDATE reward_file_log SET status = 'IN_PROGRESS' WHERE status = 'FAILED'")
+    tmp_type.create(op.get_bind(), checkfirst=False)
+    op.execute(
+        "ALTER TABLE reward_file_log ALTER COLUMN status TYPE _rewardfilelogstatuses "
+        "USING status::text::_rewardfilelogstatuses"
+    )
+    op.execute("DROP TYPE rewardfilelogstatuses")
+    old_type.create(op.get_bind(), checkfirst=False)
+    op.execute(
+        "ALTER TABLE reward_file_log ALTER COLUMN status TYPE rewardfilelogstatuses "
+        "USING status::text::rewardfilelogstatuses"
+    )
+    tmp_type.drop(op.get_bind(), checkfirst=False)
@@ -0,0 +1,61 @@
+"""Hot path indexes
+
+Revision ID: 8b1f6e2a9d35
+Revises: 4d9a7c1e3b58
+Create Date: 2026-10-19 17:40:52.913604
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8b1f6e2a9d35"
+down_revision = "4d9a7c1e3b58"
+branch_labels = None
+depends_on = None
+
+# Indexes are created and dropped concurrently, outside of the migration's transaction, so that rewards can still be
+# allocated and imported meanwhile. Should a concurrent build fail, the invalid index it leaves behind has to be
+# dropped before running the migration again.
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        # PreLoaded._get_allocable_reward, the predicate matches the query's so that the planner can use the index
+        op.create_index(
+            op.f("ix_reward_allocable"),
+            "reward",
+            ["reward_config_id"],
+            unique=False,
+            postgresql_where=sa.text("allocated IS false AND deleted IS false"),
+            postgresql_concurrently=True,
+        )
+        # reward_update rows are deleted along with their reward
+        op.create_index(
+            op.f("ix_reward_update_reward_uuid"),
+            "reward_update",
+            ["reward_uuid"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        # both are prefixes of a unique constraint's index, code_retailer_reward_config_unq and
+        # campaign_slug_retailer_unq, which serve their lookups
+        op.drop_index(op.f("ix_reward_code"), table_name="reward", postgresql_concurrently=True)
+        op.drop_index(
+            op.f("ix_reward_campaign_campaign_slug"), table_name="reward_campaign", postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f("ix_reward_campaign_campaign_slug"),
+            "reward_campaign",
+            ["campaign_slug"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(op.f("ix_reward_code"), "reward", ["code"], unique=False, postgresql_concurrently=True)
+        op.drop_index(op.f("ix_reward_update_reward_uuid"), table_name="reward_update", postgresql_concurrently=True)
+        op.drop_index(op.f("ix_reward_allocable"), table_name="reward", postgresql_concurrently=True)
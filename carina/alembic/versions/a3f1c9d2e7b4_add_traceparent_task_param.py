@@ -0,0 +1,58 @@
+"""Add traceparent task param to reward-issuance and reward-status-adjustment
+
+Revision ID: a3f1c9d2e7b4
+Revises: 43bdcbcd05d5
+Create Date: 2026-10-19 09:12:41.204518
+
+"""
+from typing import Any
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a3f1c9d2e7b4"
+down_revision = "43bdcbcd05d5"
+branch_labels = None
+depends_on = None
+
+
+task_names = ["reward-issuance", "reward-status-adjustment"]
+key_type_list = [
+    {"name": "traceparent", "type": "STRING"},
+]
+
+
+def get_table_and_subquery(conn: sa.engine.Connection, task_name: str) -> tuple[sa.Table, Any]:
+    metadata = sa.MetaData()
+    TaskType = sa.Table("task_type", metadata, autoload_with=conn)
+    TaskTypeKey = sa.Table("task_type_key", metadata, autoload_with=conn)
+
+    task_type_id_subquery = (
+        sa.future.select(TaskType.c.task_type_id).where(TaskType.c.name == task_name).scalar_subquery()
+    )
+
+    return TaskTypeKey, task_type_id_subquery
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    for task_name in task_names:
+        TaskTypeKey, task_type_id_subquery = get_table_and_subquery(conn, task_name)
+        conn.execute(
+            TaskTypeKey.insert().values(task_type_id=task_type_id_subquery),
+            key_type_list,
+        )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    for task_name in task_names:
+        TaskTypeKey, task_type_id_subquery = get_table_and_subquery(conn, task_name)
+        conn.execute(
+            TaskTypeKey.delete().where(
+                TaskTypeKey.c.task_type_id == task_type_id_subquery,
+                TaskTypeKey.c.name.in_([key["name"] for key in key_type_list]),
+            )
+        )
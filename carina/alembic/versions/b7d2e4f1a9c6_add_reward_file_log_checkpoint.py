@@ -0,0 +1,38 @@
+"""Add reward_file_log status and import checkpoint
+
+Revision ID: b7d2e4f1a9c6
+Revises: a3f1c9d2e7b4
+Create Date: 2026-10-19 11:02:17.530912
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b7d2e4f1a9c6"
+down_revision = "a3f1c9d2e7b4"
+branch_labels = None
+depends_on = None
+
+rewardfilelogstatuses = sa.Enum("IN_PROGRESS", "COMPLETED", name="rewardfilelogstatuses")
+
+
+def upgrade() -> None:
+    rewardfilelogstatuses.create(op.get_bind(), checkfirst=False)
+    op.add_column("reward_file_log", sa.Column("status", rewardfilelogstatuses, nullable=True))
+    op.execute("UPDATE reward_file_log SET status = 'COMPLETED' WHERE status is NULL;")
+    op.alter_column("reward_file_log", "status", nullable=False)
+    op.add_column("reward_file_log", sa.Column("blob_etag", sa.String(), nullable=True))
+    op.add_column("reward_file_log", sa.Column("rows_processed", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("reward_file_log", sa.Column("bytes_processed", sa.BigInteger(), server_default="0", nullable=False))
+    op.alter_column("reward_file_log", "rows_processed", server_default=None)
+    op.alter_column("reward_file_log", "bytes_processed", server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column("reward_file_log", "bytes_processed")
+    op.drop_column("reward_file_log", "rows_processed")
+    op.drop_column("reward_file_log", "blob_etag")
+    op.drop_column("reward_file_log", "status")
+    rewardfilelogstatuses.drop(op.get_bind(), checkfirst=False)
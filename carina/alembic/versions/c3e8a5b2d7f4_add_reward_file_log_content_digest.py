@@ -0,0 +1,26 @@
+"""Add reward_file_log content_digest
+
+Revision ID: c3e8a5b2d7f4
+Revises: b7d2e4f1a9c6
+Create Date: 2026-10-19 14:21:43.118205
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c3e8a5b2d7f4"
+down_revision = "b7d2e4f1a9c6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("reward_file_log", sa.Column("content_digest", sa.String(length=32), nullable=True))
+    op.create_index(op.f("ix_reward_file_log_content_digest"), "reward_file_log", ["content_digest"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_reward_file_log_content_digest"), table_name="reward_file_log")
+    op.drop_column("reward_file_log", "content_digest")
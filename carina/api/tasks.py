@@ -1,6 +1,7 @@
 from retry_tasks_lib.utils.asynchronous import enqueue_many_retry_tasks, enqueue_retry_task
 
 from carina.core.config import redis_raw
+from carina.core.tracing import SpanKind, tracer
 from carina.db.session import AsyncSessionMaker
 
 
@@ -14,9 +15,12 @@ async def enqueue_task(retry_task_id: int) -> None:  # pragma: no cover
 
 
 async def enqueue_many_tasks(retry_tasks_ids: list[int]) -> None:  # pragma: no cover
-    async with AsyncSessionMaker() as db_session:
-        await enqueue_many_retry_tasks(
-            db_session=db_session,
-            retry_tasks_ids=retry_tasks_ids,
-            connection=redis_raw,
-        )
+    with tracer.start_as_current_span(
+        "enqueue_many_tasks", kind=SpanKind.PRODUCER, attributes={"retry_tasks_count": len(retry_tasks_ids)}
+    ):
+        async with AsyncSessionMaker() as db_session:
+            await enqueue_many_retry_tasks(
+                db_session=db_session,
+                retry_tasks_ids=retry_tasks_ids,
+                connection=redis_raw,
+            )
@@ -1,5 +1,9 @@
 import logging
 import os
+import sys
+
+from pathlib import Path
+from typing import BinaryIO
 
 import typer
 
@@ -9,14 +13,27 @@ from prometheus_client import values
 from prometheus_client.multiprocess import MultiProcessCollector
 from retry_tasks_lib.reporting import report_anomalous_tasks, report_queue_lengths, report_tasks_summary
 from retry_tasks_lib.utils.error_handler import job_meta_handler
-from rq import Worker
 
 from carina.core.config import redis_raw, settings
+from carina.core.profiling import setup_profiler
+from carina.core.tracing import TracingWorker, setup_tracing
 from carina.db.session import SyncSessionMaker
-from carina.imports.agents.file_agent import RewardImportAgent, RewardUpdatesAgent
+from carina.imports.agents.blob_events import BlobEventListener
+from carina.imports.agents.error_reports import REPORT_BLOB_SUFFIX
+from carina.imports.agents.file_agent import (
+    BlobFileAgent,
+    BlobProcessingError,
+    RewardConfigNotActiveError,
+    RewardImportAgent,
+    RewardUpdatesAgent,
+)
+from carina.imports.agents.streaming import DecompressionError
+from carina.imports.backfill import BulkLoadError, LoadProgress, load_reward_codes
+from carina.scheduled_tasks.code_filters import rebuild_reward_code_filters
+from carina.scheduled_tasks.queue_age import report_oldest_job_age
 from carina.scheduled_tasks.scheduler import cron_scheduler as carina_cron_scheduler
 from carina.scheduled_tasks.task_cleanup import cleanup_old_tasks
-from carina.tasks.prometheus import job_queue_summary, task_statuses, tasks_summary
+from carina.tasks.prometheus import job_queue_oldest_job_age, job_queue_summary, task_statuses, tasks_summary
 
 cli = typer.Typer()
 logger = logging.getLogger(__name__)
@@ -33,7 +50,8 @@ def task_worker(burst: bool = False) -> None:
         logger.info("Starting prometheus metrics server...")
         start_prometheus_server(settings.PROMETHEUS_HTTP_SERVER_PORT, registry=registry)
 
-    worker = Worker(
+    setup_profiler("task-worker")
+    worker = TracingWorker(
         queues=settings.TASK_QUEUES,
         connection=redis_raw,
         log_job_description=True,
@@ -44,26 +62,30 @@ def task_worker(burst: bool = False) -> None:
 
 
 @cli.command()
-def cron_scheduler(
+def cron_scheduler(  # noqa: PLR0913
     imports: bool = True,
     updates: bool = True,
     report_tasks: bool = True,
     report_rq_queues: bool = True,
     task_cleanup: bool = True,
+    code_filters: bool = True,
 ) -> None:  # pragma: no cover
 
+    setup_profiler("cron-scheduler")
     logger.info("Initialising scheduler...")
     if imports:
+        import_agent = RewardImportAgent()
         carina_cron_scheduler.add_job(
-            RewardImportAgent().do_import,
-            schedule_fn=lambda: settings.BLOB_IMPORT_SCHEDULE,
+            import_agent.do_import,
+            schedule_fn=lambda: import_agent.schedule,
             coalesce_jobs=True,
         )
 
     if updates:
+        updates_agent = RewardUpdatesAgent()
         carina_cron_scheduler.add_job(
-            RewardUpdatesAgent().do_import,
-            schedule_fn=lambda: settings.BLOB_IMPORT_SCHEDULE,
+            updates_agent.do_import,
+            schedule_fn=lambda: updates_agent.schedule,
             coalesce_jobs=True,
         )
 
@@ -102,6 +124,17 @@ def cron_scheduler(
             schedule_fn=lambda: settings.REPORT_JOB_QUEUE_LENGTH_SCHEDULE,
             coalesce_jobs=True,
         )
+        carina_cron_scheduler.add_job(
+            report_oldest_job_age,
+            kwargs={
+                "redis": redis_raw,
+                "project_name": settings.PROJECT_NAME,
+                "queue_names": settings.TASK_QUEUES,
+                "gauge": job_queue_oldest_job_age,
+            },
+            schedule_fn=lambda: settings.REPORT_JOB_QUEUE_AGE_SCHEDULE,
+            coalesce_jobs=True,
+        )
 
     if task_cleanup:
         carina_cron_scheduler.add_job(
@@ -110,15 +143,98 @@ def cron_scheduler(
             coalesce_jobs=True,
         )
 
+    if code_filters and settings.REWARD_CODE_FILTER_ENABLED:
+        carina_cron_scheduler.add_job(
+            rebuild_reward_code_filters,
+            schedule_fn=lambda: settings.REWARD_CODE_FILTER_REBUILD_SCHEDULE,
+            coalesce_jobs=True,
+        )
+
     logger.info(f"Starting scheduler {carina_cron_scheduler}...")
     carina_cron_scheduler.run()
 
 
+@cli.command()
+def blob_event_listener(imports: bool = True, updates: bool = True) -> None:  # pragma: no cover
+    """Imports new blobs as their BlobCreated events are received on BLOB_IMPORT_EVENTS_QUEUE"""
+
+    setup_profiler("blob-event-listener")
+    agents: list[BlobFileAgent] = []
+    if imports:
+        agents.append(RewardImportAgent())
+    if updates:
+        agents.append(RewardUpdatesAgent())
+
+    BlobEventListener(agents).run()
+
+
+def _echo_progress(progress: LoadProgress) -> None:  # pragma: no cover
+    typer.echo(
+        f"{progress.file_name}: {progress.rows} rows read, {progress.inserted} rewards inserted "
+        f"in {progress.elapsed:.1f}s ({progress.rows_per_second:.0f} rows/s)"
+    )
+
+
+def _bulk_load_file(
+    retailer_slug: str, file_name: str, content: BinaryIO, *, workers: int, batch_size: int, report_dir: Path
+) -> bool:  # pragma: no cover
+    try:
+        progress = load_reward_codes(
+            retailer_slug, file_name, content, workers=workers, batch_size=batch_size, on_progress=_echo_progress
+        )
+    except RewardConfigNotActiveError as ex:
+        typer.echo(f"Failed to load {file_name}: reward config {ex.reward_slug} is not active", err=True)
+        return False
+    except (BulkLoadError, BlobProcessingError, UnicodeDecodeError, DecompressionError) as ex:
+        typer.echo(f"Failed to load {file_name}: {ex}", err=True)
+        return False
+
+    if progress.report.counts:
+        report_path = report_dir / f"{file_name}{REPORT_BLOB_SUFFIX}"
+        progress.report.save(report_path)
+        typer.echo(progress.report.summary(str(report_path)), err=True)
+
+    return True
+
+
+@cli.command()
+def bulk_load(  # noqa: PLR0913
+    retailer_slug: str,
+    files: list[Path] = typer.Argument(..., help="Reward import files to load, - to read one from stdin"),
+    name: str = typer.Option(None, help="File name of the content read from stdin, e.g. rewards.import.<slug>.csv"),
+    workers: int = typer.Option(os.cpu_count() or 1, min=1, help="Number of processes loading codes"),
+    batch_size: int = typer.Option(settings.BLOB_IMPORT_BATCH_SIZE, min=1, help="Number of rows read at a time"),
+    report_dir: Path = typer.Option(Path(), file_okay=False, exists=True, help="Where error reports are written"),
+) -> None:  # pragma: no cover
+    """
+    Loads reward import files from the local filesystem, or stdin, as RewardImportAgent would once uploaded
+    to <retailer slug>/<file name>
+    """
+
+    succeeded = True
+    for path in files:
+        if str(path) == "-":
+            if not name:
+                raise typer.BadParameter("--name is required to read from stdin")
+            succeeded &= _bulk_load_file(
+                retailer_slug, name, sys.stdin.buffer, workers=workers, batch_size=batch_size, report_dir=report_dir
+            )
+        else:
+            with path.open("rb") as content:
+                succeeded &= _bulk_load_file(
+                    retailer_slug, path.name, content, workers=workers, batch_size=batch_size, report_dir=report_dir
+                )
+
+    if not succeeded:
+        raise typer.Exit(code=1)
+
+
 @cli.callback()
 def callback() -> None:
     """
     carina command line interface
     """
+    setup_tracing()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,130 @@
+"""
+Optional tracemalloc based memory instrumentation, enabled with `MEMORY_PROFILING_ENABLED`.
+
+Snapshots are taken before and after each instrumented job, the allocation sites that grew the most are logged
+and the job's traced memory peak and peak RSS are exported as gauges.
+
+tracemalloc traces the whole process, figures for jobs running concurrently in the same process,
+e.g. cron scheduler jobs, include each other's allocations. Work running on several threads at once, like the blobs
+of an import run, is instrumented with `memory_delta` instead, which does not touch the process' peaks and only
+reports an approximate traced memory delta.
+"""
+import contextlib
+import logging
+import resource
+import time
+import tracemalloc
+
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any
+
+from carina.core.config import settings
+from carina.tasks.prometheus import job_approximate_traced_memory_delta, job_peak_rss, job_traced_memory_peak
+
+logger = logging.getLogger("memory-profiling")
+
+_SNAPSHOT_FILTERS = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+
+# peaks reported by nested jobs, as they reset the process' peak values
+_inner_peaks: ContextVar[list[tuple[int, int]] | None] = ContextVar("inner_peaks", default=None)
+
+
+def _reset_peak_rss() -> None:
+    # Linux only, resets VmHWM to the current RSS
+    with contextlib.suppress(OSError), open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+        f.write("5")
+
+
+def _get_peak_rss() -> int:
+    with contextlib.suppress(OSError), open("/proc/self/status", encoding="ascii") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+
+    # lifetime peak, in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _log_top_allocations(job_name: str, before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> None:
+    top_stats = after.filter_traces(_SNAPSHOT_FILTERS).compare_to(before.filter_traces(_SNAPSHOT_FILTERS), "lineno")
+    lines = [str(stat) for stat in top_stats[: settings.MEMORY_PROFILING_TOP_ALLOCATIONS]]
+    logger.info(f"Top allocation sites for {job_name}:\n" + "\n".join(lines))
+
+
+@contextmanager
+def memory_snapshot(job_name: str) -> Generator[None, None, None]:
+    """Instruments the wrapped block as `job_name`, does nothing unless `MEMORY_PROFILING_ENABLED` is set."""
+
+    if not settings.MEMORY_PROFILING_ENABLED:
+        yield
+        return
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(settings.MEMORY_PROFILING_TRACEBACK_FRAMES)
+
+    parent_peaks = _inner_peaks.get()
+    token = _inner_peaks.set(peaks := [])
+    before = tracemalloc.take_snapshot()
+    _reset_peak_rss()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        traced_peak = max([tracemalloc.get_traced_memory()[1], *(traced for traced, _ in peaks)])
+        peak_rss = max([_get_peak_rss(), *(rss for _, rss in peaks)])
+        _inner_peaks.reset(token)
+        if parent_peaks is not None:
+            parent_peaks.append((traced_peak, peak_rss))
+
+        logger.info(
+            f"{job_name} took {duration:.2f}s, traced memory peak: {traced_peak / 2**20:.1f} MiB, "
+            f"peak RSS: {peak_rss / 2**20:.1f} MiB"
+        )
+        _log_top_allocations(job_name, before, tracemalloc.take_snapshot())
+        job_traced_memory_peak.labels(app=settings.PROJECT_NAME, job_name=job_name).set(traced_peak)
+        job_peak_rss.labels(app=settings.PROJECT_NAME, job_name=job_name).set(peak_rss)
+
+
+@contextmanager
+def memory_delta(job_name: str) -> Generator[None, None, None]:
+    """
+    Logs and exports the change in traced memory over the wrapped block, does nothing unless
+    `MEMORY_PROFILING_ENABLED` is set. The delta is approximate as it includes the allocations and releases of
+    any other thread meanwhile, process peaks are left to the enclosing `memory_snapshot`.
+    """
+
+    if not settings.MEMORY_PROFILING_ENABLED:
+        yield
+        return
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(settings.MEMORY_PROFILING_TRACEBACK_FRAMES)
+
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        delta = tracemalloc.get_traced_memory()[0] - before
+        logger.info(f"{job_name} took {duration:.2f}s, approximate traced memory delta: {delta / 2**20:.1f} MiB")
+        job_approximate_traced_memory_delta.labels(app=settings.PROJECT_NAME, job_name=job_name).set(delta)
+
+
+def memory_profiled(job_name: str) -> Callable:
+    """Decorator version of `memory_snapshot`"""
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with memory_snapshot(job_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
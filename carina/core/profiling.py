@@ -0,0 +1,205 @@
+"""
+On-demand sampling profiler.
+
+While enabled, a background thread samples the stacks of the process' threads every
+`PROFILER_SAMPLE_INTERVAL_SECONDS` and periodically appends them, in the collapsed stack format understood by
+flamegraph.pl and speedscope, to `{PROFILER_OUTPUT_DIR}/{process_name}.folded`.
+
+Only samples attributable to a unit of work are kept, stacks are prefixed with:
+- the RQ job function for task workers, see `ProfilingWorker`
+- the route's method and path template for the API, see `register_api_routes`
+- the job function for the cron scheduler
+
+The profiler is started at startup if `PROFILER_ENABLED` is set, and if `PROFILER_SIGNAL_TOGGLE_ENABLED` is set
+it can be toggled at runtime by sending SIGUSR2 to the process (the parent process for task workers).
+When disabled no thread is running and nothing is recorded.
+"""
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+from collections import Counter
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from inspect import unwrap
+from types import CodeType, FrameType
+from typing import TYPE_CHECKING, Any
+
+from rq import Worker
+
+from carina.core.config import settings
+
+if TYPE_CHECKING:  # pragma: no cover
+    from fastapi import FastAPI
+    from rq.job import Job
+    from rq.queue import Queue
+
+logger = logging.getLogger("profiling")
+
+MAX_STACK_DEPTH = 128
+TOGGLE_SIGNAL = signal.SIGUSR2
+
+
+class SamplingProfiler:
+    def __init__(self) -> None:
+        self.process_name = "carina"
+        self.enabled = False
+        self.thread_labels: dict[int, str] = {}
+        self.code_labels: dict[CodeType, str] = {}
+        self._stacks: Counter[str] = Counter()
+        # re-entrant as `toggle` may flush from a signal handler
+        self._lock = threading.RLock()
+        self._pid: int | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def output_path(self) -> str:
+        return os.path.join(settings.PROFILER_OUTPUT_DIR, f"{self.process_name}.folded")
+
+    def start(self) -> None:
+        self.enabled = True
+        if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+            # forked processes do not inherit the sampling thread and may have inherited a held lock
+            self._pid = os.getpid()
+            self._lock = threading.RLock()
+            self._stacks = Counter()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            logger.info(f"Sampling profiler started, writing to {self.output_path}")
+
+    def stop(self) -> None:
+        self.enabled = False
+        self.flush()
+
+    def toggle(self, *_: Any) -> None:
+        if self.enabled:
+            self.stop()
+            logger.info("Sampling profiler stopped")
+        else:
+            self.start()
+
+    def _run(self) -> None:
+        pid = os.getpid()
+        last_flush = time.monotonic()
+        while self.enabled and self._pid == pid:
+            self.sample()
+            if time.monotonic() - last_flush >= settings.PROFILER_FLUSH_INTERVAL_SECONDS:
+                self.flush()
+                last_flush = time.monotonic()
+
+            time.sleep(settings.PROFILER_SAMPLE_INTERVAL_SECONDS)
+
+    def _get_label(self, thread_id: int, frames: list[FrameType]) -> str | None:
+        if label := self.thread_labels.get(thread_id):
+            return label
+
+        for frame in frames:
+            if label := self.code_labels.get(frame.f_code):
+                return label
+
+        return None
+
+    def sample(self) -> None:
+        current_thread_id = threading.get_ident()
+        samples = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == current_thread_id:
+                continue
+
+            frames: list[FrameType] = []
+            current_frame: FrameType | None = frame
+            while current_frame is not None and len(frames) < MAX_STACK_DEPTH:
+                frames.append(current_frame)
+                current_frame = current_frame.f_back
+
+            if (label := self._get_label(thread_id, frames)) is None:
+                continue
+
+            stack = ";".join(
+                f"{f.f_globals.get('__name__', '?')}:{f.f_code.co_name}:{f.f_lineno}" for f in reversed(frames)
+            )
+            samples.append(f"{self.process_name};{label};{stack}")
+
+        with self._lock:
+            self._stacks.update(samples)
+
+    def flush(self) -> None:
+        with self._lock:
+            stacks, self._stacks = self._stacks, Counter()
+
+        if not stacks:
+            return
+
+        try:
+            os.makedirs(settings.PROFILER_OUTPUT_DIR, exist_ok=True)
+            # a single append per flush so that processes sharing the file do not interleave lines
+            with open(self.output_path, "a", encoding="utf-8") as f:
+                f.write("".join(f"{stack} {count}\n" for stack, count in stacks.items()))
+        except OSError as ex:
+            logger.warning(f"Failed to write profiler samples to {self.output_path}: {ex!r}")
+
+    @contextmanager
+    def label_thread(self, label: str) -> Generator[None, None, None]:
+        if not self.enabled:
+            yield
+            return
+
+        thread_id = threading.get_ident()
+        self.thread_labels[thread_id] = label
+        try:
+            yield
+        finally:
+            self.thread_labels.pop(thread_id, None)
+
+    def register_code_label(self, func: Callable, label: str) -> None:
+        """Samples whose stack goes through `func` are attributed to `label`"""
+        func = unwrap(func)
+        if code := getattr(getattr(func, "__func__", func), "__code__", None):
+            self.code_labels[code] = label
+
+
+profiler = SamplingProfiler()
+
+
+def setup_profiler(process_name: str) -> None:
+    """
+    Starts the profiler if `PROFILER_ENABLED` is set and installs the toggle signal handler
+    if `PROFILER_SIGNAL_TOGGLE_ENABLED` is set and this is called from the main thread.
+    """
+
+    profiler.process_name = process_name
+    if settings.PROFILER_SIGNAL_TOGGLE_ENABLED and threading.current_thread() is threading.main_thread():
+        signal.signal(TOGGLE_SIGNAL, profiler.toggle)
+
+    if settings.PROFILER_ENABLED:
+        profiler.start()
+
+
+def register_api_routes(app: "FastAPI") -> None:
+    for route in app.routes:
+        if endpoint := getattr(route, "endpoint", None):
+            methods = ",".join(sorted(getattr(route, "methods", None) or []))
+            profiler.register_code_label(endpoint, f"{methods} {route.path}".strip())  # type: ignore [attr-defined]
+
+
+class ProfilingWorker(Worker):
+    """
+    RQ Worker labelling profiler samples with the job's function.
+
+    Jobs run in a forked work horse that does not inherit the sampling thread,
+    the profiler is restarted within the horse and flushed before it exits.
+    """
+
+    def perform_job(self, job: "Job", queue: "Queue") -> bool:
+        if not profiler.enabled:
+            return super().perform_job(job, queue)
+
+        profiler.start()
+        try:
+            with profiler.label_thread(f"{job.origin}:{job.func_name}"):
+                return super().perform_job(job, queue)
+        finally:
+            profiler.flush()
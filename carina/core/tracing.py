@@ -0,0 +1,137 @@
+"""
+OpenTelemetry tracing of allocations from the API through RQ to Polaris.
+
+Spans are exported to an OTLP/HTTP collector (`TRACING_EXPORTER=otlp`) or written as JSON lines to a local file
+(`TRACING_EXPORTER=file`) for local testing. Nothing is recorded unless `setup_tracing` was called with
+`TRACING_ENABLED` set, the OpenTelemetry API is a no-op otherwise.
+
+The trace context is carried through RQ in the retry tasks' `traceparent` param.
+"""
+from collections.abc import Callable
+from functools import wraps
+from typing import TYPE_CHECKING, Any
+
+from opentelemetry import trace
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from opentelemetry.instrumentation.requests import RequestsInstrumentor
+from opentelemetry.propagate import extract, inject
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import SpanKind
+
+from carina.core.config import settings
+from carina.core.profiling import ProfilingWorker
+from carina.version import __version__
+
+if TYPE_CHECKING:  # pragma: no cover
+    from fastapi import FastAPI
+    from retry_tasks_lib.db.models import RetryTask
+    from rq.job import Job
+    from rq.queue import Queue
+
+TRACEPARENT_TASK_PARAM = "traceparent"
+
+tracer = trace.get_tracer("carina")
+
+
+def _get_span_exporter() -> SpanExporter:
+    if settings.TRACING_EXPORTER == "file":
+        return ConsoleSpanExporter(
+            out=open(settings.TRACING_FILE_EXPORTER_PATH, "a", encoding="utf-8"),  # noqa: SIM115
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+
+    return OTLPSpanExporter(endpoint=f"{settings.TRACING_OTLP_ENDPOINT.rstrip('/')}/v1/traces")
+
+
+def setup_tracing(app: "FastAPI | None" = None) -> None:
+    """
+    Sets up the tracer provider and instruments `requests`, and the provided FastAPI app, if `TRACING_ENABLED` is set.
+
+    New traces are sampled according to `TRACING_SAMPLE_RATE`, continued ones follow their parent's decision.
+    """
+
+    if not settings.TRACING_ENABLED:
+        return
+
+    provider = TracerProvider(
+        resource=Resource.create(
+            {
+                "service.name": settings.PROJECT_NAME,
+                "service.version": __version__,
+                "deployment.environment": settings.SENTRY_ENV or "",
+            }
+        ),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATE)),
+    )
+    provider.add_span_processor(
+        BatchSpanProcessor(
+            _get_span_exporter(),
+            max_queue_size=settings.TRACING_MAX_QUEUE_SIZE,
+            schedule_delay_millis=settings.TRACING_EXPORT_INTERVAL_SECONDS * 1000,
+            max_export_batch_size=settings.TRACING_EXPORT_BATCH_SIZE,
+        )
+    )
+    trace.set_tracer_provider(provider)
+
+    RequestsInstrumentor().instrument()
+    if app is not None:
+        FastAPIInstrumentor.instrument_app(app)
+
+
+def flush_spans() -> None:
+    """Exports the spans ended so far, waiting at most `TRACING_FLUSH_TIMEOUT_SECONDS` for the collector"""
+
+    if isinstance(provider := trace.get_tracer_provider(), TracerProvider):
+        provider.force_flush(timeout_millis=int(settings.TRACING_FLUSH_TIMEOUT_SECONDS * 1000))
+
+
+def current_traceparent() -> str | None:
+    carrier: dict[str, str] = {}
+    inject(carrier)
+    return carrier.get(TRACEPARENT_TASK_PARAM)
+
+
+def traced_task(span_name: str) -> Callable:
+    """Decorator for retry task functions, continues the trace stored in the task's params if any."""
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not settings.TRACING_ENABLED:
+                return func(*args, **kwargs)
+
+            retry_task: "RetryTask" = kwargs["retry_task"] if "retry_task" in kwargs else args[0]
+            carrier: dict[str, str] = {}
+            if traceparent := retry_task.get_params().get(TRACEPARENT_TASK_PARAM):
+                carrier[TRACEPARENT_TASK_PARAM] = traceparent
+
+            with tracer.start_as_current_span(
+                span_name,
+                context=extract(carrier),
+                kind=SpanKind.CONSUMER,
+                attributes={"retry_task_id": retry_task.retry_task_id, "attempts": retry_task.attempts},
+            ):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TracingWorker(ProfilingWorker):
+    """
+    RQ Worker exporting the spans of each job once it is done.
+
+    Work horses leave with `os._exit`, skipping the span processor's exit handler, so the spans are flushed
+    after the job's outcome has been recorded, within `TRACING_FLUSH_TIMEOUT_SECONDS`.
+    """
+
+    def perform_job(self, job: "Job", queue: "Queue") -> bool:
+        try:
+            return super().perform_job(job, queue)
+        finally:
+            flush_spans()
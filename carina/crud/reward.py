@@ -13,6 +13,7 @@ from sqlalchemy.future import select
 from sqlalchemy.orm import noload, selectinload
 
 from carina.core.config import settings
+from carina.core.tracing import TRACEPARENT_TASK_PARAM, current_traceparent
 from carina.db.base_class import async_run_query
 from carina.enums import HttpErrors, RewardCampaignStatuses
 from carina.models import (
@@ -79,6 +80,8 @@ async def create_reward_issuance_retry_tasks(
             task_params["pending_reward_id"] = pending_reward_id
         if campaign_slug is not None:
             task_params["campaign_slug"] = campaign_slug
+        if traceparent := current_traceparent():
+            task_params[TRACEPARENT_TASK_PARAM] = traceparent
 
         reward_issuance_tasks = []
         status_code = http_status.HTTP_202_ACCEPTED
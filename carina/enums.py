@@ -85,6 +85,12 @@ class FileAgentType(Enum):
     UPDATE = "update"
 
 
+class RewardFileLogStatuses(Enum):
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
 class RetailerStatuses(Enum):
     TEST = "Test"
     ACTIVE = "Active"
@@ -7,6 +7,7 @@ from sqlalchemy.future import select
 
 from carina.db.base_class import sync_run_query
 from carina.models import RetailerFetchType, RewardConfig
+from carina.tasks.stage_timing import stage
 
 from .base import BaseAgent, RewardData
 
@@ -36,7 +37,9 @@ def _reward_config_specific_agent(
             )
         ).scalar_one()
 
-    agent_config: dict = sync_run_query(_query, db_session, rollback_on_exc=False).load_agent_config()
+    with stage("load_agent_config"):
+        agent_config: dict = sync_run_query(_query, db_session, rollback_on_exc=False).load_agent_config()
+
     return agent_cls(db_session, reward_config, agent_config, retry_task=retry_task)
 
 
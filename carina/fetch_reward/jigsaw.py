@@ -11,7 +11,9 @@ from fastapi import status
 from carina.core.config import redis_raw, settings
 from carina.db.base_class import sync_run_query
 from carina.fetch_reward.base import AgentError, BaseAgent, RewardData
+from carina.imports.code_filter import add_codes
 from carina.models import Reward
+from carina.tasks.stage_timing import stage
 
 if TYPE_CHECKING:  # pragma: no cover
     from inspect import Traceback
@@ -314,16 +316,17 @@ class Jigsaw(BaseAgent):
         if token is not None:
             return token
 
-        resp = self.send_request(
-            "POST",
-            url_template="{base_url}/order/V4/getToken",
-            url_kwargs={"base_url": self.base_url},
-            exclude_from_label_url=[],
-            json={
-                "Username": settings.JIGSAW_AGENT_USERNAME,
-                "Password": settings.JIGSAW_AGENT_PASSWORD,
-            },
-        )
+        with stage("jigsaw_get_token"):
+            resp = self.send_request(
+                "POST",
+                url_template="{base_url}/order/V4/getToken",
+                url_kwargs={"base_url": self.base_url},
+                exclude_from_label_url=[],
+                json={
+                    "Username": settings.JIGSAW_AGENT_USERNAME,
+                    "Password": settings.JIGSAW_AGENT_PASSWORD,
+                },
+            )
 
         response_payload = self._get_response_body_or_raise_for_status(resp)
         expires_in = self._get_tz_aware_datetime_from_isoformat(response_payload["data"]["Expires"]) - datetime.now(
@@ -359,43 +362,50 @@ class Jigsaw(BaseAgent):
                 retailer_id=self.reward_config.retailer_id,
             )
             self.db_session.add(reward)
+            add_codes(self.reward_config.retailer_id, [reward_code])
             self.db_session.commit()
             return reward
 
-        return sync_run_query(_query, self.db_session)
+        with stage("save_reward"):
+            return sync_run_query(_query, self.db_session)
 
     def _register_reward(self) -> requests.Response:
         """
         Registers our customer_card_ref to Jigsaw and returns a new Reward code.
         """
         try:
+            token = self._get_auth_token()
+            with stage("jigsaw_register"):
+                return self.send_request(
+                    "POST",
+                    url_template="{base_url}/order/V4/register",
+                    url_kwargs={"base_url": self.base_url},
+                    exclude_from_label_url=[],
+                    json={
+                        "customer_card_ref": self.customer_card_ref,
+                        "brand_id": self.config["brand_id"],
+                        "transaction_value": self.reward_config_required_values["transaction_value"],
+                    },
+                    headers={"Token": token},
+                )
+        except requests.ConnectionError:
+            self.set_agent_state_params(self.agent_state_params | {self.REVERSAL_FLAG_KEY: True})
+            raise
+
+    def _send_reversal_request(self) -> requests.Response:
+        original_customer_card_ref = self._get_reversal_customer_card_ref()
+        token = self._get_auth_token()
+        with stage("jigsaw_reversal"):
             return self.send_request(
                 "POST",
-                url_template="{base_url}/order/V4/register",
+                url_template="{base_url}/order/V4/reversal",
                 url_kwargs={"base_url": self.base_url},
                 exclude_from_label_url=[],
                 json={
-                    "customer_card_ref": self.customer_card_ref,
-                    "brand_id": self.config["brand_id"],
-                    "transaction_value": self.reward_config_required_values["transaction_value"],
+                    "original_customer_card_ref": original_customer_card_ref,
                 },
-                headers={"Token": self._get_auth_token()},
+                headers={"Token": token},
             )
-        except requests.ConnectionError:
-            self.set_agent_state_params(self.agent_state_params | {self.REVERSAL_FLAG_KEY: True})
-            raise
-
-    def _send_reversal_request(self) -> requests.Response:
-        return self.send_request(
-            "POST",
-            url_template="{base_url}/order/V4/reversal",
-            url_kwargs={"base_url": self.base_url},
-            exclude_from_label_url=[],
-            json={
-                "original_customer_card_ref": self._get_reversal_customer_card_ref(),
-            },
-            headers={"Token": self._get_auth_token()},
-        )
 
     def fetch_reward(self) -> RewardData:
         """
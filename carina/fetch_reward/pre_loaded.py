@@ -7,6 +7,7 @@ from sqlalchemy.future import select
 from carina.core.config import settings
 from carina.db.base_class import sync_run_query
 from carina.models import Reward
+from carina.tasks.stage_timing import stage
 
 from .base import BaseAgent, RewardData
 
@@ -70,4 +71,5 @@ class PreLoaded(BaseAgent):
                 .first()
             )
 
-        return sync_run_query(_query, self.db_session)
+        with stage("select_allocable_reward"):
+            return sync_run_query(_query, self.db_session)
@@ -0,0 +1,170 @@
+"""
+Event driven blob imports.
+
+The import container's Event Grid `Microsoft.Storage.BlobCreated` events are delivered to the Azure Storage Queue
+named by `BLOB_IMPORT_EVENTS_QUEUE`, the listener processes each new blob with the file agent whose path template
+it matches as soon as it is notified. Blobs are still leased and checked for duplicates by the agents, so events
+can safely overlap with the agents' reconciliation sweeps, which pick up any missed event.
+
+Agents applying a retailer's files in order, like the updates agent, process all the retailer's pending files in
+upload order on each event rather than the event's blob alone, so that redelivered or reordered events can't apply
+them out of order.
+
+When testing against Azurite, which does not emit events, messages can be added to the queue by hand, either as
+plain or base64 encoded JSON.
+"""
+import base64
+import binascii
+import json
+import logging
+import time
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import sentry_sdk
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.queue import QueueClient
+from sqlalchemy.future import select
+
+from carina.core.config import settings
+from carina.db.base_class import sync_run_query
+from carina.db.session import SyncSessionMaker
+from carina.imports.agents.file_agent import BlobFileAgent
+from carina.models import Retailer
+
+if TYPE_CHECKING:  # pragma: no cover
+    from azure.storage.queue import QueueMessage
+    from sqlalchemy.orm import Session
+
+logger = logging.getLogger("blob-events")
+
+BLOB_CREATED_EVENT_TYPE = "Microsoft.Storage.BlobCreated"
+
+
+class BlobCreatedEvent(NamedTuple):
+    container_name: str
+    blob_name: str
+
+
+def parse_blob_created_event(content: str) -> BlobCreatedEvent | None:
+    """Returns the blob of a BlobCreated event message, or None for any other message"""
+
+    try:
+        event = json.loads(content)
+    except json.JSONDecodeError:
+        try:
+            event = json.loads(base64.b64decode(content, validate=True))
+        except (binascii.Error, ValueError):
+            return None
+
+    # Event Grid delivers single events, the event grid schema allows batches
+    if isinstance(event, list):
+        event = event[0] if len(event) == 1 else None
+
+    if not isinstance(event, dict) or event.get("eventType") != BLOB_CREATED_EVENT_TYPE:
+        return None
+
+    # e.g. /blobServices/default/containers/carina-imports/blobs/test-retailer/rewards.import.test.csv
+    _, _, path = event.get("subject", "").partition("/containers/")
+    container_name, sep, blob_name = path.partition("/blobs/")
+    if not sep or not blob_name:
+        return None
+
+    return BlobCreatedEvent(container_name=container_name, blob_name=blob_name)
+
+
+class BlobEventListener:
+    def __init__(self, agents: list[BlobFileAgent], queue_client: QueueClient | None = None) -> None:
+        self.agents = agents
+        if queue_client is None:  # pragma: no cover
+            if not settings.BLOB_IMPORT_EVENTS_QUEUE:
+                raise ValueError("BLOB_IMPORT_EVENTS_QUEUE must be set to listen for blob events")
+
+            queue_client = QueueClient.from_connection_string(
+                settings.BLOB_STORAGE_DSN, queue_name=settings.BLOB_IMPORT_EVENTS_QUEUE
+            )
+
+        self.queue_client = queue_client
+
+    def _get_agent(self, event: BlobCreatedEvent) -> tuple[BlobFileAgent, str] | None:
+        """Returns the agent in charge of the blob, along with its retailer slug"""
+        retailer_slug, sep, _ = event.blob_name.partition("/")
+        if not sep:
+            return None
+
+        for agent in self.agents:
+            if event.container_name == agent.container_name and event.blob_name.startswith(
+                agent.blob_path_template.substitute(retailer_slug=retailer_slug)
+            ):
+                return agent, retailer_slug
+
+        return None
+
+    @staticmethod
+    def _get_retailer(db_session: "Session", retailer_slug: str) -> Retailer | None:
+        return sync_run_query(
+            lambda: db_session.execute(select(Retailer).where(Retailer.slug == retailer_slug)).scalar_one_or_none(),
+            db_session,
+        )
+
+    def process_event(self, event: BlobCreatedEvent) -> None:
+        if (match := self._get_agent(event)) is None:
+            logger.debug(f"Ignoring event for blob {event.blob_name} in {event.container_name}.")
+            return
+
+        agent, retailer_slug = match
+        with SyncSessionMaker() as db_session:
+            if (retailer := self._get_retailer(db_session, retailer_slug)) is None:
+                logger.warning(f"Ignoring blob {event.blob_name}, no retailer found for slug {retailer_slug}.")
+                return
+
+            if agent.process_retailer_blobs_in_order:
+                agent.process_blobs(retailer, db_session)
+                return
+
+            blob_client = agent.container_client.get_blob_client(event.blob_name)
+            try:
+                blob = blob_client.get_blob_properties()
+            except ResourceNotFoundError:
+                # already processed, e.g. by a reconciliation sweep
+                logger.debug(f"Blob {event.blob_name} no longer exists.")
+                return
+
+            agent.process_blob(retailer, blob, db_session)
+
+    def handle_message(self, message: "QueueMessage") -> None:
+        """Processes the message's blob, the message is deleted unless processing failed and can be retried"""
+
+        try:
+            if (event := parse_blob_created_event(message.content)) is not None:
+                self.process_event(event)
+        except Exception as ex:
+            logger.exception(f"Failed to process blob event {message.id}", exc_info=ex)
+            sentry_sdk.capture_exception(ex)
+            if message.dequeue_count < settings.BLOB_IMPORT_EVENTS_MAX_DEQUEUE_COUNT:
+                # the message becomes visible again after the visibility timeout
+                return
+
+            logger.error(f"Giving up on blob event {message.id} after {message.dequeue_count} attempts.")
+
+        self.queue_client.delete_message(message)
+
+    def poll(self) -> int:
+        """Handles the messages currently available and returns how many there were"""
+
+        messages = list(
+            self.queue_client.receive_messages(
+                max_messages=32, visibility_timeout=settings.BLOB_IMPORT_EVENTS_VISIBILITY_TIMEOUT_SECONDS
+            )
+        )
+        for message in messages:
+            self.handle_message(message)
+
+        return len(messages)
+
+    def run(self) -> None:  # pragma: no cover
+        logger.info(f"Listening for blob events on queue {self.queue_client.queue_name}...")
+        while True:
+            if not self.poll():
+                time.sleep(settings.BLOB_IMPORT_EVENTS_POLL_INTERVAL_SECONDS)
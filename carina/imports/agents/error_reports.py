@@ -0,0 +1,113 @@
+"""
+Error reports of the file agents.
+
+Problems found in a file are written as they are found, one row each, to a CSV report which is stored next to the
+file once it is archived or moved to the errors container. Only a summary of the problems, along with the report's
+location, is logged and sent to Sentry.
+"""
+import csv
+import io
+import logging
+import shutil
+import tempfile
+
+from collections import Counter
+from enum import Enum
+from typing import TYPE_CHECKING
+
+import sentry_sdk
+
+from azure.core.exceptions import HttpResponseError
+from azure.storage.blob import ContentSettings
+
+from carina.core.config import settings
+
+if TYPE_CHECKING:  # pragma: no cover
+    from pathlib import Path
+
+    from azure.storage.blob import BlobServiceClient
+
+logger = logging.getLogger("reward-import")
+
+REPORT_FIELDS = ("row_num", "code", "reason", "status", "detail")
+REPORT_BLOB_SUFFIX = ".errors.csv"
+# reports are kept in memory up to this size, then spilled to disk
+REPORT_SPOOL_MAX_SIZE = 1024 * 1024
+
+
+class ErrorReason(Enum):
+    INVALID_ROW = "invalid row"
+    PRE_EXISTING_CODE = "pre-existing code"
+    UNKNOWN_CODE = "unknown code"
+    UNALLOCATED_CODE = "unallocated code"
+    PARTIALLY_APPLIED = "partially applied"
+
+
+class ErrorReport:
+    """The problems found while processing a file"""
+
+    def __init__(self, blob_name: str) -> None:
+        self.blob_name = blob_name
+        self.counts: Counter[ErrorReason] = Counter()
+        self._file = tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_MAX_SIZE)
+        self._line = io.StringIO()
+        self._writer = csv.writer(self._line)
+        self._write_row(REPORT_FIELDS)
+
+    def _write_row(self, row: tuple) -> None:
+        self._writer.writerow(row)
+        self._file.write(self._line.getvalue().encode())
+        self._line.seek(0)
+        self._line.truncate()
+
+    def add(self, reason: ErrorReason, row_num: int, *, code: str = "", status: str = "", detail: str = "") -> None:
+        self.counts[reason] += 1
+        self._write_row((row_num, code, reason.value, status, detail))
+
+    def getvalue(self) -> str:
+        """Returns the report's CSV content"""
+        self._file.seek(0)
+        try:
+            return self._file.read().decode()
+        finally:
+            self._file.seek(0, io.SEEK_END)
+
+    def save(self, path: "Path") -> None:
+        """Writes the report's CSV content to a local file"""
+        self._file.seek(0)
+        try:
+            with path.open("wb") as f:
+                shutil.copyfileobj(self._file, f)
+        finally:
+            self._file.seek(0, io.SEEK_END)
+
+    def summary(self, location: str) -> str:
+        counts = ", ".join(f"{reason.value}: {count}" for reason, count in self.counts.items())
+        return f"Problems found while processing {self.blob_name} ({counts}), report: {location}"
+
+    def send(self, blob_service_client: "BlobServiceClient", container_name: str, dst_blob_name: str) -> None:
+        """
+        Stores the report next to the processed file, `dst_blob_name` in `container_name`, then logs and sends its
+        summary. Does nothing if no problem was found.
+        """
+        if not self.counts:
+            return
+
+        report_blob_client = blob_service_client.get_blob_client(container_name, f"{dst_blob_name}{REPORT_BLOB_SUFFIX}")
+        self._file.seek(0)
+        try:
+            report_blob_client.upload_blob(
+                self._file, overwrite=True, content_settings=ContentSettings(content_type="text/csv")
+            )
+        except HttpResponseError as ex:
+            logger.exception(f"Failed to store the error report of {self.blob_name}", exc_info=ex)
+            location = "not stored"
+        else:
+            location = report_blob_client.url
+        finally:
+            self._file.seek(0, io.SEEK_END)
+
+        msg = self.summary(location)
+        logger.warning(msg)
+        if settings.SENTRY_DSN:
+            sentry_sdk.capture_message(msg)
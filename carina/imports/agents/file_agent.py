@@ -5,39 +5,96 @@ import string
 import uuid
 
 from collections import defaultdict
+from collections.abc import Collection, Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from datetime import date, datetime, timezone
 from functools import lru_cache
-from io import StringIO
-from typing import TYPE_CHECKING, NamedTuple, cast
+from itertools import islice
+from typing import TYPE_CHECKING, TypedDict, cast
 
 import sentry_sdk
 
 from azure.core.exceptions import HttpResponseError, ResourceExistsError
 from azure.storage.blob import BlobClient, BlobLeaseClient, BlobServiceClient
-from pydantic import ValidationError
 from retry_tasks_lib.utils.synchronous import enqueue_many_retry_tasks, sync_create_many_tasks
-from sqlalchemy import update
+from sqlalchemy import String, and_, bindparam, func, insert, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.future import select
-from sqlalchemy.sql import and_, not_, or_
 
 from carina.core.config import redis_raw, settings
+from carina.core.memory_profiling import memory_delta, memory_profiled
+from carina.core.tracing import TRACEPARENT_TASK_PARAM, current_traceparent, tracer
 from carina.db.base_class import sync_run_query
 from carina.db.session import SyncSessionMaker
-from carina.enums import FileAgentType, RewardTypeStatuses, RewardUpdateStatuses
+from carina.enums import FileAgentType, RewardFileLogStatuses, RewardTypeStatuses, RewardUpdateStatuses
+from carina.imports.agents.error_reports import ErrorReason, ErrorReport
+from carina.imports.agents.leases import auto_renew_lease
+from carina.imports.agents.metrics import (
+    count_blob,
+    count_listed_blobs,
+    count_rows,
+    stage,
+    timed_download,
+    timed_iter,
+    track_blob_metrics,
+)
+from carina.imports.agents.streaming import (
+    DecompressionError,
+    HashedChunks,
+    TrackedLines,
+    batched,
+    iter_decoded_lines,
+    iter_decompressed,
+    skip_bytes,
+)
+from carina.imports.agents.update_parser import RewardUpdateRow, parse_reward_update_rows
+from carina.imports.bulk_load import (
+    RewardCodesFile,
+    bulk_insert_reward_code_files,
+    get_staged_codes_from_file,
+    insert_staged_reward_codes,
+    stage_reward_codes,
+)
+from carina.imports.code_filter import add_codes, get_maybe_existing_codes
 from carina.models import Retailer, Reward, RewardConfig, RewardFileLog, RewardUpdate
 from carina.scheduled_tasks.scheduler import acquire_lock, cron_scheduler
-from carina.schemas import RewardUpdateSchema
 
 logger = logging.getLogger("reward-import")
 
+SUPPORTED_FILE_EXTENSIONS = (".csv", ".csv.gz", ".csv.zst")
+COMPRESSED_FILE_EXTENSIONS = (".csv.gz", ".csv.zst")
+COMPRESSED_CONTENT_ENCODINGS = {"gzip", "zstd"}
+
+# blob index tags marking processed blobs in "tag" storage mode
+BLOB_STATE_TAG = "carina_state"
+BLOB_PROCESSED_AT_TAG = "carina_processed_at"
+
 if TYPE_CHECKING:  # pragma: no cover
     from azure.storage.blob import BlobProperties
     from sqlalchemy.orm import Session
+    from sqlalchemy.sql import Select
+
+
+class RewardUpdateValues(TypedDict):
+    reward_uuid: uuid.UUID
+    date: date
+    status: RewardUpdateStatuses
+
 
+@dataclass
+class SmallRewardFile:
+    """A small reward import file, read whole and imported along with others"""
 
-class RewardUpdateRow(NamedTuple):
-    data: RewardUpdateSchema
-    row_num: int
+    blob: "BlobProperties"
+    blob_client: BlobClient
+    lease: BlobLeaseClient
+    reward_file_log: RewardFileLog
+    reward_config: RewardConfig
+    expiry_date: date | None
+    row_nums_by_code: dict[str, list[int]]
+    invalid_rows: list[tuple[int, list[str]]]
 
 
 class BlobProcessingError(Exception):
@@ -50,28 +107,113 @@ class RewardConfigNotActiveError(Exception):
         super().__init__(*args)
 
 
+IMPORT_BLOB_PATH_TEMPLATE = string.Template("$retailer_slug/rewards.import.")
+
+
+def get_expiry_date(sub_blob_name: str, blob_name: str) -> date | None:
+    if ".expires." in sub_blob_name:
+        try:
+            extracted_date = sub_blob_name.split(".expires.")[1].split(".")[0]
+            expiry_date = datetime.strptime(extracted_date, "%Y-%m-%d").astimezone().date()
+        except ValueError as ex:
+            raise BlobProcessingError(f"Invalid filename, expiry date is invalid: {blob_name}") from ex
+    else:
+        expiry_date = None
+    return expiry_date
+
+
+def get_reward_configs_by_slug(db_session: "Session", retailer_id: int) -> dict[str, RewardConfig]:
+    reward_configs = sync_run_query(
+        lambda: db_session.execute(select(RewardConfig).where(RewardConfig.retailer_id == retailer_id)).scalars().all(),
+        db_session,
+    )
+    return {reward_config.reward_slug: reward_config for reward_config in reward_configs}
+
+
+def get_reward_config_and_expiry_date(
+    reward_configs_by_slug: dict[str, RewardConfig], retailer: Retailer, blob_name: str
+) -> tuple[RewardConfig, date | None]:
+    """Returns the active reward config and expiry date of an import file's rewards, as per its name"""
+    try:
+        _, sub_blob_name = blob_name.split(IMPORT_BLOB_PATH_TEMPLATE.substitute(retailer_slug=retailer.slug))
+    except ValueError as ex:
+        raise BlobProcessingError(f"Invalid filename, path does not match blob path template: {blob_name}") from ex
+    try:
+        reward_slug = sub_blob_name.split(".", 1)[0]
+        reward_config = reward_configs_by_slug[reward_slug]
+    except KeyError as ex:
+        raise BlobProcessingError(f"No RewardConfig found for reward_slug {reward_slug}") from ex
+
+    if reward_config.status != RewardTypeStatuses.ACTIVE:
+        raise RewardConfigNotActiveError(reward_slug=reward_slug)
+
+    return reward_config, get_expiry_date(sub_blob_name, blob_name)
+
+
+def get_row_nums_by_code(
+    batch: list[tuple[int, list[str]]], invalid_rows: list[tuple[int, list[str]]]
+) -> dict[str, list[int]]:
+    """Returns the row numbers of each of the batch's codes, the batch's invalid rows are added to `invalid_rows`"""
+    row_nums_by_code: defaultdict[str, list[int]] = defaultdict(list)
+    for row_num, row in batch:
+        if len(row) != 1:
+            invalid_rows.append((row_num, row))
+        elif code := row[0].strip():  # caters for blank lines
+            row_nums_by_code[code].append(row_num)
+
+    return row_nums_by_code
+
+
+def report_invalid_rows(report: ErrorReport, invalid_rows: list[tuple[int, list[str]]]) -> None:
+    count_rows("invalid", len(invalid_rows))
+    for row_num, row in invalid_rows:
+        report.add(
+            ErrorReason.INVALID_ROW,
+            row_num,
+            code=row[0].strip() if row else "",
+            detail=f"expected 1 column, found {len(row)}",
+        )
+
+
+def report_pre_existing_codes(report: ErrorReport, pre_existing_row_nums_by_code: dict[str, list[int]]) -> None:
+    count_rows("pre_existing", sum(map(len, pre_existing_row_nums_by_code.values())))
+    for code, row_nums in pre_existing_row_nums_by_code.items():
+        for row_num in row_nums:
+            report.add(ErrorReason.PRE_EXISTING_CODE, row_num, code=code)
+
+
 class BlobFileAgent:
     blob_path_template = string.Template("")  # Override in subclass
     scheduler_name = "carina-blob-file-agent"
+    process_retailer_blobs_in_order = False
 
     def __init__(self) -> None:
         self.file_agent_type: FileAgentType
         self.container_name = settings.BLOB_IMPORT_CONTAINER
-        self.schedule = settings.BLOB_IMPORT_SCHEDULE
+        # new blobs are imported on upload when blob events are consumed, leaving a slower reconciliation sweep
+        self.schedule = (
+            settings.BLOB_IMPORT_RECONCILIATION_SCHEDULE
+            if settings.BLOB_IMPORT_EVENTS_QUEUE
+            else settings.BLOB_IMPORT_SCHEDULE
+        )
         blob_client_logger = logging.getLogger("blob-client")
         blob_client_logger.setLevel(settings.BLOB_IMPORT_LOGGING_LEVEL)
         self.blob_service_client: BlobServiceClient = BlobServiceClient.from_connection_string(
-            settings.BLOB_STORAGE_DSN, logger=blob_client_logger
+            settings.BLOB_STORAGE_DSN,
+            logger=blob_client_logger,
+            max_single_get_size=settings.BLOB_IMPORT_CHUNK_SIZE,
+            max_chunk_get_size=settings.BLOB_IMPORT_CHUNK_SIZE,
         )
         # type hints for blob storage still not working properly, remove ignores if it gets fixed.
         with contextlib.suppress(ResourceExistsError):
             self.blob_service_client.create_container(self.container_name)
         self.container_client = self.blob_service_client.get_container_client(self.container_name)
+        self._created_containers: set[str] = set()
 
-    def _blob_name_is_duplicate(self, db_session: "Session", file_name: str) -> bool:
-        file_name = sync_run_query(
+    def _get_reward_file_log(self, db_session: "Session", file_name: str) -> RewardFileLog | None:
+        return sync_run_query(
             lambda: db_session.execute(
-                select(RewardFileLog.file_name).where(
+                select(RewardFileLog).where(
                     RewardFileLog.file_agent_type == self.file_agent_type,
                     RewardFileLog.file_name == file_name,
                 )
@@ -79,7 +221,95 @@ class BlobFileAgent:
             db_session,
         )
 
-        return file_name is not None
+    def _get_content_duplicates(
+        self, db_session: "Session", retailer: Retailer, content_digests: Collection[str]
+    ) -> dict[str, str]:
+        """Returns the file names of earlier successful imports of the same content for the retailer, by digest"""
+        if not content_digests:
+            return {}
+
+        rows = sync_run_query(
+            lambda: db_session.execute(
+                select(RewardFileLog.content_digest, RewardFileLog.file_name)
+                .where(
+                    RewardFileLog.file_agent_type == self.file_agent_type,
+                    RewardFileLog.content_digest.in_(content_digests),
+                    RewardFileLog.status == RewardFileLogStatuses.COMPLETED,
+                    RewardFileLog.file_name.startswith(f"{retailer.slug}/", autoescape=True),
+                )
+                .order_by(RewardFileLog.id.desc())
+            ).all(),
+            db_session,
+        )
+        # the earliest import of each content is kept
+        return dict(rows)
+
+    @staticmethod
+    def _get_content_md5(blob: "BlobProperties") -> str | None:
+        """The blob's Content-MD5, set on upload by most clients, allows checking its content before downloading it"""
+        content_md5 = blob.content_settings.content_md5
+        return bytes(content_md5).hex() if content_md5 else None
+
+    @staticmethod
+    def _can_resume(reward_file_log: RewardFileLog, blob: "BlobProperties") -> bool:
+        """
+        An interrupted import can be resumed as long as the blob has not been replaced since,
+        a failed one once the blob has been replaced, by the corrected file
+        """
+        if reward_file_log.status == RewardFileLogStatuses.FAILED:
+            return reward_file_log.blob_etag != blob.etag
+
+        return reward_file_log.status == RewardFileLogStatuses.IN_PROGRESS and reward_file_log.blob_etag == blob.etag
+
+    def _skip_applied_rows(
+        self, reward_file_log: RewardFileLog, blob: "BlobProperties", blob_lines: Iterable[str]
+    ) -> Iterable[str]:
+        """
+        Skips the rows of the corrected file that were applied from the failed one it replaces, the corrected
+        file's rows may not be at the same offsets so the checkpoint is moved to the end of the skipped rows.
+        """
+        lines = TrackedLines(blob_lines)
+        for _ in islice(lines, reward_file_log.rows_processed):
+            pass
+
+        reward_file_log.status = RewardFileLogStatuses.IN_PROGRESS
+        reward_file_log.blob_etag = blob.etag
+        reward_file_log.content_digest = self._get_content_md5(blob)
+        reward_file_log.bytes_processed = lines.offset
+        return lines
+
+    def _fail_partially_applied(
+        self, db_session: "Session", blob: "BlobProperties", report: ErrorReport, ex: Exception
+    ) -> None:
+        """
+        The batches committed before the file's content turned out to be invalid stay applied, along with the status
+        adjustment tasks enqueued for update files. The file's log is marked as failed, so that a corrected file
+        uploaded under the same name picks up after the applied rows instead of being flagged as a duplicate.
+        """
+        reward_file_log = self._get_reward_file_log(db_session, file_name=blob.name)
+        if reward_file_log is None:
+            # nothing was committed
+            return
+
+        reward_file_log.status = RewardFileLogStatuses.FAILED
+        sync_run_query(lambda: db_session.commit(), db_session)
+        report.add(
+            ErrorReason.PARTIALLY_APPLIED,
+            reward_file_log.rows_processed + 1,
+            detail=(
+                f"rows up to {reward_file_log.rows_processed} were applied before {ex!r}, "
+                "upload the whole corrected file under the same name to apply the remaining rows"
+            ),
+        )
+
+    @staticmethod
+    def _save_checkpoint(
+        db_session: "Session", reward_file_log: RewardFileLog, blob_lines: TrackedLines, row_num: int
+    ) -> None:
+        """Records the progress made so far, to be committed along with the rows it covers"""
+        reward_file_log.rows_processed = row_num
+        reward_file_log.bytes_processed = blob_lines.offset
+        db_session.flush()
 
     @staticmethod
     def _log_and_capture_msg(msg: str) -> None:
@@ -92,8 +322,23 @@ class BlobFileAgent:
         return sync_run_query(lambda: db_session.execute(select(Retailer)).scalars().all(), db_session)
 
     def process_csv(
-        self, retailer: Retailer, reward_file_log: RewardFileLog, blob_content: str, db_session: "Session"
+        self,
+        retailer: Retailer,
+        reward_file_log: RewardFileLog,
+        blob_lines: Iterable[str],
+        db_session: "Session",
+        *,
+        checkpoint: bool = False,
+        report: ErrorReport | None = None,
     ) -> None:  # pragma: no cover
+        """
+        Processes the file's lines from `reward_file_log`'s checkpoint onwards.
+
+        If `checkpoint` is set each batch is committed along with the file's progress, so that an interrupted
+        import can be resumed, otherwise the file may be processed in a single transaction.
+
+        Problems are added to `report`, to be sent once the file is moved, or sent straight away if it is not provided.
+        """
         raise NotImplementedError
 
     def move_blob(
@@ -103,24 +348,144 @@ class BlobFileAgent:
         src_blob_lease: "BlobLeaseClient",
         *,
         dst_blob_name: str | None = None,
+        report: ErrorReport | None = None,
     ) -> None:
+        """
+        Moves the processed blob to `destination_container`, or tags it in "tag" storage mode,
+        and stores the blob's error `report` next to where it was moved.
+        """
+        errored = destination_container == settings.BLOB_ERROR_CONTAINER
+        with stage("move"):
+            if settings.BLOB_IMPORT_STORAGE_MODE == "tag":
+                self.tag_blob("error" if errored else "archived", src_blob_client, src_blob_lease)
+            else:
+                dst_blob_name = dst_blob_name or self._get_dst_blob_name(src_blob_client.blob_name)
+                self._copy_blob(destination_container, src_blob_client, src_blob_lease, dst_blob_name)
 
-        with contextlib.suppress(ResourceExistsError):
-            self.blob_service_client.create_container(destination_container)
+        count_blob("errored" if errored else "archived")
+        if report is not None:
+            self._send_error_report(
+                report, destination_container, dst_blob_name or self._get_dst_blob_name(src_blob_client.blob_name)
+            )
 
-        dst_blob_client = self.blob_service_client.get_blob_client(
-            destination_container,
-            dst_blob_name
-            if dst_blob_name is not None
-            else f"{datetime.now(tz=timezone.utc).strftime('%Y/%m/%d/%H%M')}/{src_blob_client.blob_name}",
-        )
+    @staticmethod
+    def _get_dst_blob_name(blob_name: str) -> str:
+        return f"{datetime.now(tz=timezone.utc).strftime('%Y/%m/%d/%H%M')}/{blob_name}"
+
+    def _ensure_container(self, container_name: str) -> None:
+        if container_name not in self._created_containers:
+            with contextlib.suppress(ResourceExistsError):
+                self.blob_service_client.create_container(container_name)
+            self._created_containers.add(container_name)
+
+    def _copy_blob(
+        self,
+        destination_container: str,
+        src_blob_client: "BlobClient",
+        src_blob_lease: "BlobLeaseClient",
+        dst_blob_name: str,
+    ) -> None:
+        self._ensure_container(destination_container)
+        dst_blob_client = self.blob_service_client.get_blob_client(destination_container, dst_blob_name)
         dst_blob_client.start_copy_from_url(src_blob_client.url)  # Synchronous within the same storage account
         src_blob_client.delete_blob(lease=src_blob_lease)
 
-    def _do_import(self) -> None:  # pragma: no cover
+    def _send_error_report(self, report: ErrorReport, container_name: str, dst_blob_name: str) -> None:
+        if report.counts:
+            self._ensure_container(container_name)
+        report.send(self.blob_service_client, container_name, dst_blob_name)
+
+    @staticmethod
+    def tag_blob(state: str, blob_client: "BlobClient", blob_lease: "BlobLeaseClient") -> None:
+        """Marks the blob as processed where it is, in a single operation that leaves its content untouched"""
+        blob_client.set_blob_tags(
+            {
+                BLOB_STATE_TAG: state,
+                BLOB_PROCESSED_AT_TAG: datetime.now(tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            },
+            lease=blob_lease,
+        )
+
+    @staticmethod
+    def _get_blob_state(blob_client: "BlobClient", blob: "BlobProperties") -> str | None:
+        tags = blob.tags
+        if tags is None and blob.tag_count:
+            # the blob's properties were fetched without its tags
+            tags = blob_client.get_blob_tags()
+        return (tags or {}).get(BLOB_STATE_TAG)
+
+    def _run_import_unit(self, retailer: Retailer, blobs: list["BlobProperties"] | None) -> None:  # pragma: no cover
+        # the blob service and container clients are thread safe and shared, each worker only needs its own session
         with SyncSessionMaker() as db_session:
-            for retailer in self.get_retailers(db_session):
+            retailer = db_session.merge(retailer, load=False)
+            if blobs is None:
                 self.process_blobs(retailer, db_session)
+            else:
+                self.process_blob_group(retailer, blobs, db_session)
+
+    def _do_import(self) -> None:  # pragma: no cover
+        """
+        Processes blobs concurrently on up to `BLOB_IMPORT_MAX_WORKERS` threads, each using its own db session.
+
+        Each group of blobs is processed independently unless `process_retailer_blobs_in_order` is set,
+        in which case each retailer's blobs are processed one after the other by the same worker.
+        """
+
+        with SyncSessionMaker() as db_session:
+            retailers = self.get_retailers(db_session)
+
+        if self.process_retailer_blobs_in_order:
+            import_units: list[tuple[Retailer, list["BlobProperties"] | None]] = [
+                (retailer, None) for retailer in retailers
+            ]
+        else:
+            import_units = [
+                (retailer, blobs) for retailer in retailers for blobs in self.group_blobs(self.list_blobs(retailer))
+            ]
+
+        with ThreadPoolExecutor(
+            max_workers=settings.BLOB_IMPORT_MAX_WORKERS, thread_name_prefix=self.scheduler_name
+        ) as executor:
+            futures = {
+                executor.submit(self._run_import_unit, retailer, blobs): (retailer, blobs)
+                for retailer, blobs in import_units
+            }
+            for future in as_completed(futures):
+                if (ex := future.exception()) is not None:
+                    retailer, blobs = futures[future]
+                    blob_names = ", ".join(blob.name for blob in blobs) if blobs else "blobs"
+                    logger.exception(
+                        f"Unexpected error while processing {blob_names} for {retailer.slug}",
+                        exc_info=ex,
+                    )
+                    sentry_sdk.capture_exception(ex)
+
+    def _move_to_errors(  # noqa: PLR0913
+        self,
+        ex: Exception,
+        retailer: Retailer,
+        blob: "BlobProperties",
+        blob_client: BlobClient,
+        lease: BlobLeaseClient,
+        report: ErrorReport | None = None,
+    ) -> None:
+        """Reports why the blob's content could not be processed and moves it to the errors container"""
+        if isinstance(ex, RewardConfigNotActiveError):
+            self._log_and_capture_msg(
+                f"Received invalid set of {retailer.slug} reward codes to import due to non-active reward "
+                f"type: {ex.reward_slug}, moving to errors blob container for manual fix"
+            )
+        elif isinstance(ex, UnicodeDecodeError):
+            logger.error(
+                f"Problem decoding blob {blob.name} (files should be utf-8 encoded) - {ex}. "
+                f"Moving to {settings.BLOB_ERROR_CONTAINER}"
+            )
+        elif isinstance(ex, DecompressionError):
+            logger.error(f"Problem decompressing blob {blob.name} - {ex}. Moving to {settings.BLOB_ERROR_CONTAINER}")
+        else:
+            logger.error(f"Problem processing blob {blob.name} - {ex}. Moving to {settings.BLOB_ERROR_CONTAINER}")
+
+        self.move_blob(settings.BLOB_ERROR_CONTAINER, blob_client, lease, report=report)
 
     def _process_blob(
         self,
@@ -130,93 +495,211 @@ class BlobFileAgent:
         blob: "BlobProperties",
         blob_client: BlobClient,
         lease: BlobLeaseClient,
-        byte_content: bytes,
+        blob_chunks: Iterable[bytes],
+        downloaded: HashedChunks | None = None,
+        reward_file_log: RewardFileLog | None = None,
     ) -> None:
-        logger.debug(f"Processing blob {blob.name}.")
+        report = ErrorReport(blob.name)
+        blob_lines: Iterable[str] = iter_decoded_lines(blob_chunks)
         try:
-            reward_file_log = RewardFileLog(
-                file_name=blob.name,
-                file_agent_type=self.file_agent_type,
-            )
-            db_session.add(reward_file_log)
-            db_session.flush()
+            if reward_file_log is None:
+                logger.debug(f"Processing blob {blob.name}.")
+                reward_file_log = RewardFileLog(
+                    file_name=blob.name,
+                    file_agent_type=self.file_agent_type,
+                    blob_etag=blob.etag,
+                    content_digest=self._get_content_md5(blob),
+                )
+                db_session.add(reward_file_log)
+                db_session.flush()
+            elif reward_file_log.status == RewardFileLogStatuses.FAILED:
+                logger.info(f"Retrying failed blob {blob.name} from row {reward_file_log.rows_processed + 1}.")
+                blob_lines = self._skip_applied_rows(reward_file_log, blob, blob_lines)
+            else:
+                logger.info(f"Resuming blob {blob.name} from row {reward_file_log.rows_processed + 1}.")
+
             self.process_csv(
                 retailer=retailer,
                 reward_file_log=reward_file_log,
-                blob_content=byte_content.decode("utf-8", "strict"),
+                blob_lines=blob_lines,
                 db_session=db_session,
+                checkpoint=blob.size >= settings.BLOB_IMPORT_CHECKPOINT_MIN_SIZE,
+                report=report,
             )
-        except BlobProcessingError as ex:
-            logger.error(f"Problem processing blob {blob.name} - {ex}. Moving to {settings.BLOB_ERROR_CONTAINER}")
-            self.move_blob(settings.BLOB_ERROR_CONTAINER, blob_client, lease)
-            sync_run_query(lambda: db_session.rollback(), db_session)
-        except UnicodeDecodeError as ex:
-            logger.error(
-                f"Problem decoding blob {blob.name} (files should be utf-8 encoded) - {ex}. "
-                f"Moving to {settings.BLOB_ERROR_CONTAINER}"
-            )
-            self.move_blob(settings.BLOB_ERROR_CONTAINER, blob_client, lease)
+        except (BlobProcessingError, UnicodeDecodeError, DecompressionError) as ex:
             sync_run_query(lambda: db_session.rollback(), db_session)
+            self._fail_partially_applied(db_session, blob, report, ex)
+            self._move_to_errors(ex, retailer, blob, blob_client, lease, report)
         except RewardConfigNotActiveError as ex:
-            self._log_and_capture_msg(
-                f"Received invalid set of {retailer.slug} reward codes to import due to non-active reward "
-                f"type: {ex.reward_slug}, moving to errors blob container for manual fix"
-            )
-            self.move_blob(settings.BLOB_ERROR_CONTAINER, blob_client, lease)
+            self._move_to_errors(ex, retailer, blob, blob_client, lease, report)
         else:
+            if reward_file_log.content_digest is None and downloaded is not None and downloaded.exhausted:
+                reward_file_log.content_digest = downloaded.hexdigest()
+                sync_run_query(lambda: db_session.commit(), db_session)
+
             logger.debug(f"Archiving blob {blob.name}.")
-            self.move_blob(settings.BLOB_ARCHIVE_CONTAINER, blob_client, lease)
+            self.move_blob(settings.BLOB_ARCHIVE_CONTAINER, blob_client, lease, report=report)
 
-    def process_blobs(self, retailer: Retailer, db_session: "Session") -> None:
-        for blob in self.container_client.list_blobs(
-            name_starts_with=self.blob_path_template.substitute(retailer_slug=retailer.slug)
-        ):
-            blob_client = self.blob_service_client.get_blob_client(self.container_name, blob.name)
+    def _report_content_duplicate(
+        self, blob: "BlobProperties", original_file_name: str, blob_client: BlobClient, lease: BlobLeaseClient
+    ) -> None:
+        self._log_and_capture_msg(
+            f"{blob.name} has the same content as the already imported {original_file_name}. "
+            f"Moving to {settings.BLOB_ERROR_CONTAINER} for checking"
+        )
+        self.move_blob(settings.BLOB_ERROR_CONTAINER, blob_client, lease)
 
-            try:
-                lease = blob_client.acquire_lease(lease_duration=settings.BLOB_CLIENT_LEASE_SECONDS)
-            except HttpResponseError:
-                msg = f"Skipping blob {blob.name} as we could not acquire a lease."
-                logger.warning(msg)
-                if settings.SENTRY_DSN:
-                    sentry_sdk.capture_message(msg)
-                continue
-
-            if self._blob_name_is_duplicate(db_session, file_name=blob.name):
-                self._log_and_capture_msg(
-                    f"{blob.name} is a duplicate. Moving to {settings.BLOB_ERROR_CONTAINER} for checking"
-                )
-                self.move_blob(settings.BLOB_ERROR_CONTAINER, blob_client, lease)
-                continue
+    def _is_processed(self, blob: "BlobProperties") -> bool:
+        """Whether the blob was tagged as processed, in "tag" storage mode"""
+        if settings.BLOB_IMPORT_STORAGE_MODE != "tag":
+            return False
 
-            if not blob.name.endswith(".csv"):
-                self._log_and_capture_msg(
-                    f"{blob.name} does not have .csv ext. Moving to {settings.BLOB_ERROR_CONTAINER} for checking"
-                )
-                self.move_blob(settings.BLOB_ERROR_CONTAINER, blob_client, lease)
-                continue
+        blob_client = self.blob_service_client.get_blob_client(self.container_name, blob.name)
+        return self._get_blob_state(blob_client, blob) is not None
+
+    def _acquire_blob(self, blob: "BlobProperties") -> tuple[BlobClient, BlobLeaseClient] | None:
+        """Leases the blob, unless it is already processed or leased by another process"""
+        if self._is_processed(blob):
+            logger.debug(f"Skipping blob {blob.name} as it was already processed.")
+            return None
+
+        blob_client = self.blob_service_client.get_blob_client(self.container_name, blob.name)
+        try:
+            lease = blob_client.acquire_lease(lease_duration=settings.BLOB_CLIENT_LEASE_SECONDS)
+        except HttpResponseError:
+            msg = f"Skipping blob {blob.name} as we could not acquire a lease."
+            logger.warning(msg)
+            if settings.SENTRY_DSN:
+                sentry_sdk.capture_message(msg)
+            return None
+
+        count_blob("processed")
+        return blob_client, lease
+
+    def process_blob(self, retailer: Retailer, blob: "BlobProperties", db_session: "Session") -> bool:
+        """Processes the blob, returns False if it was left to the process holding its lease"""
+        with track_blob_metrics(self.file_agent_type, retailer.slug):
+            return self._handle_blob(retailer, blob, db_session)
+
+    def _handle_blob(self, retailer: Retailer, blob: "BlobProperties", db_session: "Session") -> bool:
+        if (acquired := self._acquire_blob(blob)) is None:
+            return self._is_processed(blob)
+
+        blob_client, lease = acquired
+        reward_file_log = self._get_reward_file_log(db_session, file_name=blob.name)
+        if reward_file_log is not None and not self._can_resume(reward_file_log, blob):
+            self._log_and_capture_msg(
+                f"{blob.name} is a duplicate. Moving to {settings.BLOB_ERROR_CONTAINER} for checking"
+            )
+            self.move_blob(settings.BLOB_ERROR_CONTAINER, blob_client, lease)
+            return True
+
+        if not blob.name.endswith(SUPPORTED_FILE_EXTENSIONS):
+            self._log_and_capture_msg(
+                f"{blob.name} does not have .csv ext. Moving to {settings.BLOB_ERROR_CONTAINER} for checking"
+            )
+            self.move_blob(settings.BLOB_ERROR_CONTAINER, blob_client, lease)
+            return True
 
-            byte_content = blob_client.download_blob(lease=lease).readall()
+        if (
+            reward_file_log is None
+            and (content_digest := self._get_content_md5(blob)) is not None
+            and (original := self._get_content_duplicates(db_session, retailer, [content_digest]).get(content_digest))
+        ):
+            self._report_content_duplicate(blob, original, blob_client, lease)
+            return True
+
+        # an interrupted import is resumed from the last line it committed, a failed one is read again from the start
+        offset = (
+            reward_file_log.bytes_processed
+            if reward_file_log is not None and reward_file_log.status == RewardFileLogStatuses.IN_PROGRESS
+            else 0
+        )
+        with tracer.start_as_current_span(
+            f"process_{self.file_agent_type.value}_blob",
+            attributes={"blob_name": blob.name, "retailer_slug": retailer.slug},
+        ), memory_delta(f"process_{self.file_agent_type.value}_blob"), auto_renew_lease(lease):
+            blob_chunks, downloaded = self._download_chunks(blob_client, blob, lease, offset)
             self._process_blob(
                 db_session,
                 retailer=retailer,
                 blob=blob,
                 blob_client=blob_client,
                 lease=lease,
-                byte_content=byte_content,
+                blob_chunks=blob_chunks,
+                downloaded=downloaded,
+                reward_file_log=reward_file_log,
             )
 
+        return True
+
+    @staticmethod
+    def _is_compressed(blob: "BlobProperties") -> bool:
+        content_encoding = blob.content_settings.content_encoding or ""
+        return (
+            blob.name.endswith(COMPRESSED_FILE_EXTENSIONS) or content_encoding.lower() in COMPRESSED_CONTENT_ENCODINGS
+        )
+
+    @classmethod
+    def _download_chunks(
+        cls, blob_client: BlobClient, blob: "BlobProperties", lease: BlobLeaseClient, offset: int
+    ) -> tuple[Iterable[bytes], HashedChunks | None]:
+        """
+        Returns the blob's content from the given offset in its uncompressed content,
+        along with the downloaded content's running digest when the blob is downloaded whole.
+        """
+        if cls._is_compressed(blob):
+            # compressed content can't be read from an arbitrary offset, it is decompressed and skipped instead
+            downloaded = HashedChunks(cls._download(blob_client, lease, offset=0))
+            return skip_bytes(iter_decompressed(downloaded), offset), downloaded
+
+        if offset >= blob.size:
+            return [], None
+
+        blob_chunks = cls._download(blob_client, lease, offset=offset)
+        if offset:
+            return blob_chunks, None
+
+        downloaded = HashedChunks(blob_chunks)
+        return downloaded, downloaded
+
+    @staticmethod
+    def _download(blob_client: BlobClient, lease: BlobLeaseClient, *, offset: int) -> Iterable[bytes]:
+        with stage("download"):
+            downloader = blob_client.download_blob(offset=offset, lease=lease)
+        return timed_download(downloader.chunks())
+
+    def list_blobs(self, retailer: Retailer) -> Iterable["BlobProperties"]:
+        blobs = self.container_client.list_blobs(
+            name_starts_with=self.blob_path_template.substitute(retailer_slug=retailer.slug),
+            include=["tags"] if settings.BLOB_IMPORT_STORAGE_MODE == "tag" else None,
+        )
+        return count_listed_blobs(blobs, self.file_agent_type, retailer.slug)
+
+    def group_blobs(self, blobs: Iterable["BlobProperties"]) -> list[list["BlobProperties"]]:
+        """Groups the blobs to be processed together, each blob is processed on its own by default"""
+        return [[blob] for blob in blobs]
+
+    def process_blob_group(self, retailer: Retailer, blobs: list["BlobProperties"], db_session: "Session") -> None:
+        for blob in blobs:
+            self.process_blob(retailer, blob, db_session)
+
+    def process_blobs(self, retailer: Retailer, db_session: "Session") -> None:
+        for blobs in self.group_blobs(self.list_blobs(retailer)):
+            self.process_blob_group(retailer, blobs, db_session)
+
 
 class RewardImportAgent(BlobFileAgent):
     """
     File name format (expiry date optional):
 
-        `rewards.import.<reward slug>[.expires.yyyy-mm-dd].<any suffix>.csv`
+        `rewards.import.<reward slug>[.expires.yyyy-mm-dd].<any suffix>.csv[.gz|.zst]`
 
     Examples:
 
         - ``rewards.import.viator.batch1.csv`` (rewards do not expire)
         - ``rewards.import.viator.expires.2023-12-31.batch1.csv`` (rewards expire 2023-12-31)
+        - ``rewards.import.viator.batch2.csv.gz`` (gzip compressed, `.csv.zst` for zstd)
 
     File content example (one code per line):
 
@@ -228,7 +711,7 @@ class RewardImportAgent(BlobFileAgent):
     ```
     """
 
-    blob_path_template = string.Template("$retailer_slug/rewards.import.")
+    blob_path_template = IMPORT_BLOB_PATH_TEMPLATE
     scheduler_name = "carina-reward-import-scheduler"
 
     def __init__(self) -> None:
@@ -236,143 +719,294 @@ class RewardImportAgent(BlobFileAgent):
         self.file_agent_type = FileAgentType.IMPORT
 
     @acquire_lock(runner=cron_scheduler)
+    @memory_profiled("reward-import")
     def do_import(self) -> None:  # pragma: no cover
         super()._do_import()
 
     @lru_cache  # noqa: B019
     def reward_configs_by_reward_id(self, retailer_id: int, db_session: "Session") -> dict[str, RewardConfig]:
-        reward_configs = sync_run_query(
-            lambda: db_session.execute(select(RewardConfig).where(RewardConfig.retailer_id == retailer_id))
-            .scalars()
-            .all(),
-            db_session,
-        )
-        return {reward_config.reward_slug: reward_config for reward_config in reward_configs}
-
-    @staticmethod
-    def _get_expiry_date(sub_blob_name: str, blob_name: str) -> date | None:
-        if ".expires." in sub_blob_name:
-            try:
-                extracted_date = sub_blob_name.split(".expires.")[1].split(".")[0]
-                expiry_date = datetime.strptime(extracted_date, "%Y-%m-%d").astimezone().date()
-            except ValueError as ex:
-                raise BlobProcessingError(f"Invalid filename, expiry date is invalid: {blob_name}") from ex
-        else:
-            expiry_date = None
-        return expiry_date
-
-    @staticmethod
-    def _report_pre_existing_codes(
-        pre_existing_reward_codes: list[str], row_nums_by_code: dict[str, list[int]], blob_name: str
-    ) -> None:
-        msg = f"Pre-existing reward codes found in {blob_name}:\n" + "\n".join(
-            [f"rows: {', '.join(map(str, row_nums_by_code[code]))}" for code in pre_existing_reward_codes]
-        )
-        logger.warning(msg)
-        if settings.SENTRY_DSN:
-            sentry_sdk.capture_message(msg)
+        return get_reward_configs_by_slug(db_session, retailer_id)
 
     @staticmethod
-    def _report_invalid_rows(invalid_rows: list[int], blob_name: str) -> None:
-        if invalid_rows:
-            sentry_sdk.capture_message(
-                f"Invalid rows found in {blob_name}:\nrows: {', '.join(map(str, sorted(invalid_rows)))}"
-            )
-
-    def _get_reward_codes_and_report_invalid(
-        self,
+    def _add_new_rewards(
         db_session: "Session",
         *,
         retailer: Retailer,
         reward_config: RewardConfig,
-        blob_name: str,
-        blob_content: str,
-    ) -> tuple[list[str], defaultdict[str, list[int]]]:
-        content_reader = csv.reader(StringIO(blob_content), delimiter=",", quotechar="|")
-        invalid_rows: list[int] = []
-
-        row_nums_by_code: defaultdict[str, list[int]] = defaultdict(list)
-        for row_num, row in enumerate(content_reader, start=1):
-            if len(row) != 1:
-                invalid_rows.append(row_num)
-            elif code := row[0].strip():
-                row_nums_by_code[code].append(row_num)
-
-        db_reward_codes = sync_run_query(
-            lambda: db_session.execute(
-                select(Reward.code).where(
-                    or_(
-                        and_(
-                            Reward.code.in_(row_nums_by_code.keys()),
-                            Reward.retailer_id == retailer.id,
-                            Reward.reward_config_id == reward_config.id,
-                        ),
-                        and_(Reward.reward_config_id != reward_config.id, not_(Reward.deleted)),
-                        and_(Reward.reward_config_id == reward_config.id, Reward.deleted),
-                    )
-                )
+        reward_file_log: RewardFileLog,
+        expiry_date: date | None,
+        row_nums_by_code: dict[str, list[int]],
+    ) -> dict[str, list[int]]:
+        """Inserts a batch of codes, without committing, and returns the row numbers of any pre-existing code"""
+
+        maybe_existing = get_maybe_existing_codes(retailer.id, row_nums_by_code.keys())
+
+        def _insert() -> tuple[set[str], set[str]]:
+            stage_reward_codes(db_session, row_nums_by_code.keys(), maybe_existing)
+            # codes repeated in the file and inserted from an earlier batch are not pre-existing
+            added_from_file = get_staged_codes_from_file(
+                db_session,
+                reward_config_id=reward_config.id,
+                retailer_id=retailer.id,
+                reward_file_log_id=reward_file_log.id,
             )
-            .scalars()
-            .all(),
-            db_session,
-        )
+            inserted_codes = insert_staged_reward_codes(
+                db_session,
+                reward_config_id=reward_config.id,
+                retailer_id=retailer.id,
+                expiry_date=expiry_date,
+                reward_file_log_id=reward_file_log.id,
+            )
+            add_codes(retailer.id, inserted_codes)
+            return inserted_codes, added_from_file
 
-        self._report_invalid_rows(invalid_rows, blob_name)
-        return db_reward_codes, row_nums_by_code
+        inserted_codes, added_from_file = sync_run_query(_insert, db_session, attempts=1)
+        count_rows("inserted", len(inserted_codes))
+        pre_existing_reward_codes = row_nums_by_code.keys() - inserted_codes - added_from_file
+        return {code: row_nums_by_code[code] for code in pre_existing_reward_codes}
 
     def process_csv(
-        self, retailer: Retailer, reward_file_log: RewardFileLog, blob_content: str, db_session: "Session"
+        self,
+        retailer: Retailer,
+        reward_file_log: RewardFileLog,
+        blob_lines: Iterable[str],
+        db_session: "Session",
+        *,
+        checkpoint: bool = False,
+        report: ErrorReport | None = None,
     ) -> None:
         blob_name = reward_file_log.file_name
-        try:
-            _, sub_blob_name = blob_name.split(self.blob_path_template.substitute(retailer_slug=retailer.slug))
-        except ValueError as ex:
-            raise BlobProcessingError(f"Invalid filename, path does not match blob path template: {blob_name}") from ex
-        try:
-            reward_slug = sub_blob_name.split(".", 1)[0]
-            reward_config = self.reward_configs_by_reward_id(retailer.id, db_session)[reward_slug]
-        except KeyError as ex:
-            raise BlobProcessingError(f"No RewardConfig found for reward_slug {reward_slug}") from ex
+        reward_config, expiry_date = get_reward_config_and_expiry_date(
+            self.reward_configs_by_reward_id(retailer.id, db_session), retailer, blob_name
+        )
 
-        if reward_config.status != RewardTypeStatuses.ACTIVE:
-            raise RewardConfigNotActiveError(reward_slug=reward_slug)
+        # Rows are read and inserted in batches so that memory usage does not depend on the file size. Unless
+        # checkpointing, the whole file is imported in a single transaction so that a failure part way through
+        # does not import anything. Batch queries are therefore not retried on a new connection as the earlier
+        # batches would be lost.
+        file_report = report if report is not None else ErrorReport(blob_name)
+        lines = TrackedLines(blob_lines, offset=reward_file_log.bytes_processed)
+        content_reader = csv.reader(lines, delimiter=",", quotechar="|")
+        row_num = reward_file_log.rows_processed
+        batches = batched(enumerate(content_reader, start=row_num + 1), settings.BLOB_IMPORT_BATCH_SIZE)
+        for batch in timed_iter(batches, "parse"):
+            count_rows("parsed", len(batch))
+            invalid_rows: list[tuple[int, list[str]]] = []
+            with stage("parse"):
+                row_nums_by_code = get_row_nums_by_code(batch, invalid_rows)
+            report_invalid_rows(file_report, invalid_rows)
+
+            with stage("db"):
+                if row_nums_by_code and (
+                    pre_existing_row_nums_by_code := self._add_new_rewards(
+                        db_session,
+                        retailer=retailer,
+                        reward_config=reward_config,
+                        reward_file_log=reward_file_log,
+                        expiry_date=expiry_date,
+                        row_nums_by_code=row_nums_by_code,
+                    )
+                ):
+                    report_pre_existing_codes(file_report, pre_existing_row_nums_by_code)
 
-        expiry_date = self._get_expiry_date(sub_blob_name, blob_name)
+                row_num = batch[-1][0]
+                if checkpoint:
+                    self._save_checkpoint(db_session, reward_file_log, lines, row_num)
+                    sync_run_query(lambda: db_session.commit(), db_session, attempts=1)
 
-        db_reward_codes, row_nums_by_code = self._get_reward_codes_and_report_invalid(
-            db_session, retailer=retailer, reward_config=reward_config, blob_name=blob_name, blob_content=blob_content
-        )
+        with stage("db"):
+            self._save_checkpoint(db_session, reward_file_log, lines, row_num)
+            reward_file_log.status = RewardFileLogStatuses.COMPLETED
+            sync_run_query(lambda: db_session.commit(), db_session, attempts=1)
 
-        pre_existing_reward_codes = list(set(db_reward_codes) & set(row_nums_by_code.keys()))
-        if pre_existing_reward_codes:
-            self._report_pre_existing_codes(pre_existing_reward_codes, row_nums_by_code, blob_name)
-            for pre_existing_code in pre_existing_reward_codes:
-                row_nums_by_code.pop(pre_existing_code)
+        if report is None:
+            self._send_error_report(file_report, settings.BLOB_ARCHIVE_CONTAINER, self._get_dst_blob_name(blob_name))
 
-        new_rewards: list[Reward] = [
-            Reward(
-                code=code,
-                reward_config_id=reward_config.id,
-                retailer_id=retailer.id,
-                expiry_date=expiry_date,
-                reward_file_log_id=reward_file_log.id,
+    @staticmethod
+    def _get_reward_slug(blob_name: str) -> str:
+        return blob_name.partition("/rewards.import.")[2].split(".", 1)[0]
+
+    def group_blobs(self, blobs: Iterable["BlobProperties"]) -> list[list["BlobProperties"]]:
+        """Small files are grouped by reward slug, in batches imported together by `process_small_blobs`"""
+        groups: list[list["BlobProperties"]] = []
+        small_blobs_by_reward_slug: defaultdict[str, list["BlobProperties"]] = defaultdict(list)
+        for blob in blobs:
+            if blob.size < settings.BLOB_IMPORT_SMALL_FILE_MAX_SIZE and blob.name.endswith(SUPPORTED_FILE_EXTENSIONS):
+                small_blobs_by_reward_slug[self._get_reward_slug(blob.name)].append(blob)
+            else:
+                groups.append([blob])
+
+        for small_blobs in small_blobs_by_reward_slug.values():
+            groups.extend(batched(small_blobs, settings.BLOB_IMPORT_SMALL_FILES_BATCH_SIZE))
+
+        return groups
+
+    def process_blob_group(self, retailer: Retailer, blobs: list["BlobProperties"], db_session: "Session") -> None:
+        if len(blobs) > 1:
+            self.process_small_blobs(retailer, blobs, db_session)
+        else:
+            super().process_blob_group(retailer, blobs, db_session)
+
+    def process_small_blobs(self, retailer: Retailer, blobs: list["BlobProperties"], db_session: "Session") -> None:
+        """
+        Imports small files together, sharing their duplicate checks, bulk insert and commit.
+        Each file keeps its own RewardFileLog and is archived, or moved to the errors container, on its own.
+        """
+        logged_file_names = set(
+            sync_run_query(
+                lambda: db_session.execute(
+                    select(RewardFileLog.file_name).where(
+                        RewardFileLog.file_agent_type == self.file_agent_type,
+                        RewardFileLog.file_name.in_([blob.name for blob in blobs]),
+                    )
+                )
+                .scalars()
+                .all(),
+                db_session,
             )
-            for code in set(row_nums_by_code)
-            if code  # caters for blank lines
-        ]
+        )
+        content_duplicates = self._get_content_duplicates(
+            db_session, retailer, [content_digest for blob in blobs if (content_digest := self._get_content_md5(blob))]
+        )
+
+        # duplicate file names are reported, and interrupted imports resumed, on their own
+        for blob in blobs:
+            if blob.name in logged_file_names:
+                self.process_blob(retailer, blob, db_session)
+
+        reward_files: list[SmallRewardFile] = []
+        with contextlib.ExitStack() as leases, tracer.start_as_current_span(
+            "process_import_blob_batch", attributes={"retailer_slug": retailer.slug, "blob_count": len(blobs)}
+        ), track_blob_metrics(self.file_agent_type, retailer.slug):
+            for blob in blobs:
+                if blob.name not in logged_file_names and (acquired := self._acquire_blob(blob)) is not None:
+                    blob_client, lease = acquired
+                    leases.enter_context(auto_renew_lease(lease))
+                    if original := content_duplicates.get(self._get_content_md5(blob) or ""):
+                        self._report_content_duplicate(blob, original, blob_client, lease)
+                    elif reward_file := self._read_small_blob(retailer, blob, blob_client, lease, db_session):
+                        reward_files.append(reward_file)
+
+            imported = not reward_files or self._import_small_files(retailer, reward_files, db_session)
+
+        if not imported:
+            # the files are imported one by one instead, isolating any file responsible for the failure
+            for reward_file in reward_files:
+                reward_file.lease.release()
+                self.process_blob(retailer, reward_file.blob, db_session)
+
+    def _read_small_blob(  # noqa: PLR0913
+        self,
+        retailer: Retailer,
+        blob: "BlobProperties",
+        blob_client: BlobClient,
+        lease: BlobLeaseClient,
+        db_session: "Session",
+    ) -> SmallRewardFile | None:
+        """Reads and validates a small file whole, a file that can't be imported is moved to the errors container"""
+        invalid_rows: list[tuple[int, list[str]]] = []
+        try:
+            reward_config, expiry_date = get_reward_config_and_expiry_date(
+                self.reward_configs_by_reward_id(retailer.id, db_session), retailer, blob.name
+            )
+            with stage("download"):
+                content = blob_client.download_blob(lease=lease).readall()
+            # the content is read whole, its bytes are only counted
+            downloaded = HashedChunks(timed_download([content]))
+            with stage("parse"):
+                lines = TrackedLines(iter_decoded_lines(iter_decompressed(downloaded)))
+                rows = list(enumerate(csv.reader(lines, delimiter=",", quotechar="|"), start=1))
+                row_nums_by_code = get_row_nums_by_code(rows, invalid_rows)
+        except (BlobProcessingError, UnicodeDecodeError, DecompressionError, RewardConfigNotActiveError) as ex:
+            self._move_to_errors(ex, retailer, blob, blob_client, lease)
+            return None
+
+        reward_file_log = RewardFileLog(
+            file_name=blob.name,
+            file_agent_type=self.file_agent_type,
+            status=RewardFileLogStatuses.COMPLETED,
+            blob_etag=blob.etag,
+            rows_processed=len(rows),
+            bytes_processed=lines.offset,
+            content_digest=downloaded.hexdigest(),
+        )
+        db_session.add(reward_file_log)
+        return SmallRewardFile(
+            blob=blob,
+            blob_client=blob_client,
+            lease=lease,
+            reward_file_log=reward_file_log,
+            reward_config=reward_config,
+            expiry_date=expiry_date,
+            row_nums_by_code=row_nums_by_code,
+            invalid_rows=invalid_rows,
+        )
+
+    def _import_small_files(
+        self, retailer: Retailer, reward_files: list[SmallRewardFile], db_session: "Session"
+    ) -> bool:
+        """
+        Inserts the files' codes and commits them along with the files' logs, then reports on and archives each file.
+        Returns False, with nothing imported, if the shared transaction failed.
+        """
+
+        def _insert() -> dict[int, set[str]]:
+            db_session.flush()
+            files_by_reward_config_id: defaultdict[int, list[RewardCodesFile]] = defaultdict(list)
+            for reward_file in reward_files:
+                files_by_reward_config_id[reward_file.reward_config.id].append(
+                    RewardCodesFile(
+                        reward_file_log_id=reward_file.reward_file_log.id,
+                        expiry_date=reward_file.expiry_date,
+                        codes=reward_file.row_nums_by_code.keys(),
+                    )
+                )
+
+            inserted_codes_by_file: dict[int, set[str]] = {}
+            for reward_config_id, files in files_by_reward_config_id.items():
+                inserted_codes_by_config = bulk_insert_reward_code_files(
+                    db_session,
+                    files=files,
+                    reward_config_id=reward_config_id,
+                    retailer_id=retailer.id,
+                    maybe_existing=get_maybe_existing_codes(retailer.id, {code for f in files for code in f.codes}),
+                )
+                add_codes(retailer.id, (code for codes in inserted_codes_by_config.values() for code in codes))
+                inserted_codes_by_file |= inserted_codes_by_config
 
-        def add_new_rewards() -> None:
-            db_session.add_all(new_rewards)
             db_session.commit()
+            return inserted_codes_by_file
 
-        sync_run_query(add_new_rewards, db_session)
+        try:
+            with stage("db"):
+                inserted_codes_by_file = sync_run_query(_insert, db_session, attempts=1)
+        except DBAPIError:
+            logger.warning(f"Failed to import {len(reward_files)} {retailer.slug} files together.")
+            return False
+
+        for reward_file in reward_files:
+            blob_name = reward_file.blob.name
+            report = ErrorReport(blob_name)
+            count_rows("parsed", reward_file.reward_file_log.rows_processed)
+            report_invalid_rows(report, reward_file.invalid_rows)
+            inserted_codes = inserted_codes_by_file.get(reward_file.reward_file_log.id, set())
+            count_rows("inserted", len(inserted_codes))
+            if pre_existing_row_nums_by_code := {
+                code: row_nums for code, row_nums in reward_file.row_nums_by_code.items() if code not in inserted_codes
+            }:
+                report_pre_existing_codes(report, pre_existing_row_nums_by_code)
+
+            logger.debug(f"Archiving blob {blob_name}.")
+            self.move_blob(settings.BLOB_ARCHIVE_CONTAINER, reward_file.blob_client, reward_file.lease, report=report)
+
+        return True
 
 
 class RewardUpdatesAgent(BlobFileAgent):
     """
     File name format (expiry date optional):
 
-        `rewards.update.<any suffix>.csv`
+        `rewards.update.<any suffix>.csv[.gz|.zst]`
 
     Example:
 
@@ -389,83 +1023,114 @@ class RewardUpdatesAgent(BlobFileAgent):
 
     blob_path_template = string.Template("$retailer_slug/rewards.update.")
     scheduler_name = "carina-reward-update-scheduler"
+    # a retailer's update files must be applied in the order they were uploaded, see `group_blobs`
+    process_retailer_blobs_in_order = True
 
     def __init__(self) -> None:
         super().__init__()
         self.file_agent_type = FileAgentType.UPDATE
 
+    def group_blobs(self, blobs: Iterable["BlobProperties"]) -> list[list["BlobProperties"]]:
+        """Blobs are listed by name, update files are processed in the order they were uploaded instead"""
+        return [[blob] for blob in sorted(blobs, key=lambda blob: (blob.creation_time, blob.name))]
+
+    def process_blobs(self, retailer: Retailer, db_session: "Session") -> None:
+        """
+        Stops at the first blob leased by another process, e.g. the blob event listener or an overlapping sweep,
+        the later update files are left for that process to apply once it is done with it.
+        """
+        for blobs in self.group_blobs(self.list_blobs(retailer)):
+            for blob in blobs:
+                if not self.process_blob(retailer, blob, db_session):
+                    logger.info(f"Leaving {retailer.slug}'s update files after {blob.name} to its lease holder.")
+                    return
+
     @acquire_lock(runner=cron_scheduler)
+    @memory_profiled("reward-updates")
     def do_import(self) -> None:  # pragma: no cover
         super()._do_import()
 
     def process_csv(
-        self, retailer: Retailer, reward_file_log: RewardFileLog, blob_content: str, db_session: "Session"
+        self,
+        retailer: Retailer,
+        reward_file_log: RewardFileLog,
+        blob_lines: Iterable[str],
+        db_session: "Session",
+        *,
+        checkpoint: bool = False,  # noqa: ARG002
+        report: ErrorReport | None = None,
     ) -> None:
         blob_name = reward_file_log.file_name
-        content_reader = csv.reader(StringIO(blob_content), delimiter=",", quotechar="|")
-
-        # This is a defaultdict(list) incase we encounter the reward code twice in one file
-        reward_update_rows_by_code: defaultdict = defaultdict(list[RewardUpdateRow])
-        invalid_rows: list[tuple[int, Exception]] = []
-        for row_num, row in enumerate(content_reader, start=1):
-            try:
-                data = RewardUpdateSchema(
-                    code=row[0].strip(),
-                    date=row[1].strip(),
-                    status=RewardUpdateStatuses(row[2].strip().lower()),
-                )
-            except (ValidationError, IndexError, ValueError) as ex:
-                invalid_rows.append((row_num, ex))
-            else:
-                reward_update_rows_by_code[data.dict()["code"]].append(RewardUpdateRow(data, row_num=row_num))
+        lines = TrackedLines(blob_lines, offset=reward_file_log.bytes_processed)
+        content_reader = csv.reader(lines, delimiter=",", quotechar="|")
+
+        # Rows are read and processed in batches so that memory usage does not depend on the file size,
+        # each batch's reward updates are committed and their status adjustment tasks enqueued in turn,
+        # followed by the file's checkpoint. Update files are therefore always checkpointed, a batch
+        # interrupted before its checkpoint is committed is processed again when the file is resumed.
+        file_report = report if report is not None else ErrorReport(blob_name)
+        found_reward_updates = False
+        row_num = reward_file_log.rows_processed
+        batches = batched(enumerate(content_reader, start=row_num + 1), settings.BLOB_IMPORT_BATCH_SIZE)
+        for batch in timed_iter(batches, "parse"):
+            with stage("parse"):
+                reward_update_rows_by_code, batch_invalid_rows = parse_reward_update_rows(batch)
+            count_rows("parsed", len(batch))
+            count_rows("invalid", len(batch_invalid_rows))
+            for invalid_row_num, ex in batch_invalid_rows:
+                file_report.add(ErrorReason.INVALID_ROW, invalid_row_num, detail=repr(ex))
+
+            with stage("db"):
+                if reward_update_rows_by_code:
+                    found_reward_updates = True
+                    self._process_updates(
+                        db_session=db_session,
+                        retailer=retailer,
+                        reward_update_rows_by_code=reward_update_rows_by_code,
+                        blob_name=blob_name,
+                        report=file_report,
+                    )
 
-        if invalid_rows:
-            msg = f"Error validating RewardUpdate from CSV file {blob_name}:\n" + "\n".join(
-                [f"row {row_num}: {err!r}" for row_num, err in invalid_rows]
-            )
-            logger.warning(msg)
-            if settings.SENTRY_DSN:
-                sentry_sdk.capture_message(msg)
+                row_num = batch[-1][0]
+                self._save_checkpoint(db_session, reward_file_log, lines, row_num)
+                sync_run_query(lambda: db_session.commit(), db_session)
 
-        if not reward_update_rows_by_code:
+        if not found_reward_updates:
             logger.warning(f"No relevant reward updates found in blob: {blob_name}")
 
-        self._process_updates(
-            db_session=db_session,
-            retailer=retailer,
-            reward_update_rows_by_code=reward_update_rows_by_code,
-            blob_name=blob_name,
-        )
+        reward_file_log.status = RewardFileLogStatuses.COMPLETED
+        sync_run_query(lambda: db_session.commit(), db_session)
+        if report is None:
+            self._send_error_report(file_report, settings.BLOB_ARCHIVE_CONTAINER, self._get_dst_blob_name(blob_name))
 
     @staticmethod
     def _report_unknown_codes(
         reward_codes_in_file: list[str],
         db_reward_data_by_code: dict[str, dict[str, str | bool]],
-        reward_update_rows_by_code: defaultdict[str, list[RewardUpdateRow]],
-        blob_name: str,
+        reward_update_rows_by_code: dict[str, list[RewardUpdateRow]],
+        report: ErrorReport,
     ) -> None:
         unknown_reward_codes = list(set(reward_codes_in_file) - set(db_reward_data_by_code.keys()))
         reward_update_row_datas: list[RewardUpdateRow]
-        if unknown_reward_codes:
-            row_nums = []
-            for unknown_reward_code in unknown_reward_codes:
-                reward_update_row_datas = reward_update_rows_by_code.pop(unknown_reward_code, [])
-                row_nums.extend([update_row.row_num for update_row in reward_update_row_datas])
-
-            msg = f"Unknown reward codes found while processing {blob_name}, rows: {', '.join(map(str, row_nums))}"
-            logger.warning(msg)
-            if settings.SENTRY_DSN:
-                sentry_sdk.capture_message(msg)
+        for unknown_reward_code in unknown_reward_codes:
+            reward_update_row_datas = reward_update_rows_by_code.pop(unknown_reward_code, [])
+            count_rows("unknown", len(reward_update_row_datas))
+            for update_row in reward_update_row_datas:
+                report.add(
+                    ErrorReason.UNKNOWN_CODE,
+                    update_row.row_num,
+                    code=unknown_reward_code,
+                    status=update_row.data.status.value,
+                )
 
     @staticmethod
     def _process_unallocated_codes(
         db_session: "Session",
         *,
-        retailer: Retailer,
-        blob_name: str,
+        report: ErrorReport,
         reward_codes_in_file: list[str],
         db_reward_data_by_code: dict[str, dict[str, str | bool]],
-        reward_update_rows_by_code: defaultdict[str, list[RewardUpdateRow]],
+        reward_update_rows_by_code: dict[str, list[RewardUpdateRow]],
     ) -> None:
         if unallocated_reward_codes := list(
             set(reward_codes_in_file)
@@ -476,38 +1141,90 @@ class RewardUpdatesAgent(BlobFileAgent):
                 rows = reward_update_rows_by_code.pop(unallocated_reward_code, [])
                 update_rows.extend(rows)
 
+            # the rewards are updated by the ids locked by `_select_rewards_for_update`
             db_session.execute(
                 update(Reward)
-                .where(Reward.code.in_(unallocated_reward_codes), Reward.retailer_id == retailer.id)
+                .where(
+                    Reward.id.in_(
+                        [uuid.UUID(cast(str, db_reward_data_by_code[code]["id"])) for code in unallocated_reward_codes]
+                    )
+                )
                 .values(deleted=True)
             )
-            msg = f"Unallocated reward codes found while processing {blob_name}:\n" + "\n".join(
-                [
-                    f"Reward id: {db_reward_data_by_code[row_data.data.code]['id']}"
-                    f" row: {row_data.row_num}, status change: {row_data.data.status.value}"
-                    for row_data in update_rows
-                ]
-            )
-            logger.warning(msg)
-            if settings.SENTRY_DSN:
-                sentry_sdk.capture_message(msg)
+            for row_data in update_rows:
+                report.add(
+                    ErrorReason.UNALLOCATED_CODE,
+                    row_data.row_num,
+                    code=row_data.data.code,
+                    status=row_data.data.status.value,
+                    detail=f"reward id: {db_reward_data_by_code[row_data.data.code]['id']}",
+                )
 
-    def _process_updates(
+    def _process_updates(  # noqa: PLR0913
         self,
         db_session: "Session",
         retailer: Retailer,
         reward_update_rows_by_code: defaultdict[str, list[RewardUpdateRow]],
         blob_name: str,
+        report: ErrorReport | None = None,
     ) -> None:
+        """
+        Processes the reward updates in chunks of `REWARD_UPDATES_CHUNK_SIZE` codes, each in its own short
+        transaction so that the rewards are only locked while their chunk is processed, then enqueues their
+        status adjustment tasks.
+
+        Problems are added to the file's `report`, or reported straight away if it is not provided.
+        """
+
+        file_report = report if report is not None else ErrorReport(blob_name)
+        reward_updates: list[RewardUpdateValues] = []
+        # each chunk's transaction only holds the locks of its own rewards, taken in a consistent order
+        for chunk_codes in batched(sorted(reward_update_rows_by_code), settings.REWARD_UPDATES_CHUNK_SIZE):
+            reward_updates.extend(
+                self._process_updates_chunk(
+                    db_session,
+                    retailer=retailer,
+                    reward_update_rows_by_code={code: reward_update_rows_by_code[code] for code in chunk_codes},
+                    report=file_report,
+                )
+            )
 
-        reward_codes_in_file = list(reward_update_rows_by_code.keys())
+        self.enqueue_reward_updates(db_session, retailer_slug=retailer.slug, reward_updates=reward_updates)
+        if report is None:
+            self._send_error_report(file_report, settings.BLOB_ARCHIVE_CONTAINER, self._get_dst_blob_name(blob_name))
 
-        reward_datas = sync_run_query(
-            lambda: db_session.execute(
-                select(Reward.id, Reward.code, Reward.allocated)
-                .with_for_update()
-                .where(Reward.code.in_(reward_codes_in_file), Reward.retailer_id == retailer.id)
+    @staticmethod
+    def _select_rewards_for_update(retailer_id: int, codes: list[str]) -> "Select":
+        """Selects and locks the retailer's rewards with one of the codes"""
+        # the codes' hashes probe ix_reward_code_hash, the rewards found are then confirmed against their code
+        codes_table = func.unnest(bindparam("codes", codes, type_=ARRAY(String))).table_valued("code").render_derived()
+        # rewards are locked in id order, as any other transaction locking more than one reward should,
+        # so that transactions locking the same rewards wait for each other rather than deadlock
+        return (
+            select(Reward.id, Reward.code, Reward.allocated)
+            .join(
+                codes_table,
+                and_(
+                    Reward.code_hash == Reward.hash_code(codes_table.c.code, retailer_id),
+                    Reward.code == codes_table.c.code,
+                ),
             )
+            .with_for_update(of=Reward)
+            .where(Reward.retailer_id == retailer_id)
+            .order_by(Reward.id)
+        )
+
+    def _process_updates_chunk(
+        self,
+        db_session: "Session",
+        *,
+        retailer: Retailer,
+        reward_update_rows_by_code: dict[str, list[RewardUpdateRow]],
+        report: ErrorReport,
+    ) -> list[RewardUpdateValues]:
+        reward_codes_in_file = list(reward_update_rows_by_code.keys())
+        reward_datas = sync_run_query(
+            lambda: db_session.execute(self._select_rewards_for_update(retailer.id, reward_codes_in_file))
             .mappings()
             .all(),
             db_session,
@@ -519,63 +1236,79 @@ class RewardUpdatesAgent(BlobFileAgent):
             for reward_data in reward_datas
         }
 
-        self._report_unknown_codes(reward_codes_in_file, db_reward_data_by_code, reward_update_rows_by_code, blob_name)
+        self._report_unknown_codes(reward_codes_in_file, db_reward_data_by_code, reward_update_rows_by_code, report)
 
         self._process_unallocated_codes(
             db_session,
-            retailer=retailer,
-            blob_name=blob_name,
+            report=report,
             reward_codes_in_file=reward_codes_in_file,
             db_reward_data_by_code=db_reward_data_by_code,
             reward_update_rows_by_code=reward_update_rows_by_code,
         )
 
-        reward_updates = []
-        for code, reward_update_rows in reward_update_rows_by_code.items():
-            reward_updates.extend(
-                [
-                    RewardUpdate(
-                        reward_uuid=uuid.UUID(cast(str, db_reward_data_by_code[code]["id"])),
-                        date=reward_update_row.data.date,
-                        status=reward_update_row.data.status,
-                    )
-                    for reward_update_row in reward_update_rows
-                ]
-            )
+        reward_updates: list[RewardUpdateValues] = [
+            {
+                "reward_uuid": uuid.UUID(cast(str, db_reward_data_by_code[code]["id"])),
+                "date": reward_update_row.data.date,
+                "status": reward_update_row.data.status,
+            }
+            for code, reward_update_rows in reward_update_rows_by_code.items()
+            for reward_update_row in reward_update_rows
+        ]
 
         def add_reward_updates() -> None:
-            db_session.add_all(reward_updates)
+            # a single multi row INSERT, without loading the new rows back into the session
+            if reward_updates:
+                db_session.execute(insert(RewardUpdate), reward_updates)
             db_session.commit()
 
         sync_run_query(add_reward_updates, db_session)
-        self.enqueue_reward_updates(db_session, reward_updates)
+        count_rows("inserted", len(reward_updates))
+        return reward_updates
 
     @staticmethod
-    def enqueue_reward_updates(db_session: "Session", reward_updates: list[RewardUpdate]) -> None:
+    def enqueue_reward_updates(
+        db_session: "Session", *, retailer_slug: str, reward_updates: list[RewardUpdateValues]
+    ) -> None:
+        """
+        Creates and enqueues a status adjustment task per reward update, chunk by chunk, each chunk's tasks
+        are committed once enqueued. If a chunk can't be enqueued its tasks are discarded and the remaining
+        chunks are not attempted.
+        """
+
         def _commit() -> None:
             db_session.commit()
 
         def _rollback() -> None:
             db_session.rollback()
 
-        params_list = [
-            {
-                "reward_uuid": reward_update.reward.id,
-                "retailer_slug": reward_update.reward.retailer.slug,
-                "date": datetime.fromisoformat(reward_update.date.isoformat()).replace(tzinfo=timezone.utc).timestamp(),
-                "status": reward_update.status.value,
-            }
-            for reward_update in reward_updates
-        ]
-        tasks = sync_create_many_tasks(
-            db_session, task_type_name=settings.REWARD_STATUS_ADJUSTMENT_TASK_NAME, params_list=params_list
-        )
-        try:
-            enqueue_many_retry_tasks(
-                db_session, retry_tasks_ids=[task.retry_task_id for task in tasks], connection=redis_raw
+        traceparent = current_traceparent()
+        for chunk in batched(reward_updates, settings.REWARD_STATUS_ADJUSTMENT_TASKS_CHUNK_SIZE):
+            params_list = [
+                {
+                    "reward_uuid": reward_update["reward_uuid"],
+                    "retailer_slug": retailer_slug,
+                    "date": datetime.fromisoformat(reward_update["date"].isoformat())
+                    .replace(tzinfo=timezone.utc)
+                    .timestamp(),
+                    "status": reward_update["status"].value,
+                }
+                for reward_update in chunk
+            ]
+            if traceparent:
+                for params in params_list:
+                    params[TRACEPARENT_TASK_PARAM] = traceparent
+
+            tasks = sync_create_many_tasks(
+                db_session, task_type_name=settings.REWARD_STATUS_ADJUSTMENT_TASK_NAME, params_list=params_list
             )
-        except Exception as ex:
-            sentry_sdk.capture_exception(ex)
-            sync_run_query(_rollback, db_session, rollback_on_exc=False)
-        else:
-            sync_run_query(_commit, db_session, rollback_on_exc=False)
+            try:
+                enqueue_many_retry_tasks(
+                    db_session, retry_tasks_ids=[task.retry_task_id for task in tasks], connection=redis_raw
+                )
+            except Exception as ex:
+                sentry_sdk.capture_exception(ex)
+                sync_run_query(_rollback, db_session, rollback_on_exc=False)
+                return
+            else:
+                sync_run_query(_commit, db_session, rollback_on_exc=False)
@@ -0,0 +1,49 @@
+import logging
+import threading
+
+from collections.abc import Generator
+from contextlib import contextmanager
+
+import sentry_sdk
+
+from azure.core.exceptions import HttpResponseError
+from azure.storage.blob import BlobLeaseClient
+
+from carina.core.config import settings
+
+logger = logging.getLogger("reward-import")
+
+
+@contextmanager
+def auto_renew_lease(lease: BlobLeaseClient, interval: float | None = None) -> Generator[None, None, None]:
+    """
+    Renews the blob lease in a background thread while the wrapped block runs,
+    so that processing a blob can outlive `BLOB_CLIENT_LEASE_SECONDS`.
+
+    The lease is renewed every third of its duration unless an interval is provided.
+    """
+
+    if interval is None:
+        interval = settings.BLOB_CLIENT_LEASE_SECONDS / 3
+
+    stopped = threading.Event()
+
+    def _renew() -> None:
+        while not stopped.wait(interval):
+            try:
+                lease.renew()
+            except HttpResponseError as ex:
+                # the lease has most likely expired or been broken, processing carries on but
+                # moving the blob at the end will fail
+                logger.warning(f"Failed to renew lease {lease.id}: {ex}")
+                if settings.SENTRY_DSN:
+                    sentry_sdk.capture_exception(ex)
+                return
+
+    renewer = threading.Thread(target=_renew, name=f"lease-renewer-{lease.id}", daemon=True)
+    renewer.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        renewer.join()
@@ -0,0 +1,136 @@
+"""
+Throughput and quality metrics of the file agents, served by the cron-scheduler's prometheus server.
+
+`track_blob_metrics` collects the metrics of the blob, or batch of small blobs, being processed. The module's other
+functions record to it and do nothing outside of a tracked block.
+
+Stages are timed exclusively of the stages nested in them, e.g. the lines being parsed are downloaded lazily, the
+time spent waiting on the download is recorded as `download` rather than `parse`.
+"""
+import time
+
+from collections import defaultdict
+from collections.abc import Generator, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TypeVar
+
+from carina.core.config import settings
+from carina.enums import FileAgentType
+from carina.tasks.prometheus import (
+    blob_import_blobs_total,
+    blob_import_downloaded_bytes_total,
+    blob_import_rows_total,
+    blob_import_stage_duration_histogram,
+)
+
+T = TypeVar("T")
+
+
+class BlobMetrics:
+    def __init__(self, agent_type: FileAgentType, retailer_slug: str) -> None:
+        self.labels = {"app": settings.PROJECT_NAME, "agent_type": agent_type.value, "retailer_slug": retailer_slug}
+        self.durations: defaultdict[str, float] = defaultdict(float)
+        self._stages: list[str] = []
+        self._started_at = 0.0
+
+    def enter_stage(self, stage_name: str) -> None:
+        now = time.perf_counter()
+        if self._stages:
+            self.durations[self._stages[-1]] += now - self._started_at
+        self._stages.append(stage_name)
+        self._started_at = now
+
+    def exit_stage(self) -> None:
+        now = time.perf_counter()
+        self.durations[self._stages.pop()] += now - self._started_at
+        self._started_at = now
+
+    def count_blob(self, outcome: str) -> None:
+        blob_import_blobs_total.labels(**self.labels, outcome=outcome).inc()
+
+    def count_rows(self, result: str, count: int) -> None:
+        if count:
+            blob_import_rows_total.labels(**self.labels, result=result).inc(count)
+
+    def count_downloaded_bytes(self, count: int) -> None:
+        blob_import_downloaded_bytes_total.labels(**self.labels).inc(count)
+
+    def observe(self) -> None:
+        for stage_name, duration in self.durations.items():
+            blob_import_stage_duration_histogram.labels(**self.labels, stage=stage_name).observe(duration)
+
+
+_current_blob_metrics: ContextVar[BlobMetrics | None] = ContextVar("current_blob_metrics", default=None)
+
+
+@contextmanager
+def track_blob_metrics(agent_type: FileAgentType, retailer_slug: str) -> Generator[BlobMetrics, None, None]:
+    """Collects the metrics recorded in the wrapped block, its stages' durations are observed once it exits"""
+
+    metrics = BlobMetrics(agent_type, retailer_slug)
+    token = _current_blob_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_blob_metrics.reset(token)
+        metrics.observe()
+
+
+def count_listed_blobs(blobs: Iterable[T], agent_type: FileAgentType, retailer_slug: str) -> Iterator[T]:
+    """Counts the blobs as they are listed, listing is paged and not tracked as part of any blob"""
+
+    listed = blob_import_blobs_total.labels(
+        app=settings.PROJECT_NAME, agent_type=agent_type.value, retailer_slug=retailer_slug, outcome="listed"
+    )
+    for blob in blobs:
+        listed.inc()
+        yield blob
+
+
+def count_blob(outcome: str) -> None:
+    if (metrics := _current_blob_metrics.get()) is not None:
+        metrics.count_blob(outcome)
+
+
+def count_rows(result: str, count: int) -> None:
+    if (metrics := _current_blob_metrics.get()) is not None:
+        metrics.count_rows(result, count)
+
+
+@contextmanager
+def stage(stage_name: str) -> Generator[None, None, None]:
+    """Times the wrapped block as `stage_name` of the blob currently being tracked"""
+
+    metrics = _current_blob_metrics.get()
+    if metrics is None:
+        yield
+        return
+
+    metrics.enter_stage(stage_name)
+    try:
+        yield
+    finally:
+        metrics.exit_stage()
+
+
+def timed_iter(items: Iterable[T], stage_name: str) -> Iterator[T]:
+    """Times producing each of the items as `stage_name`, e.g. reading rows from lazily downloaded content"""
+
+    iterator = iter(items)
+    while True:
+        with stage(stage_name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def timed_download(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Times downloading the blob's chunks and counts their bytes"""
+
+    for chunk in timed_iter(chunks, "download"):
+        if (metrics := _current_blob_metrics.get()) is not None:
+            metrics.count_downloaded_bytes(len(chunk))
+        yield chunk
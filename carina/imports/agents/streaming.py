@@ -0,0 +1,170 @@
+import codecs
+import hashlib
+import zlib
+
+from collections.abc import Callable, Generator, Iterable, Iterator
+from itertools import chain, islice
+from typing import Protocol, TypeVar
+
+import zstandard
+
+T = TypeVar("T")
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class DecompressionError(ValueError):
+    pass
+
+
+class _Decompressor(Protocol):
+    eof: bool
+    unused_data: bytes
+
+    def decompress(self, data: bytes) -> bytes:
+        ...
+
+
+def _iter_frames(
+    chunks: Iterable[bytes], new_decompressor: Callable[[], _Decompressor], errors: tuple[type[Exception], ...]
+) -> Generator[bytes, None, None]:
+    """Decompresses each of the concatenated frames (or gzip members) of a stream in turn"""
+
+    decompressor: _Decompressor | None = None
+    try:
+        for chunk in chunks:
+            data = chunk
+            while data:
+                if decompressor is None:
+                    decompressor = new_decompressor()
+                if decompressed := decompressor.decompress(data):
+                    yield decompressed
+                if not decompressor.eof:
+                    break
+
+                data = decompressor.unused_data
+                decompressor = None
+    except errors as ex:
+        raise DecompressionError(f"invalid compressed content: {ex}") from ex
+
+    if decompressor is not None:
+        raise DecompressionError("compressed content ended before the end-of-stream marker was reached")
+
+
+def _iter_zstd_frames(chunks: Iterable[bytes]) -> Generator[bytes, None, None]:
+    yield from _iter_frames(chunks, zstandard.ZstdDecompressor().decompressobj, (zstandard.ZstdError,))
+
+
+def iter_decompressed(chunks: Iterable[bytes]) -> Generator[bytes, None, None]:
+    """
+    Incrementally decompresses a stream of gzip or zstd compressed byte chunks, other content is yielded unchanged.
+
+    The compression is detected from the content's magic number rather than trusted from the blob's name or
+    content encoding, which also covers content already decoded by the HTTP transport. Neither magic number can
+    start valid utf-8 text.
+    """
+
+    chunks = iter(chunks)
+    head = b""
+    while len(head) < len(ZSTD_MAGIC) and (chunk := next(chunks, None)) is not None:
+        head += chunk
+
+    content = chain([head] if head else [], chunks)
+    if head.startswith(GZIP_MAGIC):
+        yield from _iter_frames(content, lambda: zlib.decompressobj(16 + zlib.MAX_WBITS), (zlib.error,))
+    elif head.startswith(ZSTD_MAGIC):
+        yield from _iter_zstd_frames(content)
+    else:
+        yield from content
+
+
+def skip_bytes(chunks: Iterable[bytes], size: int) -> Generator[bytes, None, None]:
+    """Skips the first `size` bytes of a stream of byte chunks, to resume reading where it was left off"""
+
+    for chunk in chunks:
+        if size:
+            skipped = min(size, len(chunk))
+            size -= skipped
+            chunk = chunk[skipped:]  # noqa: PLW2901
+        if chunk:
+            yield chunk
+
+
+def iter_decoded_lines(chunks: Iterable[bytes], encoding: str = "utf-8") -> Generator[str, None, None]:
+    """
+    Incrementally decodes a stream of byte chunks and yields its lines, split on "\\n" and line endings included,
+    as iterating over `StringIO(content)` would.
+
+    Only the current chunk and the current line are held in memory.
+    Invalid bytes raise a UnicodeDecodeError when reached, as `bytes.decode(encoding, "strict")` would.
+    """
+
+    decoder = codecs.getincrementaldecoder(encoding)("strict")
+    remainder = ""
+    for chunk in chunks:
+        content = remainder + decoder.decode(chunk)
+        start = 0
+        while (end := content.find("\n", start)) != -1:
+            yield content[start : end + 1]
+            start = end + 1
+
+        # the last line may continue in the next chunk
+        remainder = content[start:]
+
+    if last_line := remainder + decoder.decode(b"", final=True):
+        yield last_line
+
+
+def batched(iterable: Iterable[T], size: int) -> Generator[list[T], None, None]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class TrackedLines:
+    """
+    Iterates over decoded lines, keeping track of the byte offset of the end of the last line read
+    in the original content, which is where reading can later be resumed from.
+    """
+
+    def __init__(self, lines: Iterable[str], offset: int = 0, encoding: str = "utf-8") -> None:
+        self._lines = iter(lines)
+        self._encoding = encoding
+        self.offset = offset
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        line = next(self._lines)
+        self.offset += len(line) if line.isascii() else len(line.encode(self._encoding))
+        return line
+
+
+class HashedChunks:
+    """
+    Iterates over byte chunks, computing the MD5 digest of the whole content as it is read,
+    which matches the blob's Content-MD5 once all of it has been read.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._hash = hashlib.md5(usedforsecurity=False)
+        self.exhausted = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self
+
+    def __next__(self) -> bytes:
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self.exhausted = True
+            raise
+
+        self._hash.update(chunk)
+        return chunk
+
+    def hexdigest(self) -> str | None:
+        return self._hash.hexdigest() if self.exhausted else None
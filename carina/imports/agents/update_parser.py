@@ -0,0 +1,65 @@
+"""
+Columnar parser for reward update files.
+
+Validating each row with `RewardUpdateSchema` dominates the CPU time of large update files, rows are instead
+unpacked into their columns and validated as the schema would: statuses through a precomputed lookup and dates
+through a cache of the distinct date strings found in the file, which are few.
+"""
+import datetime as dt
+
+from collections import defaultdict
+from collections.abc import Iterable
+from functools import lru_cache
+from typing import NamedTuple
+
+from carina.enums import RewardUpdateStatuses
+
+_STATUS_LOOKUP = {status.value: status for status in RewardUpdateStatuses}
+
+
+class RewardUpdateData(NamedTuple):
+    """A validated row, as `RewardUpdateSchema` would parse it"""
+
+    code: str
+    date: dt.date
+    status: RewardUpdateStatuses
+
+
+class RewardUpdateRow(NamedTuple):
+    data: RewardUpdateData
+    row_num: int
+
+
+@lru_cache(maxsize=1024)
+def _parse_date(value: str) -> dt.date:
+    return dt.datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=dt.timezone.utc).date()
+
+
+def _parse_status(value: str) -> RewardUpdateStatuses:
+    try:
+        return _STATUS_LOOKUP[value]
+    except KeyError:
+        # raises the same error as the enum lookup would
+        return RewardUpdateStatuses(value)
+
+
+def parse_reward_update_rows(
+    rows: Iterable[tuple[int, list[str]]]
+) -> tuple[defaultdict[str, list[RewardUpdateRow]], list[tuple[int, Exception]]]:
+    """
+    Parses numbered `code,date,status` rows and returns the valid ones grouped by code,
+    as a code may be updated more than once in the same file, along with the invalid rows' errors.
+    """
+
+    reward_update_rows_by_code: defaultdict[str, list[RewardUpdateRow]] = defaultdict(list)
+    invalid_rows: list[tuple[int, Exception]] = []
+    for row_num, row in rows:
+        try:
+            code, date, status = row[0].strip(), row[1].strip(), _parse_status(row[2].strip().lower())
+            data = RewardUpdateData(code, _parse_date(date), status)
+        except (IndexError, ValueError) as ex:
+            invalid_rows.append((row_num, ex))
+        else:
+            reward_update_rows_by_code[code].append(RewardUpdateRow(data, row_num))
+
+    return reward_update_rows_by_code, invalid_rows
@@ -0,0 +1,283 @@
+"""
+Offline bulk loading of reward import files, for backfills and retailer migrations.
+
+A local file, or stdin, is loaded as `RewardImportAgent` would import it once uploaded as
+`<retailer slug>/<file name>`: same file name rules, reward config and expiry date validation, duplicate checks,
+RewardFileLog record and error report, without going through blob storage.
+
+Rows are read in batches whose codes are partitioned by hash across a pool of worker processes, each loading its share
+of a batch with COPY in its own transaction. A code repeated in the file always falls in the same partition, whose
+chunks are loaded one after the other, so that it is not mistaken for a pre-existing code. The RewardFileLog is
+completed once all the rows are loaded, an interrupted load is resumed by running it again as the codes already loaded
+from the file are skipped.
+"""
+import csv
+import logging
+import multiprocessing
+import time
+
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from functools import partial
+from typing import TYPE_CHECKING, BinaryIO
+
+from sqlalchemy.future import select
+
+from carina.core.config import settings
+from carina.db.base_class import sync_run_query
+from carina.db.session import SyncSessionMaker
+from carina.enums import FileAgentType, RewardFileLogStatuses
+from carina.imports.agents.error_reports import ErrorReport
+from carina.imports.agents.file_agent import (
+    COMPRESSED_FILE_EXTENSIONS,
+    SUPPORTED_FILE_EXTENSIONS,
+    BlobProcessingError,
+    get_reward_config_and_expiry_date,
+    get_reward_configs_by_slug,
+    get_row_nums_by_code,
+    report_invalid_rows,
+    report_pre_existing_codes,
+)
+from carina.imports.agents.streaming import HashedChunks, TrackedLines, batched, iter_decoded_lines, iter_decompressed
+from carina.imports.bulk_load import get_staged_codes_from_file, insert_staged_reward_codes, stage_reward_codes
+from carina.imports.code_filter import add_codes, get_maybe_existing_codes
+from carina.models import Retailer, RewardFileLog
+
+if TYPE_CHECKING:  # pragma: no cover
+    from sqlalchemy.orm import Session
+
+logger = logging.getLogger("reward-import")
+
+READ_SIZE = 1024 * 1024
+PROGRESS_INTERVAL_SECONDS = 5.0
+
+
+class BulkLoadError(Exception):
+    pass
+
+
+@dataclass
+class LoadProgress:
+    file_name: str
+    report: ErrorReport
+    rows: int = 0
+    inserted: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+
+@dataclass
+class _Chunk:
+    future: Future
+    row_nums_by_code: dict[str, list[int]]
+
+
+def partition_codes(row_nums_by_code: dict[str, list[int]], partitions: int) -> list[dict[str, list[int]]]:
+    """Splits a batch's codes by hash, the same code always ending up in the same partition"""
+    partitioned: list[dict[str, list[int]]] = [{} for _ in range(partitions)]
+    for code, row_nums in row_nums_by_code.items():
+        partitioned[hash(code) % partitions][code] = row_nums
+
+    return partitioned
+
+
+def _load_codes(
+    codes: list[str], *, retailer_id: int, reward_config_id: int, reward_file_log_id: int, expiry_date: date | None
+) -> tuple[int, set[str]]:
+    """
+    Runs in the pool's worker processes. Loads the codes in their own transaction and returns the number of rewards
+    inserted along with the pre-existing codes.
+    """
+    with SyncSessionMaker() as db_session:
+
+        def _insert() -> tuple[set[str], set[str]]:
+            stage_reward_codes(db_session, codes, get_maybe_existing_codes(retailer_id, codes))
+            # codes loaded by an interrupted run of the same file are not pre-existing
+            added_from_file = get_staged_codes_from_file(
+                db_session,
+                reward_config_id=reward_config_id,
+                retailer_id=retailer_id,
+                reward_file_log_id=reward_file_log_id,
+            )
+            inserted_codes = insert_staged_reward_codes(
+                db_session,
+                reward_config_id=reward_config_id,
+                retailer_id=retailer_id,
+                expiry_date=expiry_date,
+                reward_file_log_id=reward_file_log_id,
+            )
+            add_codes(retailer_id, inserted_codes)
+            db_session.commit()
+            return inserted_codes, added_from_file
+
+        inserted_codes, added_from_file = sync_run_query(_insert, db_session)
+
+    return len(inserted_codes), set(codes) - inserted_codes - added_from_file
+
+
+def _get_retailer(db_session: "Session", retailer_slug: str) -> Retailer:
+    retailer = sync_run_query(
+        lambda: db_session.execute(select(Retailer).where(Retailer.slug == retailer_slug)).scalar_one_or_none(),
+        db_session,
+    )
+    if retailer is None:
+        raise BulkLoadError(f"No Retailer found for slug {retailer_slug}")
+
+    return retailer
+
+
+def _get_content_digest(content: BinaryIO) -> str | None:
+    """Hashes seekable content ahead of loading it, to check it against earlier imports first"""
+    if not content.seekable():
+        return None
+
+    hashed = HashedChunks(iter(partial(content.read, READ_SIZE), b""))
+    for _ in hashed:
+        pass
+    content.seek(0)
+    return hashed.hexdigest()
+
+
+def _start_reward_file_log(
+    db_session: "Session", retailer: Retailer, blob_name: str, content_digest: str | None
+) -> RewardFileLog:
+    """Returns the file's new RewardFileLog, or the one of its interrupted load"""
+    reward_file_log = sync_run_query(
+        lambda: db_session.execute(
+            select(RewardFileLog).where(
+                RewardFileLog.file_agent_type == FileAgentType.IMPORT, RewardFileLog.file_name == blob_name
+            )
+        ).scalar_one_or_none(),
+        db_session,
+    )
+    if reward_file_log is not None:
+        # blob imports are resumed by the file agents only
+        if reward_file_log.status != RewardFileLogStatuses.IN_PROGRESS or reward_file_log.blob_etag is not None:
+            raise BulkLoadError(f"{blob_name} is a duplicate")
+
+        logger.info(f"Resuming {blob_name}.")
+        return reward_file_log
+
+    if content_digest is not None and (
+        original_file_name := sync_run_query(
+            lambda: db_session.execute(
+                select(RewardFileLog.file_name)
+                .where(
+                    RewardFileLog.file_agent_type == FileAgentType.IMPORT,
+                    RewardFileLog.content_digest == content_digest,
+                    RewardFileLog.status == RewardFileLogStatuses.COMPLETED,
+                    RewardFileLog.file_name.startswith(f"{retailer.slug}/", autoescape=True),
+                )
+                .order_by(RewardFileLog.id)
+                .limit(1)
+            ).scalar_one_or_none(),
+            db_session,
+        )
+    ):
+        raise BulkLoadError(f"{blob_name} has the same content as the already imported {original_file_name}")
+
+    reward_file_log = RewardFileLog(
+        file_name=blob_name, file_agent_type=FileAgentType.IMPORT, content_digest=content_digest
+    )
+    db_session.add(reward_file_log)
+    sync_run_query(lambda: db_session.commit(), db_session)
+    return reward_file_log
+
+
+def _collect(chunk: _Chunk | None, progress: LoadProgress) -> None:
+    """Waits for a chunk to be loaded and reports its pre-existing codes"""
+    if chunk is None:
+        return
+
+    inserted, pre_existing_codes = chunk.future.result()
+    progress.inserted += inserted
+    report_pre_existing_codes(progress.report, {code: chunk.row_nums_by_code[code] for code in pre_existing_codes})
+
+
+def _read_rows(content: BinaryIO, file_name: str) -> tuple[Iterable[list[str]], HashedChunks, TrackedLines]:
+    read = HashedChunks(iter(partial(content.read, READ_SIZE), b""))
+    chunks = iter_decompressed(read) if file_name.endswith(COMPRESSED_FILE_EXTENSIONS) else read
+    lines = TrackedLines(iter_decoded_lines(chunks))
+    return csv.reader(lines, delimiter=",", quotechar="|"), read, lines
+
+
+def load_reward_codes(
+    retailer_slug: str,
+    file_name: str,
+    content: BinaryIO,
+    *,
+    workers: int,
+    batch_size: int = settings.BLOB_IMPORT_BATCH_SIZE,
+    on_progress: Callable[[LoadProgress], None] | None = None,
+) -> LoadProgress:
+    """
+    Loads the reward codes of a file named `file_name`, as uploaded to blob storage for the retailer, across `workers`
+    processes. Progress is reported to `on_progress` every PROGRESS_INTERVAL_SECONDS and once loaded.
+    """
+    blob_name = f"{retailer_slug}/{file_name}"
+    progress = LoadProgress(file_name=blob_name, report=ErrorReport(blob_name))
+    with SyncSessionMaker() as db_session:
+        retailer = _get_retailer(db_session, retailer_slug)
+        if not file_name.endswith(SUPPORTED_FILE_EXTENSIONS):
+            raise BlobProcessingError(f"{blob_name} does not have .csv ext")
+
+        reward_config, expiry_date = get_reward_config_and_expiry_date(
+            get_reward_configs_by_slug(db_session, retailer.id), retailer, blob_name
+        )
+        reward_file_log = _start_reward_file_log(db_session, retailer, blob_name, _get_content_digest(content))
+        load_codes = partial(
+            _load_codes,
+            retailer_id=retailer.id,
+            reward_config_id=reward_config.id,
+            reward_file_log_id=reward_file_log.id,
+            expiry_date=expiry_date,
+        )
+
+        rows, read, lines = _read_rows(content, file_name)
+        reported_at = progress.started_at
+        # workers are spawned rather than forked so that they do not share the parent's database connections
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            chunks: list[_Chunk | None] = [None] * workers
+            for batch in batched(enumerate(rows, start=1), batch_size):
+                invalid_rows: list[tuple[int, list[str]]] = []
+                row_nums_by_code = get_row_nums_by_code(batch, invalid_rows)
+                report_invalid_rows(progress.report, invalid_rows)
+                for partition, partition_row_nums_by_code in enumerate(partition_codes(row_nums_by_code, workers)):
+                    if partition_row_nums_by_code:
+                        _collect(chunks[partition], progress)
+                        chunks[partition] = _Chunk(
+                            executor.submit(load_codes, list(partition_row_nums_by_code)), partition_row_nums_by_code
+                        )
+
+                progress.rows = batch[-1][0]
+                if on_progress is not None and time.perf_counter() - reported_at >= PROGRESS_INTERVAL_SECONDS:
+                    on_progress(progress)
+                    reported_at = time.perf_counter()
+
+            for chunk in chunks:
+                _collect(chunk, progress)
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+        reward_file_log.rows_processed = progress.rows
+        reward_file_log.bytes_processed = lines.offset
+        reward_file_log.status = RewardFileLogStatuses.COMPLETED
+        if reward_file_log.content_digest is None:
+            reward_file_log.content_digest = read.hexdigest()
+        sync_run_query(lambda: db_session.commit(), db_session)
+
+    if on_progress is not None:
+        on_progress(progress)
+
+    return progress
@@ -0,0 +1,258 @@
+"""
+COPY based bulk loading of reward codes.
+
+Codes are `COPY`ed into a temporary staging table and moved into `reward` with a single
+`INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING code`, avoiding per row round trips and ORM objects.
+New rewards get time ordered ids, appended to the primary key index rather than scattered across it.
+
+Lookups against `reward` are joins on the staged codes scoped to the retailer. They probe the compact
+ix_reward_code_hash index with the hash of each staged code, then confirm against `code`, so their cost depends
+on the number of staged codes only.
+
+Codes are staged along with whether they might already exist, as per the retailer's reward code filter, the
+lookups are skipped for the ones which do not.
+"""
+import csv
+
+from collections import defaultdict
+from collections.abc import Collection, Container, Iterable
+from datetime import date
+from io import StringIO
+from typing import TYPE_CHECKING, NamedTuple
+
+from sqlalchemy import text
+
+from carina.core.ids import uuid7
+
+if TYPE_CHECKING:  # pragma: no cover
+    from sqlalchemy.orm import Session
+
+STAGING_TABLE_NAME = "reward_import_staging"
+
+CREATE_STAGING_TABLE_SQL = text(
+    f"CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE_NAME} "
+    "(id UUID NOT NULL, code VARCHAR NOT NULL, maybe_exists BOOLEAN NOT NULL) "
+    "ON COMMIT DROP"
+)
+TRUNCATE_STAGING_TABLE_SQL = text(f"TRUNCATE {STAGING_TABLE_NAME}")
+COPY_TO_STAGING_TABLE_SQL = f"COPY {STAGING_TABLE_NAME} (id, code, maybe_exists) FROM STDIN WITH (FORMAT csv)"
+ANALYZE_STAGING_TABLE_SQL = text(f"ANALYZE {STAGING_TABLE_NAME}")
+
+SELECT_STAGED_CODES_FROM_FILE_SQL = text(
+    f"""
+    SELECT DISTINCT staging.code
+    FROM {STAGING_TABLE_NAME} AS staging
+    JOIN reward
+        ON reward.code_hash = hashtextextended(staging.code, :retailer_id)
+        AND reward.code = staging.code
+        AND reward.retailer_id = :retailer_id
+    WHERE staging.maybe_exists
+        AND reward.reward_config_id = :reward_config_id
+        AND reward.reward_file_log_id = :reward_file_log_id
+    """  # noqa: S608
+)
+
+# Codes already used by another, non deleted, reward config of the retailer are skipped as well as the ones
+# conflicting with code_retailer_reward_config_unq, these are the import agent's pre-existing codes.
+INSERT_FROM_STAGING_TABLE_SQL = text(
+    f"""
+    INSERT INTO reward (id, code, allocated, deleted, reward_config_id, retailer_id, expiry_date, reward_file_log_id)
+    SELECT DISTINCT ON (staging.code)
+        staging.id, staging.code, false, false,
+        :reward_config_id, :retailer_id, CAST(:expiry_date AS DATE), CAST(:reward_file_log_id AS INTEGER)
+    FROM {STAGING_TABLE_NAME} AS staging
+    WHERE NOT staging.maybe_exists OR NOT EXISTS (
+        SELECT 1 FROM reward
+        WHERE reward.code_hash = hashtextextended(staging.code, :retailer_id)
+            AND reward.code = staging.code
+            AND reward.retailer_id = :retailer_id
+            AND reward.reward_config_id != :reward_config_id
+            AND NOT reward.deleted
+    )
+    ON CONFLICT ON CONSTRAINT code_retailer_reward_config_unq DO NOTHING
+    RETURNING code
+    """  # noqa: S608
+)
+
+FILES_STAGING_TABLE_NAME = "reward_import_files_staging"
+
+CREATE_FILES_STAGING_TABLE_SQL = text(
+    f"CREATE TEMPORARY TABLE IF NOT EXISTS {FILES_STAGING_TABLE_NAME} "
+    "(id UUID NOT NULL, code VARCHAR NOT NULL, reward_file_log_id INTEGER NOT NULL, expiry_date DATE, "
+    "maybe_exists BOOLEAN NOT NULL) "
+    "ON COMMIT DROP"
+)
+TRUNCATE_FILES_STAGING_TABLE_SQL = text(f"TRUNCATE {FILES_STAGING_TABLE_NAME}")
+COPY_TO_FILES_STAGING_TABLE_SQL = (
+    f"COPY {FILES_STAGING_TABLE_NAME} (id, code, reward_file_log_id, expiry_date, maybe_exists) "
+    "FROM STDIN WITH (FORMAT csv)"
+)
+ANALYZE_FILES_STAGING_TABLE_SQL = text(f"ANALYZE {FILES_STAGING_TABLE_NAME}")
+
+# As INSERT_FROM_STAGING_TABLE_SQL, a code found in several files is inserted from the earliest logged one
+INSERT_FROM_FILES_STAGING_TABLE_SQL = text(
+    f"""
+    INSERT INTO reward (id, code, allocated, deleted, reward_config_id, retailer_id, expiry_date, reward_file_log_id)
+    SELECT DISTINCT ON (staging.code)
+        staging.id, staging.code, false, false,
+        :reward_config_id, :retailer_id, staging.expiry_date, staging.reward_file_log_id
+    FROM {FILES_STAGING_TABLE_NAME} AS staging
+    WHERE NOT staging.maybe_exists OR NOT EXISTS (
+        SELECT 1 FROM reward
+        WHERE reward.code_hash = hashtextextended(staging.code, :retailer_id)
+            AND reward.code = staging.code
+            AND reward.retailer_id = :retailer_id
+            AND reward.reward_config_id != :reward_config_id
+            AND NOT reward.deleted
+    )
+    ORDER BY staging.code, staging.reward_file_log_id
+    ON CONFLICT ON CONSTRAINT code_retailer_reward_config_unq DO NOTHING
+    RETURNING code, reward_file_log_id
+    """  # noqa: S608
+)
+
+
+class RewardCodesFile(NamedTuple):
+    reward_file_log_id: int
+    expiry_date: date | None
+    codes: Collection[str]
+
+
+def stage_reward_codes(
+    db_session: "Session", codes: Iterable[str], maybe_existing: Container[str] | None = None
+) -> None:
+    """
+    Replaces the content of the transaction's staging table with the provided codes. Only the `maybe_existing`
+    codes are looked up, all of them if not provided.
+    """
+
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows((uuid7(), code, maybe_existing is None or code in maybe_existing) for code in codes)
+    buffer.seek(0)
+
+    db_session.execute(CREATE_STAGING_TABLE_SQL)
+    db_session.execute(TRUNCATE_STAGING_TABLE_SQL)
+    # COPY is not supported by SQLAlchemy, use the psycopg2 cursor of the session's connection
+    dbapi_connection = db_session.connection().connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(COPY_TO_STAGING_TABLE_SQL, buffer)
+
+    db_session.execute(ANALYZE_STAGING_TABLE_SQL)
+
+
+def get_staged_codes_from_file(
+    db_session: "Session", *, reward_config_id: int, retailer_id: int, reward_file_log_id: int
+) -> set[str]:
+    """Returns the staged codes that have already been inserted from the provided reward file"""
+
+    return set(
+        db_session.execute(
+            SELECT_STAGED_CODES_FROM_FILE_SQL,
+            {
+                "reward_config_id": reward_config_id,
+                "retailer_id": retailer_id,
+                "reward_file_log_id": reward_file_log_id,
+            },
+        )
+        .scalars()
+        .all()
+    )
+
+
+def insert_staged_reward_codes(
+    db_session: "Session",
+    *,
+    reward_config_id: int,
+    retailer_id: int,
+    expiry_date: date | None,
+    reward_file_log_id: int | None,
+) -> set[str]:
+    """Inserts the staged codes as new rewards and returns the ones that were inserted"""
+
+    return set(
+        db_session.execute(
+            INSERT_FROM_STAGING_TABLE_SQL,
+            {
+                "reward_config_id": reward_config_id,
+                "retailer_id": retailer_id,
+                "expiry_date": expiry_date,
+                "reward_file_log_id": reward_file_log_id,
+            },
+        )
+        .scalars()
+        .all()
+    )
+
+
+def bulk_insert_reward_codes(
+    db_session: "Session",
+    *,
+    codes: Collection[str],
+    reward_config_id: int,
+    retailer_id: int,
+    expiry_date: date | None,
+    reward_file_log_id: int | None,
+    maybe_existing: Container[str] | None = None,
+) -> set[str]:
+    """
+    Inserts the provided codes as new rewards and returns the ones that were inserted.
+    The session's transaction is not committed.
+    """
+
+    if not codes:
+        return set()
+
+    stage_reward_codes(db_session, codes, maybe_existing)
+    return insert_staged_reward_codes(
+        db_session,
+        reward_config_id=reward_config_id,
+        retailer_id=retailer_id,
+        expiry_date=expiry_date,
+        reward_file_log_id=reward_file_log_id,
+    )
+
+
+def bulk_insert_reward_code_files(
+    db_session: "Session",
+    *,
+    files: Iterable[RewardCodesFile],
+    reward_config_id: int,
+    retailer_id: int,
+    maybe_existing: Container[str] | None = None,
+) -> defaultdict[int, set[str]]:
+    """
+    Inserts the codes of several files of the same reward config as new rewards, in a single statement,
+    and returns the ones that were inserted by reward_file_log_id. The session's transaction is not committed.
+    """
+
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    for file in files:
+        writer.writerows(
+            (
+                uuid7(),
+                code,
+                file.reward_file_log_id,
+                file.expiry_date,
+                maybe_existing is None or code in maybe_existing,
+            )
+            for code in file.codes
+        )
+    buffer.seek(0)
+
+    db_session.execute(CREATE_FILES_STAGING_TABLE_SQL)
+    db_session.execute(TRUNCATE_FILES_STAGING_TABLE_SQL)
+    dbapi_connection = db_session.connection().connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(COPY_TO_FILES_STAGING_TABLE_SQL, buffer)
+
+    db_session.execute(ANALYZE_FILES_STAGING_TABLE_SQL)
+
+    inserted_codes_by_file: defaultdict[int, set[str]] = defaultdict(set)
+    for code, reward_file_log_id in db_session.execute(
+        INSERT_FROM_FILES_STAGING_TABLE_SQL, {"reward_config_id": reward_config_id, "retailer_id": retailer_id}
+    ):
+        inserted_codes_by_file[reward_file_log_id].add(code)
+
+    return inserted_codes_by_file
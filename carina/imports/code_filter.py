@@ -0,0 +1,202 @@
+"""
+Per retailer Bloom filters of the existing reward codes, kept in Redis, used to pre-screen imported codes.
+
+Most imported codes do not exist yet, the import queries only look codes the filter says might exist up in the
+`reward` table. Codes are added to the filter before the transaction inserting them commits, so that a code
+committed is always in the filter. Codes are never removed, the rewards deleted since the last rebuild only
+make the filter less selective until it is rebuilt by `rebuild_reward_code_filter`.
+
+A retailer's filter is only used once it has been built, every code is assumed to possibly exist until then or
+if Redis is unavailable. Should adding codes fail, the retailer's filter is deleted rather than failing the
+transaction inserting them, until it is rebuilt. Changing the filter's size or number of hashes starts a new, empty,
+filter.
+"""
+import hashlib
+import logging
+import time
+
+from collections.abc import Collection, Iterable
+from typing import TYPE_CHECKING
+
+from redis import RedisError
+from sqlalchemy import text
+from sqlalchemy.future import select
+
+from carina.core.config import redis_raw, settings
+from carina.imports.agents.streaming import batched
+from carina.models import Reward
+
+if TYPE_CHECKING:  # pragma: no cover
+    from sqlalchemy.orm import Session
+
+logger = logging.getLogger("reward-import")
+
+REBUILD_BATCH_SIZE = 10_000
+# a rebuilt filter is discarded if not completed in time, e.g. when the rebuilding process dies
+REBUILD_KEY_TTL_SECONDS = 24 * 60 * 60
+REBUILD_WAIT_POLL_SECONDS = 1.0
+
+# sets the offsets' bits in each of the keys that exist, the live filter and the one being rebuilt
+_add_script = redis_raw.register_script(
+    """
+    for _, key in ipairs(KEYS) do
+        if redis.call("EXISTS", key) == 1 then
+            for i = 1, #ARGV do
+                redis.call("SETBIT", key, ARGV[i], 1)
+            end
+        end
+    end
+    return 0
+    """
+)
+# returns, for each code, whether all of its ARGV[1] offsets' bits are set, or nil if the filter does not exist
+_check_script = redis_raw.register_script(
+    """
+    if redis.call("EXISTS", KEYS[1]) == 0 then
+        return false
+    end
+    local hashes = tonumber(ARGV[1])
+    local found = {}
+    for i = 2, #ARGV, hashes do
+        local all_set = 1
+        for j = i, i + hashes - 1 do
+            if redis.call("GETBIT", KEYS[1], ARGV[j]) == 0 then
+                all_set = 0
+                break
+            end
+        end
+        found[#found + 1] = all_set
+    end
+    return found
+    """
+)
+
+
+def filter_key(retailer_id: int) -> str:
+    return (
+        f"{settings.REDIS_KEY_PREFIX}reward-code-filter:{retailer_id}:"
+        f"{settings.REWARD_CODE_FILTER_SIZE_BITS}:{settings.REWARD_CODE_FILTER_HASHES}"
+    )
+
+
+def _rebuild_key(retailer_id: int) -> str:
+    return f"{filter_key(retailer_id)}:rebuild"
+
+
+def get_offsets(code: str) -> list[int]:
+    """The bits set for a code, derived from a single digest by double hashing"""
+    digest = hashlib.blake2b(code.encode(), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    size = settings.REWARD_CODE_FILTER_SIZE_BITS
+    return [(h1 + i * h2) % size for i in range(settings.REWARD_CODE_FILTER_HASHES)]
+
+
+def _delete_filters(retailer_id: int) -> None:
+    """Deletes the retailer's live and rebuilt filters, so that every code is assumed to possibly exist"""
+    try:
+        redis_raw.delete(filter_key(retailer_id), _rebuild_key(retailer_id))
+    except RedisError as ex:
+        logger.error(
+            f"Failed to delete the reward code filter of retailer {retailer_id}, "
+            f"it is missing codes until rebuilt: {ex!r}"
+        )
+
+
+def add_codes(retailer_id: int, codes: Iterable[str]) -> None:
+    """
+    Adds new codes to the retailer's filter, to be called before the transaction inserting them commits.
+    Should Redis fail, the filter is deleted instead, as it would otherwise be missing codes once committed.
+    """
+    if not settings.REWARD_CODE_FILTER_ENABLED:
+        return
+
+    try:
+        for batch in batched(codes, REBUILD_BATCH_SIZE):
+            _add_script(
+                keys=[filter_key(retailer_id), _rebuild_key(retailer_id)],
+                args=[offset for code in batch for offset in get_offsets(code)],
+            )
+    except RedisError as ex:
+        logger.error(f"Failed to add codes to the reward code filter of retailer {retailer_id}, deleting it: {ex!r}")
+        _delete_filters(retailer_id)
+
+
+def get_maybe_existing_codes(retailer_id: int, codes: Collection[str]) -> Collection[str]:
+    """Returns the codes which might already exist for the retailer, all of them unless its filter is usable"""
+    if not settings.REWARD_CODE_FILTER_ENABLED or not codes:
+        return codes
+
+    ordered_codes = list(codes)
+    try:
+        found = _check_script(
+            keys=[filter_key(retailer_id)],
+            args=[
+                settings.REWARD_CODE_FILTER_HASHES,
+                *(offset for code in ordered_codes for offset in get_offsets(code)),
+            ],
+        )
+    except RedisError as ex:
+        logger.warning(f"Reward code filter unavailable for retailer {retailer_id}: {ex!r}")
+        return codes
+
+    if found is None:
+        return codes
+
+    return {code for code, maybe_exists in zip(ordered_codes, found, strict=True) if maybe_exists}
+
+
+def _wait_for_running_transactions(db_session: "Session", timeout: float) -> bool:
+    """
+    Waits for the transactions running now to finish. Their codes were added to the live filter only,
+    they have to be committed, or rolled back, before the rewards are read.
+    """
+    current_xid = db_session.execute(text("SELECT txid_current()")).scalar_one()
+    db_session.commit()
+    deadline = time.monotonic() + timeout
+    while db_session.execute(text("SELECT txid_snapshot_xmin(txid_current_snapshot())")).scalar_one() <= current_xid:
+        db_session.commit()
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(REBUILD_WAIT_POLL_SECONDS)
+
+    db_session.commit()
+    return True
+
+
+def rebuild_reward_code_filter(db_session: "Session", retailer_id: int) -> int:
+    """
+    Rebuilds the retailer's filter from its rewards, then replaces the live one with it, and returns the number
+    of codes added. The new filter is also added the codes inserted while it is rebuilt.
+    """
+    key, rebuild_key = filter_key(retailer_id), _rebuild_key(retailer_id)
+    # allocates the whole bitmap, and makes the rebuilt filter receive the new codes from now on
+    with redis_raw.pipeline() as pipe:
+        pipe.delete(rebuild_key)
+        pipe.setbit(rebuild_key, settings.REWARD_CODE_FILTER_SIZE_BITS - 1, 0)
+        pipe.expire(rebuild_key, REBUILD_KEY_TTL_SECONDS)
+        pipe.execute()
+
+    if not _wait_for_running_transactions(db_session, settings.REWARD_CODE_FILTER_REBUILD_WAIT_SECONDS):
+        redis_raw.delete(rebuild_key)
+        raise TimeoutError(f"Transactions still running, reward code filter of retailer {retailer_id} not rebuilt")
+
+    added = 0
+    codes = db_session.execute(
+        select(Reward.code).where(Reward.retailer_id == retailer_id).execution_options(yield_per=REBUILD_BATCH_SIZE)
+    ).scalars()
+    for batch in batched(codes, REBUILD_BATCH_SIZE):
+        with redis_raw.pipeline(transaction=False) as pipe:
+            for code in batch:
+                for offset in get_offsets(code):
+                    pipe.setbit(rebuild_key, offset, 1)
+            pipe.execute()
+        added += len(batch)
+    db_session.commit()
+
+    with redis_raw.pipeline() as pipe:
+        pipe.rename(rebuild_key, key)
+        pipe.persist(key)
+        pipe.execute()
+
+    return added
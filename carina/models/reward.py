@@ -1,26 +1,54 @@
-import uuid
+from typing import Any
 
 import yaml
 
-from sqlalchemy import BigInteger, Boolean, Column, Date, Enum, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    event,
+    func,
+    text,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
+from sqlalchemy.schema import FetchedValue
+from sqlalchemy.sql.functions import Function
 
+from carina.core.ids import uuid7
 from carina.db.base_class import Base, TimestampMixin
-from carina.enums import FileAgentType, RewardCampaignStatuses, RewardTypeStatuses, RewardUpdateStatuses
+from carina.enums import (
+    FileAgentType,
+    RewardCampaignStatuses,
+    RewardFileLogStatuses,
+    RewardTypeStatuses,
+    RewardUpdateStatuses,
+)
 
 
 class Reward(Base, TimestampMixin):
     __tablename__ = "reward"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)  # noqa: A003
-    code = Column(String, nullable=False, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)  # noqa: A003
+    code = Column(String, nullable=False)
     allocated = Column(Boolean, default=False, nullable=False)
     deleted = Column(Boolean, default=False, nullable=False)
     reward_config_id = Column(Integer, ForeignKey("reward_config.id"), nullable=False)
     retailer_id = Column(Integer, ForeignKey("retailer.id", ondelete="CASCADE"), nullable=False)
     expiry_date = Column(Date, nullable=True)
     reward_file_log_id = Column(Integer, ForeignKey("reward_file_log.id", ondelete="SET NULL"), nullable=True)
+    # fixed width hash of the retailer's code, its index is probed before the wide code indexes.
+    # Set by the reward_code_hash trigger, see migration 4d9a7c1e3b58 for why it isn't a generated column.
+    code_hash = Column(BigInteger, FetchedValue(), server_onupdate=FetchedValue(), nullable=False, index=True)
 
     reward_config = relationship("RewardConfig", back_populates="rewards")
     retailer = relationship("Retailer", back_populates="rewards")
@@ -29,12 +57,42 @@ class Reward(Base, TimestampMixin):
 
     __table_args__ = (
         UniqueConstraint("code", "retailer_id", "reward_config_id", name="code_retailer_reward_config_unq"),
+        # the rewards left to allocate, as looked up by PreLoaded._get_allocable_reward
+        Index(
+            "ix_reward_allocable",
+            "reward_config_id",
+            postgresql_where=text("allocated IS false AND deleted IS false"),
+        ),
     )
     __mapper_args__ = {"eager_defaults": True}
 
     def __repr__(self) -> str:  # pragma: no cover
         return f"{self.__class__.__name__}({self.retailer.slug}, " f"{self.code}, {self.allocated})"
 
+    @staticmethod
+    def hash_code(code: Any, retailer_id: Any) -> Function:
+        """The code_hash of a retailer's code, to look rewards up by"""
+        return func.hashtextextended(code, retailer_id)
+
+
+event.listen(
+    Reward.__table__,
+    "after_create",
+    DDL(
+        """
+        CREATE OR REPLACE FUNCTION reward_code_hash() RETURNS trigger AS $$
+        BEGIN
+            NEW.code_hash := hashtextextended(NEW.code, NEW.retailer_id);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER reward_code_hash BEFORE INSERT OR UPDATE OF code, retailer_id ON reward
+        FOR EACH ROW EXECUTE FUNCTION reward_code_hash();
+        """
+    ),
+)
+
 
 class RewardConfig(Base, TimestampMixin):
     __tablename__ = "reward_config"
@@ -67,7 +125,7 @@ class RewardUpdate(Base, TimestampMixin):
     __tablename__ = "reward_update"
 
     id = Column(Integer, primary_key=True)  # noqa: A003
-    reward_uuid = Column(UUID(as_uuid=True), ForeignKey("reward.id", ondelete="CASCADE"), nullable=False)
+    reward_uuid = Column(UUID(as_uuid=True), ForeignKey("reward.id", ondelete="CASCADE"), nullable=False, index=True)
     date = Column(Date, nullable=False)
     status = Column(Enum(RewardUpdateStatuses), nullable=False)
 
@@ -85,6 +143,13 @@ class RewardFileLog(Base, TimestampMixin):
     id = Column(Integer, primary_key=True)  # noqa: A003
     file_name = Column(String(500), index=True, nullable=False)
     file_agent_type = Column(Enum(FileAgentType), index=True, nullable=False)
+    status = Column(Enum(RewardFileLogStatuses), nullable=False, default=RewardFileLogStatuses.IN_PROGRESS)
+    # checkpoint of a file's import, committed along with the rows it covers
+    blob_etag = Column(String, nullable=True)
+    rows_processed = Column(Integer, nullable=False, default=0)
+    bytes_processed = Column(BigInteger, nullable=False, default=0)
+    # hex MD5 digest of the blob's content, as its Content-MD5, to recognise files uploaded again under a new name
+    content_digest = Column(String(32), index=True, nullable=True)
 
     rewards = relationship("Reward", back_populates="reward_file_log")
 
@@ -116,7 +181,7 @@ class RewardCampaign(Base, TimestampMixin):
 
     id = Column(Integer, primary_key=True)  # noqa: A003
     reward_slug = Column(String(32), index=True, nullable=False)
-    campaign_slug = Column(String(100), index=True, nullable=False)
+    campaign_slug = Column(String(100), nullable=False)
     retailer_id = Column(Integer, ForeignKey("retailer.id", ondelete="CASCADE"), nullable=False)
     campaign_status = Column(Enum(RewardCampaignStatuses), nullable=False)
 
@@ -0,0 +1,29 @@
+from sqlalchemy.future import select
+
+from carina.core.memory_profiling import memory_profiled
+from carina.db.session import SyncSessionMaker
+from carina.imports.code_filter import rebuild_reward_code_filter
+from carina.models import Retailer
+from carina.scheduled_tasks.scheduler import acquire_lock, cron_scheduler
+
+from . import logger
+
+
+@acquire_lock(runner=cron_scheduler)
+@memory_profiled("reward-code-filter-rebuild")
+def rebuild_reward_code_filters() -> None:
+    """
+    Rebuilds the reward code filter of every retailer, building the missing ones and dropping the codes of
+    the rewards deleted since the last rebuild.
+    """
+    with SyncSessionMaker() as db_session:
+        retailer_ids = db_session.execute(select(Retailer.id)).scalars().all()
+        db_session.commit()
+        for retailer_id in retailer_ids:
+            try:
+                added = rebuild_reward_code_filter(db_session, retailer_id)
+            except TimeoutError as ex:
+                logger.warning("%s", ex)
+                continue
+
+            logger.info("Rebuilt the reward code filter of retailer %d with %d codes.", retailer_id, added)
@@ -0,0 +1,28 @@
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+from rq import Queue
+
+from carina.tasks.queue_latency import as_utc
+
+from . import logger
+
+if TYPE_CHECKING:  # pragma: no cover
+    from prometheus_client import Gauge
+    from redis import Redis
+
+
+def report_oldest_job_age(redis: "Redis", project_name: str, queue_names: list[str], gauge: "Gauge") -> None:
+    """
+    Sets the age in seconds of the oldest job waiting in each of the provided RQ queues, or 0 for empty queues.
+    Jobs scheduled for a later retry are not waiting in the queue and are not taken into account.
+    """
+
+    now = datetime.now(tz=timezone.utc)
+    for queue_name in queue_names:
+        oldest_job_age = 0.0
+        if (jobs := Queue(queue_name, connection=redis).get_jobs(offset=0, length=1)) and jobs[0].enqueued_at:
+            oldest_job_age = max((now - as_utc(jobs[0].enqueued_at)).total_seconds(), 0.0)
+
+        logger.info("Oldest job in queue %s is %.1f seconds old", queue_name, oldest_job_age)
+        gauge.labels(app=project_name, queue_name=queue_name).set(oldest_job_age)
@@ -12,6 +12,7 @@ from apscheduler.triggers.cron import CronTrigger
 from apscheduler.util import undefined
 
 from carina.core.config import redis, settings
+from carina.core.profiling import profiler
 from carina.scheduled_tasks import logger as scheduled_tasks_logger
 
 from . import logger
@@ -102,8 +103,18 @@ class CronScheduler:  # pragma: no cover
             self.log.warning(f"No schedule provided! Reverting to default of '{self.default_schedule}'.")
             schedule = self.default_schedule
 
+        if owner := getattr(job_func, "__self__", None):
+            job_name = f"{type(owner).__name__}.{job_func.__name__}"
+        else:
+            job_name = getattr(job_func, "__qualname__", repr(job_func))
+
+        @wraps(job_func)
+        def _labelled_job_func(*job_args: Any, **job_kwargs: Any) -> None:
+            with profiler.label_thread(f"cron:{job_name}"):
+                job_func(*job_args, **job_kwargs)
+
         self._scheduler.add_job(
-            job_func, trigger=self._get_trigger(schedule), coalesce=coalesce_jobs, args=args, kwargs=kwargs
+            _labelled_job_func, trigger=self._get_trigger(schedule), coalesce=coalesce_jobs, args=args, kwargs=kwargs
         )
 
     def run(self) -> None:
@@ -5,6 +5,7 @@ from retry_tasks_lib.db.models import RetryTask, RetryTaskStatuses
 from sqlalchemy import delete
 
 from carina.core.config import settings
+from carina.core.memory_profiling import memory_profiled
 from carina.db.session import SyncSessionMaker
 from carina.scheduled_tasks.scheduler import acquire_lock, cron_scheduler
 
@@ -12,6 +13,7 @@ from . import logger
 
 
 @acquire_lock(runner=cron_scheduler)
+@memory_profiled("task-cleanup")
 def cleanup_old_tasks() -> None:
     """
     Delete retry_task data (including related db objects i.e task_type_key_values)
@@ -3,6 +3,8 @@ from typing import TYPE_CHECKING
 from retry_tasks_lib.db.models import RetryTask
 from retry_tasks_lib.utils.synchronous import cleanup_handler
 
+from carina.core.memory_profiling import memory_profiled
+from carina.core.tracing import traced_task
 from carina.db.session import SyncSessionMaker
 from carina.fetch_reward import cleanup_reward
 from carina.tasks.shared_crud import get_reward_config
@@ -12,6 +14,8 @@ if TYPE_CHECKING:
 
 
 @cleanup_handler(db_session_factory=SyncSessionMaker)
+@traced_task("reward-issuance-cleanup")
+@memory_profiled("reward-issuance-cleanup")
 def reward_issuance_cleanup_handler(retry_task: RetryTask, db_session: "Session") -> None:
     reward_config = get_reward_config(db_session, retry_task.get_params()["reward_config_id"])
     cleanup_reward(db_session, reward_config, retry_task)
@@ -14,6 +14,8 @@ from sqlalchemy.future import select
 from carina.activity_utils.enums import ActivityType
 from carina.activity_utils.tasks import sync_send_activity
 from carina.core.config import redis_raw, settings
+from carina.core.memory_profiling import memory_profiled
+from carina.core.tracing import traced_task
 from carina.db.base_class import sync_run_query
 from carina.db.session import SyncSessionMaker
 from carina.enums import RewardCampaignStatuses
@@ -23,6 +25,8 @@ from carina.tasks.shared_crud import get_reward_config
 
 from . import logger, send_request_with_metrics
 from .prometheus import task_processing_time_callback_fn, tasks_run_total
+from .queue_latency import observe_allocation_to_issued_time, track_queue_latency
+from .stage_timing import add_stage_timings_to_audit, stage, track_stages
 
 if TYPE_CHECKING:  # pragma: no cover
     from sqlalchemy.orm import Session, SessionTransaction
@@ -73,34 +77,36 @@ def _process_issuance(task_params: dict, validity_days: int | None = None) -> di
     if campaign_slug:
         payload["campaign_slug"] = campaign_slug
 
-    resp = send_request_with_metrics(
-        "POST",
-        url_template=url_template,
-        url_kwargs=url_kwargs,
-        exclude_from_label_url=exclude,
-        json=payload,
-        headers={
-            "Authorization": f"Token {settings.POLARIS_API_AUTH_TOKEN}",
-            "Idempotency-Token": task_params["idempotency_token"],
-        },
-    )
-    resp.raise_for_status()
+    with stage("polaris_request"):
+        resp = send_request_with_metrics(
+            "POST",
+            url_template=url_template,
+            url_kwargs=url_kwargs,
+            exclude_from_label_url=exclude,
+            json=payload,
+            headers={
+                "Authorization": f"Token {settings.POLARIS_API_AUTH_TOKEN}",
+                "Idempotency-Token": task_params["idempotency_token"],
+            },
+        )
+        resp.raise_for_status()
     response_audit["response"] = {"status": resp.status_code, "body": resp.text}
     logger.info(f"Allocation succeeded for reward: {task_params['reward_uuid']}")
 
-    sync_send_activity(
-        ActivityType.get_reward_status_activity_data(
-            account_url_path=parsed_url.path,
-            retailer_slug=task_params["retailer_slug"],
-            reward_slug=task_params["reward_slug"],
-            activity_timestamp=issued_date,
-            reward_uuid=task_params["reward_uuid"],
-            pending_reward_id=task_params.get("pending_reward_id", None),
-            campaign_slug=campaign_slug,
-            is_campaign_end=bool(task_params.get("reason")),
-        ),
-        routing_key=ActivityType.REWARD_STATUS.value,
-    )
+    with stage("send_activity"):
+        sync_send_activity(
+            ActivityType.get_reward_status_activity_data(
+                account_url_path=parsed_url.path,
+                retailer_slug=task_params["retailer_slug"],
+                reward_slug=task_params["reward_slug"],
+                activity_timestamp=issued_date,
+                reward_uuid=task_params["reward_uuid"],
+                pending_reward_id=task_params.get("pending_reward_id", None),
+                campaign_slug=campaign_slug,
+                is_campaign_end=bool(task_params.get("reason")),
+            ),
+            routing_key=ActivityType.REWARD_STATUS.value,
+        )
 
     return response_audit
 
@@ -184,36 +190,46 @@ def _process_and_issue_reward(db_session: "Session", retry_task: RetryTask, vali
                 db_session=db_session, retry_task=retry_task, reward_uuid=task_params.get("reward_uuid")
             )
         raise
+
+    response_audit = add_stage_timings_to_audit(response_audit)
     retry_task.update_task(
         db_session, response_audit=response_audit, status=RetryTaskStatuses.SUCCESS, clear_next_attempt_time=True
     )
+    observe_allocation_to_issued_time(retry_task)
 
 
 # NOTE: Inter-dependency: If this function's name or module changes, ensure that
 # it is relevantly reflected in the TaskType table
+@track_queue_latency(settings.REWARD_ISSUANCE_TASK_NAME)
+@memory_profiled(settings.REWARD_ISSUANCE_TASK_NAME)
 @retryable_task(db_session_factory=SyncSessionMaker, metrics_callback_fn=task_processing_time_callback_fn)
+@traced_task(settings.REWARD_ISSUANCE_TASK_NAME)
+@track_stages(settings.REWARD_ISSUANCE_TASK_NAME)
 def issue_reward(retry_task: RetryTask, db_session: "Session") -> None:
     """Try to fetch and issue a reward, unless the campaign has been cancelled"""
     if settings.ACTIVATE_TASKS_METRICS:
         tasks_run_total.labels(app=settings.PROJECT_NAME, task_name=settings.REWARD_ISSUANCE_TASK_NAME).inc()
 
-    retailer = _get_retailer_by_slug(db_session, retry_task.get_params()["retailer_slug"])
-    reward_campaign: RewardCampaign = _get_reward_campaign(
-        db_session=db_session,
-        campaign_slug=retry_task.get_params()["campaign_slug"],
-        retailer_id=retailer.id,
-    )
+    with stage("load_campaign"):
+        retailer = _get_retailer_by_slug(db_session, retry_task.get_params()["retailer_slug"])
+        reward_campaign: RewardCampaign = _get_reward_campaign(
+            db_session=db_session,
+            campaign_slug=retry_task.get_params()["campaign_slug"],
+            retailer_id=retailer.id,
+        )
     if reward_campaign.campaign_status == RewardCampaignStatuses.CANCELLED:
         _cancel_task(db_session, retry_task)
         return
 
-    reward_config = get_reward_config(db_session, retry_task.get_params()["reward_config_id"])
+    with stage("load_reward_config"):
+        reward_config = get_reward_config(db_session, retry_task.get_params()["reward_config_id"])
     # Process the allocation if it has a reward, else try to get a reward - requeue that if necessary
     if "reward_uuid" in retry_task.get_params():
         validity_days = reward_config.load_required_fields_values().get("validity_days")
         _process_and_issue_reward(db_session, retry_task, validity_days=validity_days)
     else:
-        reward_data = get_allocable_reward(db_session, reward_config, retry_task)
+        with stage("get_allocable_reward"):
+            reward_data = get_allocable_reward(db_session, reward_config, retry_task)
 
         if reward_data.reward is not None:
             key_ids = retry_task.task_type.get_key_ids_by_name()
@@ -241,13 +257,14 @@ def issue_reward(retry_task: RetryTask, db_session: "Session") -> None:
                 db_savepoint.commit()
                 db_session.commit()
 
-            sync_run_query(
-                _add_reward_to_task_values_and_set_allocated,
-                db_session,
-                reward=reward_data.reward,
-                use_savepoint=True,
-            )
-            db_session.refresh(retry_task)  # Ensure retry_task represents latest DB changes
+            with stage("allocate_reward"):
+                sync_run_query(
+                    _add_reward_to_task_values_and_set_allocated,
+                    db_session,
+                    reward=reward_data.reward,
+                    use_savepoint=True,
+                )
+                db_session.refresh(retry_task)  # Ensure retry_task represents latest DB changes
             _process_and_issue_reward(db_session, retry_task, validity_days=reward_data.validity_days)
         else:  # requeue the allocation attempt and alert if required
             if settings.MESSAGE_IF_NO_PRE_LOADED_REWARDS:
@@ -265,12 +282,13 @@ def issue_reward(retry_task: RetryTask, db_session: "Session") -> None:
                 retry_task.status = RetryTaskStatuses.WAITING
                 db_session.commit()
 
-            sync_run_query(_set_waiting, db_session)
+            with stage("requeue"):
+                sync_run_query(_set_waiting, db_session)
 
-            next_attempt_time = enqueue_retry_task_delay(
-                connection=redis_raw,
-                retry_task=retry_task,
-                delay_seconds=settings.REWARD_ISSUANCE_REQUEUE_BACKOFF_SECONDS,
-            )
-            logger.info(f"Next attempt time at {next_attempt_time}")
-            retry_task.update_task(db_session, next_attempt_time=next_attempt_time)
+                next_attempt_time = enqueue_retry_task_delay(
+                    connection=redis_raw,
+                    retry_task=retry_task,
+                    delay_seconds=settings.REWARD_ISSUANCE_REQUEUE_BACKOFF_SECONDS,
+                )
+                logger.info(f"Next attempt time at {next_attempt_time}")
+                retry_task.update_task(db_session, next_attempt_time=next_attempt_time)
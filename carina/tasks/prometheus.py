@@ -50,6 +50,87 @@ tasks_processing_time_histogram = Histogram(
     labelnames=("app", "task_name"),
 )
 
+tasks_stage_processing_time_histogram = Histogram(
+    name=f"{METRIC_NAME_PREFIX}tasks_stage_processing_time",
+    documentation="Time taken by each stage of a task to process",
+    labelnames=("app", "task_name", "stage"),
+)
+
+tasks_queue_wait_time_histogram = Histogram(
+    name=f"{METRIC_NAME_PREFIX}tasks_queue_wait_time",
+    documentation="Time between a task's job being enqueued and a worker starting it",
+    labelnames=("app", "queue_name", "task_name"),
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, float("inf")),
+)
+
+tasks_run_time_histogram = Histogram(
+    name=f"{METRIC_NAME_PREFIX}tasks_run_time",
+    documentation="Time between a worker starting a task's job and the job finishing",
+    labelnames=("app", "queue_name", "task_name"),
+)
+
+reward_allocation_to_issued_time_histogram = Histogram(
+    name=f"{METRIC_NAME_PREFIX}reward_allocation_to_issued_time",
+    documentation="Time between a reward allocation being requested and the reward issuance task succeeding",
+    labelnames=("app", "queue_name", "task_name"),
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 21600, 86400, float("inf")),
+)
+
+job_queue_oldest_job_age = Gauge(
+    name=f"{METRIC_NAME_PREFIX}job_queue_oldest_job_age",
+    documentation="Age in seconds of the oldest job waiting in each RQ queue, 0 if the queue is empty",
+    labelnames=("app", "queue_name"),
+)
+
+job_peak_rss = Gauge(
+    name=f"{METRIC_NAME_PREFIX}job_peak_rss_bytes",
+    documentation="Peak resident set size of the process while running the last instance of a job",
+    labelnames=("app", "job_name"),
+    multiprocess_mode="max",
+)
+
+job_traced_memory_peak = Gauge(
+    name=f"{METRIC_NAME_PREFIX}job_traced_memory_peak_bytes",
+    documentation="Peak memory allocated by Python, as traced by tracemalloc, while running the last instance of a job",
+    labelnames=("app", "job_name"),
+    multiprocess_mode="max",
+)
+
+job_approximate_traced_memory_delta = Gauge(
+    name=f"{METRIC_NAME_PREFIX}job_approximate_traced_memory_delta_bytes",
+    documentation=(
+        "Change in memory allocated by Python, as traced by tracemalloc, over the last instance of a job "
+        "including the allocations of concurrently running jobs"
+    ),
+    labelnames=("app", "job_name"),
+    multiprocess_mode="liveall",
+)
+
+blob_import_blobs_total = Counter(
+    name=f"{METRIC_NAME_PREFIX}blob_import_blobs_total",
+    documentation="Blobs handled by the file agents by outcome: listed, processed, archived or errored",
+    labelnames=("app", "agent_type", "retailer_slug", "outcome"),
+)
+
+blob_import_downloaded_bytes_total = Counter(
+    name=f"{METRIC_NAME_PREFIX}blob_import_downloaded_bytes_total",
+    documentation="Bytes downloaded by the file agents, as stored in the blobs",
+    labelnames=("app", "agent_type", "retailer_slug"),
+)
+
+blob_import_rows_total = Counter(
+    name=f"{METRIC_NAME_PREFIX}blob_import_rows_total",
+    documentation="Rows read by the file agents by result: parsed, invalid, pre_existing, unknown or inserted",
+    labelnames=("app", "agent_type", "retailer_slug", "result"),
+)
+
+blob_import_stage_duration_histogram = Histogram(
+    name=f"{METRIC_NAME_PREFIX}blob_import_stage_duration",
+    documentation="Time spent by the file agents in each stage of processing a blob, or a batch of small blobs",
+    labelnames=("app", "agent_type", "retailer_slug", "stage"),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, float("inf")),
+)
+
 
 def update_metrics_hook(url_label: str) -> Callable:  # pragma: no cover
     def update_metrics(resp: "Response", *args: Any, **kwargs: Any) -> None:
@@ -77,3 +158,9 @@ def update_metrics_exception_handler(ex: "RequestException", method: str, url: s
 def task_processing_time_callback_fn(task_processing_time: float, task_name: str) -> None:
     logger.info(f"Updating {tasks_processing_time_histogram} metrics...")
     tasks_processing_time_histogram.labels(app=settings.PROJECT_NAME, task_name=task_name).observe(task_processing_time)
+
+
+def task_stage_processing_time_callback_fn(stage_processing_time: float, task_name: str, stage: str) -> None:
+    tasks_stage_processing_time_histogram.labels(app=settings.PROJECT_NAME, task_name=task_name, stage=stage).observe(
+        stage_processing_time
+    )
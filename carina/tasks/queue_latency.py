@@ -0,0 +1,76 @@
+from collections.abc import Callable
+from datetime import datetime, timezone
+from functools import wraps
+from typing import TYPE_CHECKING, Any
+
+from rq import get_current_job
+
+from carina.core.config import settings
+
+from .prometheus import (
+    reward_allocation_to_issued_time_histogram,
+    tasks_queue_wait_time_histogram,
+    tasks_run_time_histogram,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from retry_tasks_lib.db.models import RetryTask
+
+
+def as_utc(dt: datetime) -> datetime:
+    """RQ and the retry_task table store naive UTC datetimes"""
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+def _seconds_since(dt: datetime) -> float:
+    return max((datetime.now(tz=timezone.utc) - as_utc(dt)).total_seconds(), 0.0)
+
+
+def track_queue_latency(task_name: str) -> Callable:
+    """
+    Decorator for RQ job functions, records how long the job waited in its queue before a worker
+    picked it up and how long the worker took to run it.
+
+    Does nothing if the decorated function is not running as part of an RQ job.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            job = get_current_job()
+            if not settings.ACTIVATE_TASKS_METRICS or job is None:
+                return func(*args, **kwargs)
+
+            labels = {"app": settings.PROJECT_NAME, "queue_name": job.origin, "task_name": task_name}
+            started_at = as_utc(job.started_at) if job.started_at else datetime.now(tz=timezone.utc)
+            if job.enqueued_at:
+                tasks_queue_wait_time_histogram.labels(**labels).observe(
+                    max((started_at - as_utc(job.enqueued_at)).total_seconds(), 0.0)
+                )
+
+            try:
+                return func(*args, **kwargs)
+            finally:
+                tasks_run_time_histogram.labels(**labels).observe(_seconds_since(started_at))
+
+        return wrapper
+
+    return decorator
+
+
+def observe_allocation_to_issued_time(retry_task: "RetryTask") -> None:
+    """
+    Records the time between the allocation request and the reward being successfully issued.
+
+    The task's params do not reference its `Allocation`, so the task's `created_at` is used in place of the
+    `Allocation`'s: `crud.create_reward_issuance_retry_tasks` inserts both in the same transaction.
+    """
+
+    if not settings.ACTIVATE_TASKS_METRICS:
+        return
+
+    reward_allocation_to_issued_time_histogram.labels(
+        app=settings.PROJECT_NAME,
+        queue_name=retry_task.task_type.queue_name,
+        task_name=retry_task.task_type.name,
+    ).observe(_seconds_since(retry_task.created_at))
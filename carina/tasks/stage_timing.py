@@ -0,0 +1,84 @@
+import random
+import time
+
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any
+
+from carina.core.config import settings
+
+from .prometheus import task_stage_processing_time_callback_fn
+
+
+class StageTimings:
+    def __init__(self, task_name: str, *, sampled: bool) -> None:
+        self.task_name = task_name
+        self.sampled = sampled
+        self.durations: dict[str, float] = {}
+
+    def record(self, stage_name: str, duration: float) -> None:
+        self.durations[stage_name] = self.durations.get(stage_name, 0.0) + duration
+        if settings.ACTIVATE_TASKS_METRICS:
+            task_stage_processing_time_callback_fn(duration, self.task_name, stage_name)
+
+
+_current_stage_timings: ContextVar[StageTimings | None] = ContextVar("current_stage_timings", default=None)
+
+
+def track_stages(task_name: str) -> Callable:
+    """
+    Decorator for task functions, enables `stage` timings for the duration of the decorated call.
+
+    A task is sampled for auditing based on `settings.TASK_STAGE_TIMINGS_AUDIT_SAMPLE_RATE`,
+    the histogram metrics are collected regardless of sampling.
+
+    The task's final `update_task`, which writes the audit, is not a stage so that the histograms
+    and the audited breakdown cover the same stages.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            sampled = random.random() < settings.TASK_STAGE_TIMINGS_AUDIT_SAMPLE_RATE  # noqa: S311
+            token = _current_stage_timings.set(StageTimings(task_name, sampled=sampled))
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _current_stage_timings.reset(token)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def stage(stage_name: str) -> Generator[None, None, None]:
+    """
+    Times the wrapped block as `stage_name` of the task currently being tracked.
+    Does nothing if called outside of a function decorated with `track_stages`.
+    """
+
+    timings = _current_stage_timings.get()
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.record(stage_name, time.perf_counter() - start)
+
+
+def add_stage_timings_to_audit(response_audit: dict) -> dict:
+    """Adds the stages breakdown collected so far to the provided response audit if the task is sampled."""
+
+    timings = _current_stage_timings.get()
+    if timings is not None and timings.sampled and timings.durations:
+        response_audit["stage_timings"] = {
+            stage_name: round(duration, 6) for stage_name, duration in timings.durations.items()
+        }
+
+    return response_audit
@@ -277,6 +277,7 @@ def reward_issuance_task_type(db_session: "Session") -> TaskType:
                 ("retailer_slug", "STRING"),
                 ("campaign_slug", "STRING"),
                 ("reason", "STRING"),
+                ("traceparent", "STRING"),
             )
         ]
     )
@@ -304,6 +305,7 @@ def reward_status_adjustment_task_type(db_session: "Session") -> TaskType:
                 ("retailer_slug", "STRING"),
                 ("date", "FLOAT"),
                 ("status", "STRING"),
+                ("traceparent", "STRING"),
             )
         ]
     )
@@ -1,14 +1,15 @@
-from collections.abc import Callable
+from collections.abc import Callable, Generator
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING, Any
 from uuid import uuid4
 
 import pytest
 
+from pytest_mock import MockerFixture
 from retry_tasks_lib.db.models import RetryTask, TaskType, TaskTypeKeyValue
 from retry_tasks_lib.utils.synchronous import sync_create_task
 
-from carina.core.config import settings
+from carina.core.config import redis_raw, settings
 from carina.enums import RewardTypeStatuses, RewardUpdateStatuses
 from carina.models import RetailerFetchType, Reward, RewardUpdate
 from carina.models.reward import RewardConfig
@@ -17,6 +18,15 @@ if TYPE_CHECKING:
     from sqlalchemy.orm import Session
 
 
+@pytest.fixture(scope="function")
+def code_filter_settings(mocker: MockerFixture) -> Generator[None, None, None]:
+    mocker.patch.object(settings, "REWARD_CODE_FILTER_ENABLED", True)
+    mocker.patch.object(settings, "REWARD_CODE_FILTER_SIZE_BITS", 2**16)
+    mocker.patch.object(settings, "REWARD_CODE_FILTER_HASHES", 4)
+    yield
+    redis_raw.delete(*redis_raw.keys(f"{settings.REDIS_KEY_PREFIX}reward-code-filter:*"))
+
+
 @pytest.fixture(scope="function")
 def reward_issuance_task_params(reward: Reward) -> dict:
     return {
@@ -6,13 +6,17 @@ from unittest import mock
 from uuid import uuid4
 
 import httpretty
+import pytest
 
+from redis import RedisError
 from retry_tasks_lib.db.models import TaskTypeKey, TaskTypeKeyValue
 from sqlalchemy import insert
 from sqlalchemy.future import select
 
 from carina.core.config import redis_raw
 from carina.fetch_reward.jigsaw import Jigsaw
+from carina.imports.code_filter import filter_key, rebuild_reward_code_filter
+from carina.models import Reward
 
 from . import AnswerBotBase
 
@@ -179,6 +183,64 @@ def test_jigsaw_agent_ok_token_already_set(
     assert json.loads(task_params["agent_state_params_raw"]) == {"associated_url": sample_url}
 
 
+@httpretty.activate
+@pytest.mark.usefixtures("code_filter_settings")
+def test_jigsaw_agent_ok_reward_code_filter_unavailable(
+    mocker: "MockerFixture",
+    db_session: "Session",
+    jigsaw_reward_config: "RewardConfig",
+    jigsaw_retailer_fetch_type: "RetailerFetchType",
+    issuance_retry_task_no_reward: "RetryTask",
+    fernet: "Fernet",
+) -> None:
+    agent_config = jigsaw_retailer_fetch_type.load_agent_config()
+    tx_value = jigsaw_reward_config.load_required_fields_values()["transaction_value"]
+    card_ref = uuid4()
+    card_num = "NEW-REWARD-CODE"
+    # deepcode ignore HardcodedNonCryptoSecret/test: this is a test value
+    test_token = "test-token"
+    now = datetime.now(tz=timezone.utc)
+    httpretty.register_uri(
+        "POST",
+        f"{agent_config['base_url']}/order/V4/register",
+        body=json.dumps(
+            {
+                "status": 2000,
+                "status_description": "OK",
+                "messages": [],
+                "PartnerRef": "",
+                "data": {
+                    "__type": "Response_Data.cardData:#Order_V4",
+                    "customer_card_ref": str(card_ref),
+                    "reference": "339069",
+                    "number": card_num,
+                    "pin": "",
+                    "transaction_value": tx_value,
+                    "expiry_date": (now + timedelta(days=1)).isoformat(),
+                    "balance": tx_value,
+                    "voucher_url": "http://sample.url",
+                    "card_status": 1,
+                },
+            }
+        ),
+        status=200,
+    )
+
+    redis_raw.set(Jigsaw.REDIS_TOKEN_KEY, fernet.encrypt(test_token.encode()), timedelta(days=1))
+    retailer_id = jigsaw_reward_config.retailer_id
+    rebuild_reward_code_filter(db_session, retailer_id)
+    mocker.patch("carina.imports.code_filter._add_script", side_effect=RedisError("Fake connection error"))
+    mocker.patch("carina.fetch_reward.jigsaw.uuid4", return_value=card_ref)
+
+    with Jigsaw(db_session, jigsaw_reward_config, agent_config, retry_task=issuance_retry_task_no_reward) as agent:
+        reward_data = agent.fetch_reward()
+
+    # the reward registered with Jigsaw is saved, the filter missing its code is deleted
+    assert reward_data.reward is not None
+    assert db_session.execute(select(Reward.code).where(Reward.id == card_ref)).scalar_one() == card_num
+    assert not redis_raw.exists(filter_key(retailer_id))
+
+
 @httpretty.activate
 def test_jigsaw_agent_ok_card_ref_in_task_params(
     mocker: "MockerFixture",
@@ -0,0 +1,128 @@
+import csv
+import hashlib
+
+from datetime import date
+from io import BytesIO, StringIO
+
+import pytest
+
+from sqlalchemy.future import select
+
+from carina.enums import FileAgentType, RewardFileLogStatuses
+from carina.imports.agents.error_reports import ErrorReport
+from carina.imports.agents.file_agent import BlobProcessingError
+from carina.imports.backfill import BulkLoadError, load_reward_codes
+from carina.models import Reward, RewardFileLog
+from tests.conftest import SetupType
+
+FILE_NAME = "rewards.import.test-reward.expires.2030-01-01.backfill.csv"
+BLOB_NAME = f"test-retailer/{FILE_NAME}"
+CONTENT = b"CODE1\nCODE2\nTSTCD1234\nCODE2\nCODE3,extra\nCODE4\n"
+
+
+def _get_report_rows(report: ErrorReport) -> list[tuple[str, str, str]]:
+    header, *rows = csv.reader(StringIO(report.getvalue()))
+    assert header == ["row_num", "code", "reason", "status", "detail"]
+    return sorted((row_num, code, reason) for row_num, code, reason, *_ in rows)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_load_reward_codes(setup: SetupType, workers: int) -> None:
+    db_session, reward_config, pre_existing_reward = setup
+
+    progress = load_reward_codes("test-retailer", FILE_NAME, BytesIO(CONTENT), workers=workers, batch_size=2)
+
+    reward_file_log = db_session.execute(select(RewardFileLog).where(RewardFileLog.file_name == BLOB_NAME)).scalar_one()
+    assert reward_file_log.file_agent_type == FileAgentType.IMPORT
+    assert reward_file_log.status == RewardFileLogStatuses.COMPLETED
+    assert reward_file_log.rows_processed == 6
+    assert reward_file_log.bytes_processed == len(CONTENT)
+    assert reward_file_log.content_digest == hashlib.md5(CONTENT, usedforsecurity=False).hexdigest()
+
+    rewards = db_session.execute(select(Reward).where(Reward.reward_file_log_id == reward_file_log.id)).scalars().all()
+    assert sorted(reward.code for reward in rewards) == ["CODE1", "CODE2", "CODE4"]
+    assert all(reward.reward_config_id == reward_config.id for reward in rewards)
+    assert all(reward.expiry_date == date(2030, 1, 1) for reward in rewards)
+
+    assert progress.rows == 6
+    assert progress.inserted == 3
+    # CODE2 is repeated in a later batch, it is not pre-existing
+    assert _get_report_rows(progress.report) == [
+        ("3", pre_existing_reward.code, "pre-existing code"),
+        ("5", "CODE3", "invalid row"),
+    ]
+
+
+def test_load_reward_codes_resumes_interrupted_load(setup: SetupType) -> None:
+    db_session, reward_config, _ = setup
+    reward_file_log = RewardFileLog(file_name=BLOB_NAME, file_agent_type=FileAgentType.IMPORT)
+    db_session.add(reward_file_log)
+    db_session.flush()
+    db_session.add(
+        Reward(
+            code="CODE1",
+            retailer_id=reward_config.retailer_id,
+            reward_config_id=reward_config.id,
+            reward_file_log_id=reward_file_log.id,
+            expiry_date=date(2030, 1, 1),
+        )
+    )
+    db_session.commit()
+
+    progress = load_reward_codes("test-retailer", FILE_NAME, BytesIO(CONTENT), workers=1)
+
+    db_session.refresh(reward_file_log)
+    assert reward_file_log.status == RewardFileLogStatuses.COMPLETED
+    assert reward_file_log.rows_processed == 6
+    assert progress.inserted == 2
+    # the codes loaded before the interruption are not pre-existing
+    assert [reason for _, _, reason in _get_report_rows(progress.report)] == ["pre-existing code", "invalid row"]
+    assert db_session.execute(
+        select(Reward.code).where(Reward.reward_file_log_id == reward_file_log.id).order_by(Reward.code)
+    ).scalars().all() == ["CODE1", "CODE2", "CODE4"]
+
+
+def test_load_reward_codes_duplicate_file(setup: SetupType) -> None:
+    db_session, _, _ = setup
+    db_session.add(
+        RewardFileLog(file_name=BLOB_NAME, file_agent_type=FileAgentType.IMPORT, status=RewardFileLogStatuses.COMPLETED)
+    )
+    db_session.commit()
+
+    with pytest.raises(BulkLoadError, match="is a duplicate"):
+        load_reward_codes("test-retailer", FILE_NAME, BytesIO(CONTENT), workers=1)
+
+
+def test_load_reward_codes_duplicate_content(setup: SetupType) -> None:
+    db_session, _, _ = setup
+    db_session.add(
+        RewardFileLog(
+            file_name="test-retailer/rewards.import.test-reward.original.csv",
+            file_agent_type=FileAgentType.IMPORT,
+            status=RewardFileLogStatuses.COMPLETED,
+            content_digest=hashlib.md5(CONTENT, usedforsecurity=False).hexdigest(),
+        )
+    )
+    db_session.commit()
+
+    with pytest.raises(BulkLoadError, match="has the same content as the already imported"):
+        load_reward_codes("test-retailer", FILE_NAME, BytesIO(CONTENT), workers=1)
+
+    assert (
+        db_session.execute(select(RewardFileLog).where(RewardFileLog.file_name == BLOB_NAME)).scalar_one_or_none()
+        is None
+    )
+
+
+@pytest.mark.parametrize(
+    ("file_name", "error"),
+    [
+        ("rewards.import.test-reward.backfill.txt", "does not have .csv ext"),
+        ("rewards.test-reward.backfill.csv", "path does not match blob path template"),
+        ("rewards.import.unknown-reward.backfill.csv", "No RewardConfig found for reward_slug unknown-reward"),
+        ("rewards.import.test-reward.expires.2030-13-01.backfill.csv", "expiry date is invalid"),
+    ],
+)
+def test_load_reward_codes_invalid_file_name(setup: SetupType, file_name: str, error: str) -> None:
+    with pytest.raises(BlobProcessingError, match=error):
+        load_reward_codes("test-retailer", file_name, BytesIO(CONTENT), workers=1)
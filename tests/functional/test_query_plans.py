@@ -0,0 +1,119 @@
+"""
+Query plan regression tests for the hot path queries.
+
+Each query's plan must scan the index that is meant to serve it, sequential scans are disabled so that the planner
+picks an index over a scan of the few seeded rows whenever one can serve the query.
+"""
+from collections.abc import Generator, Iterator
+from typing import TYPE_CHECKING, Any
+
+import pytest
+
+from sqlalchemy import text
+from sqlalchemy.future import select
+
+from carina.imports.agents.file_agent import RewardUpdatesAgent
+from carina.imports.bulk_load import (
+    INSERT_FROM_STAGING_TABLE_SQL,
+    SELECT_STAGED_CODES_FROM_FILE_SQL,
+    bulk_insert_reward_codes,
+    stage_reward_codes,
+)
+from carina.models import Retailer, Reward, RewardCampaign, RewardUpdate
+from carina.models.retailer import RetailerFetchType
+from tests.conftest import SetupType
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+    from sqlalchemy.sql import ClauseElement
+
+HOT_TABLES = {"reward", "reward_campaign", "retailer", "retailer_fetch_type", "reward_update"}
+
+
+def _iter_plan_nodes(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    yield plan
+    for sub_plan in plan.get("Plans", []):
+        yield from _iter_plan_nodes(sub_plan)
+
+
+def _get_index_names(db_session: "Session", stmt: "ClauseElement", params: dict | None = None) -> set[str]:
+    compiled = stmt.compile(dialect=db_session.get_bind().dialect)
+    (explained,) = (
+        db_session.connection()
+        .exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.construct_params(params))
+        .scalar_one()
+    )
+    return {node["Index Name"] for node in _iter_plan_nodes(explained["Plan"]) if "Index Name" in node}
+
+
+@pytest.fixture()
+def seeded_db_session(setup: SetupType) -> Generator["Session", None, None]:
+    db_session, reward_config, _ = setup
+    bulk_insert_reward_codes(
+        db_session,
+        codes=[f"CODE{i:06d}" for i in range(1000)],
+        reward_config_id=reward_config.id,
+        retailer_id=reward_config.retailer_id,
+        expiry_date=None,
+        reward_file_log_id=None,
+    )
+    db_session.commit()
+    for table_name in HOT_TABLES:
+        db_session.execute(text(f"ANALYZE {table_name}"))
+    db_session.execute(text("SET LOCAL enable_seqscan = off"))
+    yield db_session
+
+
+def test_hot_path_lookups_use_indexes(seeded_db_session: "Session", setup: SetupType) -> None:
+    _, reward_config, reward = setup
+    retailer_id = reward_config.retailer_id
+
+    for stmt, index_name in (
+        (
+            # PreLoaded._get_allocable_reward
+            select(Reward)
+            .with_for_update(skip_locked=True)
+            .where(
+                Reward.reward_config_id == reward_config.id,
+                Reward.allocated.is_(False),
+                Reward.deleted.is_(False),
+            )
+            .limit(1),
+            "ix_reward_allocable",
+        ),
+        (select(Reward).where(Reward.id == reward.id), "reward_pkey"),
+        (select(Retailer).where(Retailer.slug == "test-retailer"), "ix_retailer_slug"),
+        (
+            select(RetailerFetchType).where(
+                RetailerFetchType.retailer_id == retailer_id,
+                RetailerFetchType.fetch_type_id == reward_config.fetch_type_id,
+            ),
+            "retailer_fetch_type_pkey",
+        ),
+        (
+            select(RewardCampaign).where(
+                RewardCampaign.campaign_slug == "test-campaign", RewardCampaign.retailer_id == retailer_id
+            ),
+            "campaign_slug_retailer_unq",
+        ),
+        (select(RewardUpdate).where(RewardUpdate.reward_uuid == reward.id), "ix_reward_update_reward_uuid"),
+        (
+            RewardUpdatesAgent._select_rewards_for_update(retailer_id, ["CODE000001", "CODE000002"]),
+            "ix_reward_code_hash",
+        ),
+    ):
+        assert index_name in _get_index_names(seeded_db_session, stmt), str(stmt)
+
+
+@pytest.mark.parametrize("stmt", [SELECT_STAGED_CODES_FROM_FILE_SQL, INSERT_FROM_STAGING_TABLE_SQL])
+def test_staged_code_lookups_use_indexes(seeded_db_session: "Session", setup: SetupType, stmt: "ClauseElement") -> None:
+    _, reward_config, _ = setup
+    params = {
+        "reward_config_id": reward_config.id,
+        "retailer_id": reward_config.retailer_id,
+        "expiry_date": None,
+        "reward_file_log_id": 1,
+    }
+    stage_reward_codes(seeded_db_session, ["CODE000001", "NEWCODE"])
+
+    assert "ix_reward_code_hash" in _get_index_names(seeded_db_session, stmt, params)
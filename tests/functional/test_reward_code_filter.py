@@ -0,0 +1,71 @@
+import pytest
+
+from pytest_mock import MockerFixture
+from redis import RedisError
+from testfixtures import LogCapture
+
+from carina.core.config import redis_raw, settings
+from carina.imports.code_filter import add_codes, filter_key, get_maybe_existing_codes, rebuild_reward_code_filter
+from tests.conftest import SetupType
+
+
+@pytest.mark.usefixtures("code_filter_settings")
+def test_reward_code_filter(setup: SetupType) -> None:
+    db_session, reward_config, reward = setup
+    retailer_id = reward_config.retailer_id
+    codes = [reward.code, "new-code"]
+
+    # every code might exist until the filter is built
+    assert get_maybe_existing_codes(retailer_id, codes) == codes
+    # and new codes are not added to a filter that does not exist
+    add_codes(retailer_id, ["new-code"])
+    assert not redis_raw.exists(filter_key(retailer_id))
+
+    assert rebuild_reward_code_filter(db_session, retailer_id) == 1
+    assert get_maybe_existing_codes(retailer_id, codes) == {reward.code}
+
+    add_codes(retailer_id, ["new-code"])
+    assert get_maybe_existing_codes(retailer_id, codes) == {reward.code, "new-code"}
+    # other retailers' filters are not affected
+    assert get_maybe_existing_codes(retailer_id + 1, codes) == codes
+
+
+def test_reward_code_filter_disabled(setup: SetupType, mocker: MockerFixture) -> None:
+    mocker.patch.object(settings, "REWARD_CODE_FILTER_ENABLED", False)
+    mock_check_script = mocker.patch("carina.imports.code_filter._check_script")
+
+    assert get_maybe_existing_codes(setup.reward_config.retailer_id, ["code"]) == ["code"]
+    mock_check_script.assert_not_called()
+
+
+@pytest.mark.usefixtures("code_filter_settings")
+def test_add_codes_redis_error_deletes_filter(setup: SetupType, mocker: MockerFixture, capture: LogCapture) -> None:
+    db_session, reward_config, reward = setup
+    retailer_id = reward_config.retailer_id
+    rebuild_reward_code_filter(db_session, retailer_id)
+    mocker.patch("carina.imports.code_filter._add_script", side_effect=RedisError("Fake connection error"))
+
+    add_codes(retailer_id, ["new-code"])
+
+    # the filter would be missing the new code, every code might exist until it is rebuilt
+    assert not redis_raw.exists(filter_key(retailer_id))
+    assert get_maybe_existing_codes(retailer_id, [reward.code, "new-code"]) == [reward.code, "new-code"]
+    assert any(
+        f"Failed to add codes to the reward code filter of retailer {retailer_id}" in record.msg
+        for record in capture.records
+    )
+
+
+@pytest.mark.usefixtures("code_filter_settings")
+def test_add_codes_redis_down(setup: SetupType, mocker: MockerFixture, capture: LogCapture) -> None:
+    retailer_id = setup.reward_config.retailer_id
+    mocker.patch("carina.imports.code_filter._add_script", side_effect=RedisError("Fake connection error"))
+    mock_redis_raw = mocker.patch("carina.imports.code_filter.redis_raw")
+    mock_redis_raw.delete.side_effect = RedisError("Fake connection error")
+
+    add_codes(retailer_id, ["new-code"])
+
+    mock_redis_raw.delete.assert_called_once_with(filter_key(retailer_id), f"{filter_key(retailer_id)}:rebuild")
+    assert any(
+        f"Failed to delete the reward code filter of retailer {retailer_id}" in record.msg for record in capture.records
+    )
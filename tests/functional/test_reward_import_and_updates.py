@@ -1,32 +1,43 @@
+import csv
+import gzip
+import hashlib
 import logging
 
 from collections import defaultdict
 from collections.abc import Callable
 from datetime import date, datetime, time, timezone
-from typing import TYPE_CHECKING
+from io import StringIO
+from typing import TYPE_CHECKING, Any
 from unittest import mock
 
 import pytest
 import redis
+import zstandard
 
-from azure.storage.blob import BlobClient, BlobServiceClient, ContainerClient
+from azure.storage.blob import BlobClient, BlobLeaseClient, BlobServiceClient, ContainerClient, ContentSettings
 from pytest_mock import MockerFixture
 from retry_tasks_lib.db.models import RetryTask, TaskType
 from sqlalchemy import func
 from sqlalchemy.future import select
 from testfixtures import LogCapture
 
-from carina.enums import FileAgentType, RewardTypeStatuses, RewardUpdateStatuses
+from carina.core.config import redis_raw, settings
+from carina.enums import FileAgentType, RewardFileLogStatuses, RewardTypeStatuses, RewardUpdateStatuses
+from carina.imports.agents import file_agent
+from carina.imports.agents.error_reports import ErrorReason, ErrorReport
 from carina.imports.agents.file_agent import (
     BlobProcessingError,
     RewardFileLog,
     RewardImportAgent,
     RewardUpdateRow,
     RewardUpdatesAgent,
+    RewardUpdateValues,
 )
+from carina.imports.agents.update_parser import RewardUpdateData
+from carina.imports.bulk_load import bulk_insert_reward_codes
+from carina.imports.code_filter import filter_key, rebuild_reward_code_filter
 from carina.models import Reward, RewardUpdate
 from carina.models.retailer import Retailer
-from carina.schemas import RewardUpdateSchema
 from tests.conftest import SetupType
 
 if TYPE_CHECKING:
@@ -41,6 +52,12 @@ def _get_reward_rows(db_session: "Session") -> list[Reward]:
     return db_session.execute(select(Reward)).scalars().all()
 
 
+def _get_report_rows(report: ErrorReport) -> list[list[str]]:
+    header, *rows = csv.reader(StringIO(report.getvalue()))
+    assert header == ["row_num", "code", "reason", "status", "detail"]
+    return rows
+
+
 def test_import_agent__process_csv(setup: SetupType, mocker: MockerFixture) -> None:
     mocker.patch("carina.imports.agents.file_agent.sentry_sdk")
     db_session, reward_config, pre_existing_reward = setup
@@ -50,6 +67,7 @@ def test_import_agent__process_csv(setup: SetupType, mocker: MockerFixture) -> N
     mock_settings = mocker.patch("carina.imports.agents.file_agent.settings")
     mock_settings.SENTRY_DSN = "SENTRY_DSN"
     mock_settings.BLOB_IMPORT_LOGGING_LEVEL = logging.INFO
+    mock_settings.BLOB_IMPORT_BATCH_SIZE = 1000
 
     file_name = "test-retailer/rewards.import.test-reward.new-reward.csv"
     reward_file_log = RewardFileLog(
@@ -68,13 +86,15 @@ def test_import_agent__process_csv(setup: SetupType, mocker: MockerFixture) -> N
     assert rewards[0] == pre_existing_reward
 
     blob_content = "\n".join([*eligible_reward_codes, pre_existing_reward.code]) + "\nthis,is,a,bad,line"
-    blob_content += "\nanother,bad,line"  # this should be reported to sentry (line 6)
+    blob_content += "\nanother,bad,line"  # this should be reported (line 6)
+    report = ErrorReport(file_name)
 
     reward_agent.process_csv(
         retailer=reward_config.retailer,
         reward_file_log=reward_file_log,
-        blob_content=blob_content,
+        blob_lines=StringIO(blob_content),
         db_session=db_session,
+        report=report,
     )
 
     rewards = _get_reward_rows(db_session)
@@ -83,16 +103,203 @@ def test_import_agent__process_csv(setup: SetupType, mocker: MockerFixture) -> N
     assert all(
         reward.reward_file_log_id == reward_file_log.id for reward in rewards if reward.code in eligible_reward_codes
     )
-    # We should be sentry warned about the existing token
-    assert capture_message_spy.call_count == 2  # Errors should all be rolled up in to one call per error category
-    assert (
-        capture_message_spy.call_args_list[0][0][0]
-        == "Invalid rows found in test-retailer/rewards.import.test-reward.new-reward.csv:\nrows: 5, 6"
+    # problems are added to the report, to be sent once the file is moved
+    assert capture_message_spy.call_count == 0
+    assert report.counts == {ErrorReason.INVALID_ROW: 2, ErrorReason.PRE_EXISTING_CODE: 1}
+    assert _get_report_rows(report) == [
+        ["5", "this", "invalid row", "", "expected 1 column, found 5"],
+        ["6", "another", "invalid row", "", "expected 1 column, found 3"],
+        ["4", pre_existing_reward.code, "pre-existing code", "", ""],
+    ]
+
+
+def test_import_agent__process_csv_sends_report(setup: SetupType, mocker: MockerFixture) -> None:
+    db_session, reward_config, pre_existing_reward = setup
+    MockBlobServiceClient = mocker.patch(  # noqa: N806
+        "carina.imports.agents.file_agent.BlobServiceClient", autospec=True
+    )
+    mock_blob_service_client = mocker.MagicMock(spec=BlobServiceClient)
+    MockBlobServiceClient.from_connection_string.return_value = mock_blob_service_client
+    mock_report_blob_client = mock_blob_service_client.get_blob_client.return_value
+    mock_report_blob_client.url = "https://a-report-url"
+    mocker.patch.object(settings, "SENTRY_DSN", "SENTRY_DSN")
+    from carina.imports.agents.error_reports import sentry_sdk as error_reports_sentry_sdk
+
+    capture_message_spy = mocker.spy(error_reports_sentry_sdk, "capture_message")
+    file_name = "test-retailer/rewards.import.test-reward.new-reward.csv"
+    reward_file_log = RewardFileLog(file_name=file_name, file_agent_type=FileAgentType.IMPORT)
+    db_session.add(reward_file_log)
+    db_session.commit()
+
+    RewardImportAgent().process_csv(
+        retailer=reward_config.retailer,
+        reward_file_log=reward_file_log,
+        blob_lines=StringIO(f"reward1\n{pre_existing_reward.code}\nbad,line\n"),
+        db_session=db_session,
+    )
+
+    # the report is stored next to where the file is archived, only its summary is sent
+    dst_blob_name = f"{datetime.now(tz=timezone.utc).strftime('%Y/%m/%d/%H%M')}/{file_name}"
+    mock_blob_service_client.get_blob_client.assert_called_once_with(
+        settings.BLOB_ARCHIVE_CONTAINER, f"{dst_blob_name}.errors.csv"
+    )
+    mock_report_blob_client.upload_blob.assert_called_once()
+    capture_message_spy.assert_called_once_with(
+        f"Problems found while processing {file_name} (invalid row: 1, pre-existing code: 1), "
+        "report: https://a-report-url"
+    )
+
+
+def test_import_agent__process_csv_in_batches(setup: SetupType, mocker: MockerFixture) -> None:
+    db_session, reward_config, pre_existing_reward = setup
+    mocker.patch("carina.imports.agents.file_agent.BlobServiceClient")
+    mock_report_pre_existing_codes = mocker.patch("carina.imports.agents.file_agent.report_pre_existing_codes")
+    mock_settings = mocker.patch("carina.imports.agents.file_agent.settings")
+    mock_settings.BLOB_IMPORT_LOGGING_LEVEL = logging.INFO
+    mock_settings.BLOB_IMPORT_BATCH_SIZE = 2
+
+    file_name = "test-retailer/rewards.import.test-reward.new-reward.csv"
+    reward_file_log = RewardFileLog(
+        file_name=file_name,
+        file_agent_type=FileAgentType.IMPORT,
+    )
+    db_session.add(reward_file_log)
+    db_session.commit()
+
+    # reward1 is repeated in a later batch, the pre-existing code is found in the last batch
+    blob_content = "\n".join(["reward1", "reward2", "reward3", "reward1", "", pre_existing_reward.code])
+
+    RewardImportAgent().process_csv(
+        retailer=reward_config.retailer,
+        reward_file_log=reward_file_log,
+        blob_lines=StringIO(blob_content),
+        db_session=db_session,
+    )
+
+    rewards = _get_reward_rows(db_session)
+    assert sorted(reward.code for reward in rewards) == sorted(
+        ["reward1", "reward2", "reward3", pre_existing_reward.code]
+    )
+    mock_report_pre_existing_codes.assert_called_once_with(mock.ANY, {pre_existing_reward.code: [6]})
+
+
+def test_import_agent__process_csv_checkpointed_and_resumed(setup: SetupType, mocker: MockerFixture) -> None:
+    db_session, reward_config, _ = setup
+    mocker.patch("carina.imports.agents.file_agent.BlobServiceClient")
+    mock_settings = mocker.patch("carina.imports.agents.file_agent.settings")
+    mock_settings.BLOB_IMPORT_LOGGING_LEVEL = logging.INFO
+    mock_settings.BLOB_IMPORT_BATCH_SIZE = 2
+
+    file_name = "test-retailer/rewards.import.test-reward.new-reward.csv"
+    reward_file_log = RewardFileLog(file_name=file_name, file_agent_type=FileAgentType.IMPORT)
+    db_session.add(reward_file_log)
+    db_session.commit()
+
+    blob_content = "reward1\nreward2\nreward3\n"
+    add_new_rewards = RewardImportAgent._add_new_rewards
+
+    def _fail_second_batch(*args: Any, **kwargs: Any) -> dict[str, list[int]]:
+        if "reward3" in kwargs["row_nums_by_code"]:
+            raise ValueError("interrupted")
+        return add_new_rewards(*args, **kwargs)
+
+    mocker.patch.object(RewardImportAgent, "_add_new_rewards", side_effect=_fail_second_batch)
+    reward_agent = RewardImportAgent()
+    with pytest.raises(ValueError, match="interrupted"):
+        reward_agent.process_csv(
+            retailer=reward_config.retailer,
+            reward_file_log=reward_file_log,
+            blob_lines=StringIO(blob_content),
+            db_session=db_session,
+            checkpoint=True,
+        )
+
+    db_session.rollback()
+    db_session.refresh(reward_file_log)
+    assert sorted(reward.code for reward in _get_reward_rows(db_session) if reward.reward_file_log_id) == [
+        "reward1",
+        "reward2",
+    ]
+    assert reward_file_log.status == RewardFileLogStatuses.IN_PROGRESS
+    assert reward_file_log.rows_processed == 2
+    assert reward_file_log.bytes_processed == len("reward1\nreward2\n")
+
+    mocker.patch.object(RewardImportAgent, "_add_new_rewards", side_effect=add_new_rewards)
+    reward_agent.process_csv(
+        retailer=reward_config.retailer,
+        reward_file_log=reward_file_log,
+        blob_lines=StringIO(blob_content[reward_file_log.bytes_processed :]),
+        db_session=db_session,
+        checkpoint=True,
+    )
+
+    db_session.refresh(reward_file_log)
+    assert sorted(reward.code for reward in _get_reward_rows(db_session) if reward.reward_file_log_id) == [
+        "reward1",
+        "reward2",
+        "reward3",
+    ]
+    assert reward_file_log.status == RewardFileLogStatuses.COMPLETED
+    assert reward_file_log.rows_processed == 3
+    assert reward_file_log.bytes_processed == len(blob_content)
+
+
+@pytest.mark.usefixtures("code_filter_settings")
+def test_import_agent__process_csv_reward_code_filter_unavailable(setup: SetupType, mocker: MockerFixture) -> None:
+    db_session, reward_config, _ = setup
+    retailer_id = reward_config.retailer_id
+    mocker.patch("carina.imports.agents.file_agent.BlobServiceClient")
+    rebuild_reward_code_filter(db_session, retailer_id)
+    mocker.patch("carina.imports.code_filter._add_script", side_effect=redis.RedisError("Fake connection error"))
+    file_name = "test-retailer/rewards.import.test-reward.new-reward.csv"
+    reward_file_log = RewardFileLog(file_name=file_name, file_agent_type=FileAgentType.IMPORT)
+    db_session.add(reward_file_log)
+    db_session.commit()
+
+    RewardImportAgent().process_csv(
+        retailer=reward_config.retailer,
+        reward_file_log=reward_file_log,
+        blob_lines=StringIO("reward1\nreward2\n"),
+        db_session=db_session,
     )
+
+    db_session.refresh(reward_file_log)
+    assert reward_file_log.status == RewardFileLogStatuses.COMPLETED
+    assert sorted(reward.code for reward in _get_reward_rows(db_session) if reward.reward_file_log_id) == [
+        "reward1",
+        "reward2",
+    ]
+    # the filter missing the imported codes was deleted, their lookups fall back to the database
+    assert not redis_raw.exists(filter_key(retailer_id))
+
+
+def test_bulk_insert_reward_codes(setup: SetupType) -> None:
+    db_session, reward_config, pre_existing_reward = setup
+
+    inserted_codes = bulk_insert_reward_codes(
+        db_session,
+        codes=["reward1", "reward2", "reward2", pre_existing_reward.code],
+        reward_config_id=reward_config.id,
+        retailer_id=reward_config.retailer_id,
+        expiry_date=date(2030, 1, 1),
+        reward_file_log_id=None,
+    )
+    db_session.commit()
+
+    assert inserted_codes == {"reward1", "reward2"}
+    new_rewards = db_session.execute(select(Reward).where(Reward.code.in_(inserted_codes))).scalars().all()
+    assert len(new_rewards) == 2
+    assert all(
+        not reward.allocated and not reward.deleted and reward.expiry_date == date(2030, 1, 1) for reward in new_rewards
+    )
+    # code_hash is maintained by the database on insert
     assert (
-        capture_message_spy.call_args_list[1][0][0]
-        == "Pre-existing reward codes found in test-retailer/rewards.import.test-reward.new-reward.csv:"
-        "\nrows: 4"
+        db_session.execute(
+            select(func.count())
+            .select_from(Reward)
+            .where(Reward.code_hash == Reward.hash_code(Reward.code, reward_config.retailer_id))
+        ).scalar_one()
+        == len(new_rewards) + 1
     )
 
 
@@ -111,7 +318,7 @@ def test_import_agent__process_csv_with_expiry_date(setup: SetupType, mocker: Mo
     reward_agent.process_csv(
         retailer=reward_config.retailer,
         reward_file_log=reward_file_log,
-        blob_content="reward1\nreward2\nreward3",
+        blob_lines=StringIO("reward1\nreward2\nreward3"),
         db_session=db_session,
     )
 
@@ -137,7 +344,7 @@ def test_import_agent__process_csv_with_bad_expiry_date(setup: SetupType, mocker
         reward_agent.process_csv(
             retailer=reward_config.retailer,
             reward_file_log=reward_file_log,
-            blob_content="reward1\nreward2\nreward3",
+            blob_lines=StringIO("reward1\nreward2\nreward3"),
             db_session=db_session,
         )
 
@@ -174,6 +381,7 @@ def test_import_agent__process_csv_soft_deleted(
     mock_settings = mocker.patch("carina.imports.agents.file_agent.settings")
     mock_settings.SENTRY_DSN = "SENTRY_DSN"
     mock_settings.BLOB_IMPORT_LOGGING_LEVEL = logging.INFO
+    mock_settings.BLOB_IMPORT_BATCH_SIZE = 1000
 
     capture_message_spy = mocker.spy(file_agent_sentry_sdk, "capture_message")
     reward_agent = RewardImportAgent()
@@ -184,7 +392,7 @@ def test_import_agent__process_csv_soft_deleted(
     reward_agent.process_csv(
         retailer=reward_config.retailer,
         reward_file_log=reward_file_log,
-        blob_content=blob_content,
+        blob_lines=StringIO(blob_content),
         db_session=db_session,
     )
 
@@ -219,28 +427,29 @@ def test_import_agent__process_csv_not_soft_deleted(
     mock_settings = mocker.patch("carina.imports.agents.file_agent.settings")
     mock_settings.SENTRY_DSN = "SENTRY_DSN"
     mock_settings.BLOB_IMPORT_LOGGING_LEVEL = logging.INFO
+    mock_settings.BLOB_IMPORT_BATCH_SIZE = 1000
 
     capture_message_spy = mocker.spy(file_agent_sentry_sdk, "capture_message")
     reward_agent = RewardImportAgent()
     eligible_reward_codes = ["reward1", "reward2", "reward3"]
 
     blob_content = "\n".join([*eligible_reward_codes, pre_existing_reward.code])
+    report = ErrorReport(file_name)
 
     reward_agent.process_csv(
         retailer=reward_config.retailer,
         reward_file_log=reward_file_log,
-        blob_content=blob_content,
+        blob_lines=StringIO(blob_content),
         db_session=db_session,
+        report=report,
     )
 
     rewards = _get_reward_rows(db_session)
     assert len(rewards) == 4
     assert all(v in [reward.code for reward in rewards] for v in eligible_reward_codes)
-    # We should be sentry warned about the existing token
-    assert capture_message_spy.call_count == 1
-    assert capture_message_spy.call_args_list[0][0][0] == (
-        "Pre-existing reward codes found in test-retailer/rewards.import.test-reward.new-reward.csv:" "\nrows: 4"
-    )
+    # We should be warned about the existing token
+    assert capture_message_spy.call_count == 0
+    assert _get_report_rows(report) == [["4", pre_existing_reward.code, "pre-existing code", "", ""]]
 
 
 def test_import_agent__process_csv_same_reward_slug_not_soft_deleted(setup: SetupType, mocker: MockerFixture) -> None:
@@ -257,6 +466,7 @@ def test_import_agent__process_csv_same_reward_slug_not_soft_deleted(setup: Setu
     mock_settings = mocker.patch("carina.imports.agents.file_agent.settings")
     mock_settings.SENTRY_DSN = "SENTRY_DSN"
     mock_settings.BLOB_IMPORT_LOGGING_LEVEL = logging.INFO
+    mock_settings.BLOB_IMPORT_BATCH_SIZE = 1000
 
     file_name = "test-retailer/rewards.import.test-reward.new-reward.csv"
     reward_file_log = RewardFileLog(
@@ -271,22 +481,22 @@ def test_import_agent__process_csv_same_reward_slug_not_soft_deleted(setup: Setu
     eligible_reward_codes = ["reward1", "reward2", "reward3"]
 
     blob_content = "\n".join([*eligible_reward_codes, pre_existing_reward.code])
+    report = ErrorReport(file_name)
 
     reward_agent.process_csv(
         retailer=reward_config.retailer,
         reward_file_log=reward_file_log,
-        blob_content=blob_content,
+        blob_lines=StringIO(blob_content),
         db_session=db_session,
+        report=report,
     )
 
     rewards = _get_reward_rows(db_session)
     assert len(rewards) == 4
     assert all(v in [reward.code for reward in rewards] for v in eligible_reward_codes)
-    # We should be sentry warned about the existing token
-    assert capture_message_spy.call_count == 1
-    assert capture_message_spy.call_args_list[0][0][0] == (
-        "Pre-existing reward codes found in test-retailer/rewards.import.test-reward.new-reward.csv:" "\nrows: 4"
-    )
+    # We should be warned about the existing token
+    assert capture_message_spy.call_count == 0
+    assert _get_report_rows(report) == [["4", pre_existing_reward.code, "pre-existing code", "", ""]]
 
 
 def test_import_agent__reward_config_non_active_status_error(
@@ -320,6 +530,64 @@ def test_import_agent__reward_config_non_active_status_error(
     mock_move_blob.assert_called_once()
 
 
+def test_import_agent__process_blobs_imports_small_files_together(setup: SetupType, mocker: MockerFixture) -> None:
+    db_session, reward_config, pre_existing_reward = setup
+    MockBlobServiceClient = mocker.patch(  # noqa: N806
+        "carina.imports.agents.file_agent.BlobServiceClient", autospec=True
+    )
+    mock_blob_service_client = mocker.MagicMock(spec=BlobServiceClient)
+    MockBlobServiceClient.from_connection_string.return_value = mock_blob_service_client
+    reward_agent = RewardImportAgent()
+    container_client = mocker.patch.object(reward_agent, "container_client", spec=ContainerClient)
+    mock_move_blob = mocker.patch.object(reward_agent, "move_blob")
+    mock_report_invalid_rows = mocker.patch("carina.imports.agents.file_agent.report_invalid_rows")
+    mock_report_pre_existing_codes = mocker.patch("carina.imports.agents.file_agent.report_pre_existing_codes")
+    bulk_insert_spy = mocker.spy(file_agent, "bulk_insert_reward_code_files")
+
+    contents = {
+        "test-retailer/rewards.import.test-reward.batch1.csv": b"reward1\nreward2\nshared\n",
+        "test-retailer/rewards.import.test-reward.expires.2023-01-16.batch2.csv": gzip.compress(
+            f"shared\nreward3\nthis,is,bad\n{pre_existing_reward.code}\n".encode()
+        ),
+        "test-retailer/rewards.import.test-reward.expires.BAD-DATE.batch3.csv": b"reward4\n",
+    }
+    container_client.list_blobs = mocker.MagicMock(return_value=[Blob(name, size=100) for name in contents])
+    mock_blob_clients = {name: mocker.MagicMock(spec=BlobClient) for name in contents}
+    for name, content in contents.items():
+        mock_blob_clients[name].download_blob.return_value.readall.return_value = content
+    mock_blob_service_client.get_blob_client.side_effect = lambda _, name: mock_blob_clients[name]
+
+    reward_agent.process_blobs(reward_config.retailer, db_session=db_session)
+
+    bulk_insert_spy.assert_called_once()
+    reward_file_logs = {
+        reward_file_log.file_name: reward_file_log
+        for reward_file_log in db_session.execute(select(RewardFileLog)).scalars().all()
+    }
+    batch1, batch2, batch3 = contents
+    assert set(reward_file_logs) == {batch1, batch2}
+    assert all(log.status == RewardFileLogStatuses.COMPLETED for log in reward_file_logs.values())
+    assert reward_file_logs[batch2].rows_processed == 4
+    rewards = {reward.code: reward for reward in _get_reward_rows(db_session)}
+    assert set(rewards) == {pre_existing_reward.code, "reward1", "reward2", "reward3", "shared"}
+    # codes repeated across files are imported from the earliest one
+    assert rewards["shared"].reward_file_log_id == reward_file_logs[batch1].id
+    assert rewards["shared"].expiry_date is None
+    assert rewards["reward3"].reward_file_log_id == reward_file_logs[batch2].id
+    assert rewards["reward3"].expiry_date == date(2023, 1, 16)
+    mock_report_invalid_rows.assert_has_calls(
+        [mock.call(mock.ANY, []), mock.call(mock.ANY, [(3, ["this", "is", "bad"])])]
+    )
+    report = mock_report_pre_existing_codes.call_args.args[0]
+    assert report.blob_name == batch2
+    mock_report_pre_existing_codes.assert_called_once_with(report, {"shared": [1], pre_existing_reward.code: [4]})
+    assert [(call.args[0], call.args[1]) for call in mock_move_blob.call_args_list] == [
+        (settings.BLOB_ERROR_CONTAINER, mock_blob_clients[batch3]),
+        (settings.BLOB_ARCHIVE_CONTAINER, mock_blob_clients[batch1]),
+        (settings.BLOB_ARCHIVE_CONTAINER, mock_blob_clients[batch2]),
+    ]
+
+
 def test_import_agent__process_csv_no_reward_config(setup: SetupType, mocker: MockerFixture) -> None:
     db_session, reward_config, _ = setup
 
@@ -337,7 +605,7 @@ def test_import_agent__process_csv_no_reward_config(setup: SetupType, mocker: Mo
         reward_agent.process_csv(
             retailer=reward_config.retailer,
             reward_file_log=reward_file_log,
-            blob_content="reward1\nreward2\nreward3",
+            blob_lines=StringIO("reward1\nreward2\nreward3"),
             db_session=db_session,
         )
     assert exc_info.value.args == ("No RewardConfig found for reward_slug incorrect-reward-type",)
@@ -360,7 +628,7 @@ def test_import_agent__process_csv_blob_path_does_not_template(setup: SetupType,
         reward_agent.process_csv(
             retailer=reward_config.retailer,
             reward_file_log=reward_file_log,
-            blob_content="reward1\nreward2\nreward3",
+            blob_lines=StringIO("reward1\nreward2\nreward3"),
             db_session=db_session,
         )
     assert exc_info.value.args == (
@@ -392,7 +660,7 @@ TEST87654322,2021-07-30,redeemed\
     reward_agent.process_csv(
         retailer=reward_config.retailer,
         reward_file_log=reward_file_log,
-        blob_content=content,
+        blob_lines=StringIO(content),
         db_session=db_session,
     )
     expected_reward_update_rows_by_code = defaultdict(
@@ -401,30 +669,30 @@ TEST87654322,2021-07-30,redeemed\
             "TEST12345678": [
                 RewardUpdateRow(
                     row_num=1,
-                    data=RewardUpdateSchema(
-                        code="TEST12345678", date="2021-07-30", status=RewardUpdateStatuses.CANCELLED
+                    data=RewardUpdateData(
+                        code="TEST12345678", date=date(2021, 7, 30), status=RewardUpdateStatuses.CANCELLED
                     ),
                 )
             ],
             "TEST87654321": [
                 RewardUpdateRow(
                     row_num=2,
-                    data=RewardUpdateSchema(
-                        code="TEST87654321", date="2021-07-21", status=RewardUpdateStatuses.REDEEMED
+                    data=RewardUpdateData(
+                        code="TEST87654321", date=date(2021, 7, 21), status=RewardUpdateStatuses.REDEEMED
                     ),
                 )
             ],
             "TEST87654322": [
                 RewardUpdateRow(
                     row_num=3,
-                    data=RewardUpdateSchema(
-                        code="TEST87654322", date="2021-07-30", status=RewardUpdateStatuses.CANCELLED
+                    data=RewardUpdateData(
+                        code="TEST87654322", date=date(2021, 7, 30), status=RewardUpdateStatuses.CANCELLED
                     ),
                 ),
                 RewardUpdateRow(
                     row_num=4,
-                    data=RewardUpdateSchema(
-                        code="TEST87654322", date="2021-07-30", status=RewardUpdateStatuses.REDEEMED
+                    data=RewardUpdateData(
+                        code="TEST87654322", date=date(2021, 7, 30), status=RewardUpdateStatuses.REDEEMED
                     ),
                 ),
             ],
@@ -435,13 +703,14 @@ TEST87654322,2021-07-30,redeemed\
         blob_name=blob_name,
         db_session=db_session,
         reward_update_rows_by_code=expected_reward_update_rows_by_code,
+        report=mock.ANY,
     )
 
 
 def test_updates_agent__process_csv_reward_code_fails_non_validating_rows(
     setup: SetupType, mocker: MockerFixture
 ) -> None:
-    """If non-validating values are encountered, sentry should log a msg"""
+    """If non-validating values are encountered, they should be reported"""
     # GIVEN
     db_session, reward_config, reward = setup
     blob_name = "/test-retailer/rewards.update.test.csv"
@@ -460,6 +729,8 @@ def test_updates_agent__process_csv_reward_code_fails_non_validating_rows(
     mocker.patch.object(RewardUpdatesAgent, "enqueue_reward_updates")
     mock_settings = mocker.patch("carina.imports.agents.file_agent.settings")
     mock_settings.BLOB_IMPORT_LOGGING_LEVEL = logging.INFO
+    mock_settings.BLOB_IMPORT_BATCH_SIZE = 1000
+    mock_settings.REWARD_UPDATES_CHUNK_SIZE = 1000
     reward_agent = RewardUpdatesAgent()
     bad_date = "20210830"
     bad_status = "nosuchstatus"
@@ -468,26 +739,29 @@ TSTCD1234,2021-07-30,redeemed
 TEST12345678,{bad_date},redeemed
 TEST666666,2021-07-30,{bad_status}\
 """
+    report = ErrorReport(blob_name)
 
     # WHEN
     reward_agent.process_csv(
         retailer=reward_config.retailer,
         reward_file_log=reward_file_log,
-        blob_content=content,
+        blob_lines=StringIO(content),
         db_session=db_session,
+        report=report,
     )
 
     # THEN
-    assert capture_message_spy.call_count == 1  # Errors should all be rolled up in to a single call
-    expected_error_msg: str = capture_message_spy.call_args.args[0]
-    assert f"time data '{bad_date}' does not match format '%Y-%m-%d'" in expected_error_msg
-    assert f"'{bad_status}' is not a valid RewardUpdateStatuses" in expected_error_msg
+    assert capture_message_spy.call_count == 0  # Errors are added to the file's report
+    report_rows = _get_report_rows(report)
+    assert [row[:3] for row in report_rows] == [["2", "", "invalid row"], ["3", "", "invalid row"]]
+    assert f"time data '{bad_date}' does not match format '%Y-%m-%d'" in report_rows[0][4]
+    assert f"'{bad_status}' is not a valid RewardUpdateStatuses" in report_rows[1][4]
 
 
 def test_updates_agent__process_csv_reward_code_fails_malformed_csv_rows(
     setup: SetupType, mocker: MockerFixture
 ) -> None:
-    """If a bad CSV row in encountered, sentry should log a msg"""
+    """If a bad CSV row in encountered, it should be reported"""
     # GIVEN
     db_session, reward_config, _ = setup
     blob_name = "/test-retailer/rewards.update.test.csv"
@@ -504,21 +778,69 @@ def test_updates_agent__process_csv_reward_code_fails_malformed_csv_rows(
     mocker.patch.object(RewardUpdatesAgent, "enqueue_reward_updates")
     mock_settings = mocker.patch("carina.imports.agents.file_agent.settings")
     mock_settings.BLOB_IMPORT_LOGGING_LEVEL = logging.INFO
+    mock_settings.BLOB_IMPORT_BATCH_SIZE = 1000
     reward_agent = RewardUpdatesAgent()
     content = "TEST87654321,2021-07-30\nTEST12345678,redeemed\n"
+    report = ErrorReport(blob_name)
 
     # WHEN
     reward_agent.process_csv(
         retailer=reward_config.retailer,
         reward_file_log=reward_file_log,
-        blob_content=content,
+        blob_lines=StringIO(content),
         db_session=db_session,
+        report=report,
     )
 
     # THEN
-    assert capture_message_spy.call_count == 1  # Both index errors should all be rolled up in to a single call
-    expected_error_msg: str = capture_message_spy.call_args.args[0]
-    assert "IndexError('list index out of range')" in expected_error_msg
+    assert capture_message_spy.call_count == 0
+    assert _get_report_rows(report) == [
+        [str(row_num), "", "invalid row", "", "IndexError('list index out of range')"] for row_num in (1, 2)
+    ]
+
+
+def test_updates_agent__process_csv_reports_across_chunks(setup: SetupType, mocker: MockerFixture) -> None:
+    db_session, reward_config, reward = setup
+    reward.allocated = True
+    blob_name = "/test-retailer/rewards.update.test.csv"
+    reward_file_log = RewardFileLog(file_name=blob_name, file_agent_type=FileAgentType.UPDATE)
+    db_session.add(reward_file_log)
+    db_session.commit()
+
+    from carina.imports.agents.file_agent import sentry_sdk as file_agent_sentry_sdk
+
+    capture_message_spy = mocker.spy(file_agent_sentry_sdk, "capture_message")
+    mocker.patch("carina.imports.agents.file_agent.BlobServiceClient")
+    mock_enqueue = mocker.patch.object(RewardUpdatesAgent, "enqueue_reward_updates")
+    mock_settings = mocker.patch("carina.imports.agents.file_agent.settings")
+    mock_settings.BLOB_IMPORT_LOGGING_LEVEL = logging.INFO
+    mock_settings.BLOB_IMPORT_BATCH_SIZE = 2
+    mock_settings.REWARD_UPDATES_CHUNK_SIZE = 1
+    reward_agent = RewardUpdatesAgent()
+    content = f"""\
+UNKNOWN1,2021-07-30,redeemed
+{reward.code},2021-07-30,redeemed
+UNKNOWN2,2021-07-30,cancelled
+"""
+    report = ErrorReport(blob_name)
+
+    reward_agent.process_csv(
+        retailer=reward_config.retailer,
+        reward_file_log=reward_file_log,
+        blob_lines=StringIO(content),
+        db_session=db_session,
+        report=report,
+    )
+
+    assert len(_get_reward_update_rows(db_session, [reward.code])) == 1
+    assert mock_enqueue.call_count == 2  # once per batch
+    capture_message_spy.assert_not_called()
+    assert report.counts == {ErrorReason.UNKNOWN_CODE: 2}
+    assert _get_report_rows(report) == [
+        ["1", "UNKNOWN1", "unknown code", "redeemed", ""],
+        ["3", "UNKNOWN2", "unknown code", "cancelled", ""],
+    ]
+    assert reward_file_log.status == RewardFileLogStatuses.COMPLETED
 
 
 def test_updates_agent__process_updates(setup: SetupType, mocker: MockerFixture) -> None:
@@ -535,9 +857,9 @@ def test_updates_agent__process_updates(setup: SetupType, mocker: MockerFixture)
     mocker.patch("carina.imports.agents.file_agent.BlobServiceClient")
     reward_agent = RewardUpdatesAgent()
     blob_name = "/test-retailer/rewards.update.test.csv"
-    data = RewardUpdateSchema(
+    data = RewardUpdateData(
         code=reward.code,
-        date="2021-07-30",
+        date=date(2021, 7, 30),
         status=RewardUpdateStatuses("redeemed"),
     )
     reward_update_rows_by_code: defaultdict[str, list[RewardUpdateRow]] = defaultdict(list[RewardUpdateRow])
@@ -575,12 +897,15 @@ def test_updates_agent__process_updates_reward_code_not_allocated(setup: SetupTy
     mocker.patch.object(RewardUpdatesAgent, "enqueue_reward_updates")
     mock_settings = mocker.patch("carina.imports.agents.file_agent.settings")
     mock_settings.BLOB_IMPORT_LOGGING_LEVEL = logging.INFO
+    mock_settings.BLOB_IMPORT_BATCH_SIZE = 1000
+    mock_settings.REWARD_UPDATES_CHUNK_SIZE = 1000
     reward_agent = RewardUpdatesAgent()
     mocker.patch.object(reward_agent, "_report_unknown_codes", autospec=True)
+    mocker.patch.object(settings, "SENTRY_DSN", "SENTRY_DSN")
     blob_name = "/test-retailer/rewards-update.test.csv"
-    data = RewardUpdateSchema(
+    data = RewardUpdateData(
         code=reward.code,
-        date="2021-07-30",
+        date=date(2021, 7, 30),
         status=RewardUpdateStatuses("redeemed"),
     )
     reward_update_rows_by_code: defaultdict[str, list[RewardUpdateRow]] = defaultdict(list[RewardUpdateRow])
@@ -598,8 +923,10 @@ def test_updates_agent__process_updates_reward_code_not_allocated(setup: SetupTy
     # THEN
     assert capture_message_spy.call_count == 1  # Errors should all be rolled up in to a single call
     expected_error_msg: str = capture_message_spy.call_args.args[0]
-    assert "Unallocated reward codes found" in expected_error_msg
+    assert f"Problems found while processing {blob_name} (unallocated code: 1)" in expected_error_msg
     assert not reward_update_rows
+    db_session.refresh(reward)
+    assert reward.deleted is True
 
 
 def test_updates_agent__process_updates_reward_code_does_not_exist(setup: SetupType, mocker: MockerFixture) -> None:
@@ -614,13 +941,16 @@ def test_updates_agent__process_updates_reward_code_does_not_exist(setup: SetupT
     mocker.patch.object(RewardUpdatesAgent, "enqueue_reward_updates")
     mock_settings = mocker.patch("carina.imports.agents.file_agent.settings")
     mock_settings.BLOB_IMPORT_LOGGING_LEVEL = logging.INFO
+    mock_settings.BLOB_IMPORT_BATCH_SIZE = 1000
+    mock_settings.REWARD_UPDATES_CHUNK_SIZE = 1000
     reward_agent = RewardUpdatesAgent()
     mocker.patch.object(reward_agent, "_process_unallocated_codes", autospec=True)
+    mocker.patch.object(settings, "SENTRY_DSN", "SENTRY_DSN")
     blob_name = "/test-retailer/rewards.update.test.csv"
     bad_reward_code = "IDONOTEXIST"
-    data = RewardUpdateSchema(
+    data = RewardUpdateData(
         code=bad_reward_code,
-        date="2021-07-30",
+        date=date(2021, 7, 30),
         status=RewardUpdateStatuses("cancelled"),
     )
     reward_update_rows_by_code: defaultdict[str, list[RewardUpdateRow]] = defaultdict(list[RewardUpdateRow])
@@ -639,15 +969,29 @@ def test_updates_agent__process_updates_reward_code_does_not_exist(setup: SetupT
     assert capture_message_spy.call_count == 1  # Errors should all be rolled up in to a single call
     expected_error_msg: str = capture_message_spy.call_args.args[0]
     assert (
-        "Unknown reward codes found while processing /test-retailer/rewards.update.test.csv, rows: 1"
-        in expected_error_msg
+        "Problems found while processing /test-retailer/rewards.update.test.csv (unknown code: 1)" in expected_error_msg
     )
     assert not reward_update_rows
 
 
 class Blob:
-    def __init__(self, name: str) -> None:
+    def __init__(
+        self,
+        name: str,
+        etag: str = "0x8DB5A3E8C1B2F4D",
+        size: int = 1024,
+        content_encoding: str | None = None,
+        content_md5: bytes | None = None,
+        tags: dict[str, str] | None = None,
+        creation_time: datetime = datetime(2022, 9, 8, tzinfo=timezone.utc),
+    ) -> None:
         self.name = name
+        self.etag = etag
+        self.size = size
+        self.creation_time = creation_time
+        self.content_settings = ContentSettings(content_encoding=content_encoding, content_md5=content_md5)
+        self.tags = tags
+        self.tag_count = len(tags) if tags else None
 
 
 def test_process_blobs(setup: SetupType, mocker: MockerFixture) -> None:
@@ -693,7 +1037,7 @@ def test_process_blobs_unicodedecodeerror(capture: LogCapture, setup: SetupType,
     MockBlobServiceClient.from_connection_string.return_value = mock_blob_service_client
     reward_agent = RewardUpdatesAgent()
     container_client = mocker.patch.object(reward_agent, "container_client", spec=ContainerClient)
-    mock_process_csv = mocker.patch.object(reward_agent, "process_csv")
+    mock_process_updates = mocker.patch.object(reward_agent, "_process_updates")
     mock_move_blob = mocker.patch.object(reward_agent, "move_blob")
     blob_filename = "test-retailer/rewards.update.update.csv"
     container_client.list_blobs = mocker.MagicMock(
@@ -701,18 +1045,206 @@ def test_process_blobs_unicodedecodeerror(capture: LogCapture, setup: SetupType,
             Blob(blob_filename),
         ]
     )
-    mock_blob_service_client.get_blob_client.return_value.download_blob.return_value.readall.return_value = (
-        b"\xca,2021,09,13,cancelled"
-    )
+    mock_blob_service_client.get_blob_client.return_value.download_blob.return_value.chunks.return_value = [
+        b"TSTCD1234,2021-07-30,redeemed\n",
+        b"\xca,2021,09,13,cancelled",
+    ]
 
     reward_agent.process_blobs(reward_config.retailer, db_session=db_session)
 
-    assert not mock_process_csv.called
+    assert not mock_process_updates.called
     message = f"Problem decoding blob {blob_filename} (files should be utf-8 encoded)"
     assert any(message in record.msg for record in capture.records)
     mock_move_blob.assert_called_once()
 
 
+def test_process_blobs_resumes_interrupted_import(setup: SetupType, mocker: MockerFixture) -> None:
+    db_session, reward_config, _ = setup
+    file_name = "test-retailer/rewards.update.update.csv"
+    blob = Blob(file_name)
+    reward_file_log = RewardFileLog(
+        file_name=file_name,
+        file_agent_type=FileAgentType.UPDATE,
+        status=RewardFileLogStatuses.IN_PROGRESS,
+        blob_etag=blob.etag,
+        rows_processed=2,
+        bytes_processed=64,
+    )
+    db_session.add(reward_file_log)
+    db_session.commit()
+    MockBlobServiceClient = mocker.patch(  # noqa: N806
+        "carina.imports.agents.file_agent.BlobServiceClient", autospec=True
+    )
+    mock_blob_service_client = mocker.MagicMock(spec=BlobServiceClient)
+    MockBlobServiceClient.from_connection_string.return_value = mock_blob_service_client
+
+    reward_agent = RewardUpdatesAgent()
+    container_client = mocker.patch.object(reward_agent, "container_client", spec=ContainerClient)
+    mock_process_csv = mocker.patch.object(reward_agent, "process_csv")
+    mock_move_blob = mocker.patch.object(reward_agent, "move_blob")
+    container_client.list_blobs = mocker.MagicMock(return_value=[blob])
+    mock_blob_client = mocker.MagicMock(spec=BlobClient)
+    mock_blob_service_client.get_blob_client.return_value = mock_blob_client
+
+    reward_agent.process_blobs(reward_config.retailer, db_session=db_session)
+
+    mock_blob_client.download_blob.assert_called_once_with(offset=64, lease=mock_blob_client.acquire_lease.return_value)
+    mock_process_csv.assert_called_once()
+    assert mock_process_csv.call_args.kwargs["reward_file_log"] == reward_file_log
+    assert (
+        db_session.execute(select(func.count(RewardFileLog.id)).where(RewardFileLog.file_name == file_name)).scalar()
+        == 1
+    )
+    mock_move_blob.assert_called_once()
+    assert mock_move_blob.call_args[0][0] != settings.BLOB_ERROR_CONTAINER
+
+
+def test_process_blobs_unicodedecodeerror_after_first_batch(setup: SetupType, mocker: MockerFixture) -> None:
+    db_session, reward_config, _ = setup
+    mocker.patch.object(settings, "BLOB_IMPORT_BATCH_SIZE", 1)
+    MockBlobServiceClient = mocker.patch(  # noqa: N806
+        "carina.imports.agents.file_agent.BlobServiceClient", autospec=True
+    )
+    mock_blob_service_client = mocker.MagicMock(spec=BlobServiceClient)
+    MockBlobServiceClient.from_connection_string.return_value = mock_blob_service_client
+
+    reward_agent = RewardUpdatesAgent()
+    container_client = mocker.patch.object(reward_agent, "container_client", spec=ContainerClient)
+    mock_process_updates = mocker.patch.object(reward_agent, "_process_updates")
+    mock_move_blob = mocker.patch.object(reward_agent, "move_blob")
+    file_name = "test-retailer/rewards.update.update.csv"
+    container_client.list_blobs = mocker.MagicMock(return_value=[Blob(file_name)])
+    mock_blob_service_client.get_blob_client.return_value.download_blob.return_value.chunks.return_value = [
+        b"TSTCD1234,2021-07-30,redeemed\n",
+        b"\xca,2021-09-13,cancelled\n",
+    ]
+
+    reward_agent.process_blobs(reward_config.retailer, db_session=db_session)
+
+    # the first batch was committed before the invalid bytes were reached
+    mock_process_updates.assert_called_once()
+    assert list(mock_process_updates.call_args.kwargs["reward_update_rows_by_code"]) == ["TSTCD1234"]
+    reward_file_log = db_session.execute(select(RewardFileLog).where(RewardFileLog.file_name == file_name)).scalar_one()
+    assert reward_file_log.status == RewardFileLogStatuses.FAILED
+    assert reward_file_log.rows_processed == 1
+    mock_move_blob.assert_called_once()
+    assert mock_move_blob.call_args[0][0] == settings.BLOB_ERROR_CONTAINER
+    ((row_num, code, reason, status, detail),) = _get_report_rows(mock_move_blob.call_args.kwargs["report"])
+    assert (row_num, code, reason, status) == ("2", "", ErrorReason.PARTIALLY_APPLIED.value, "")
+    assert detail.startswith("rows up to 1 were applied before UnicodeDecodeError")
+
+
+def test_process_blobs_retries_corrected_failed_import(setup: SetupType, mocker: MockerFixture) -> None:
+    db_session, reward_config, _ = setup
+    file_name = "test-retailer/rewards.update.update.csv"
+    blob = Blob(file_name, etag="0x8DB5A3E8C1B2F5E")
+    reward_file_log = RewardFileLog(
+        file_name=file_name,
+        file_agent_type=FileAgentType.UPDATE,
+        status=RewardFileLogStatuses.FAILED,
+        blob_etag="0x8DB5A3E8C1B2F4D",
+        rows_processed=1,
+        bytes_processed=30,
+    )
+    db_session.add(reward_file_log)
+    db_session.commit()
+    MockBlobServiceClient = mocker.patch(  # noqa: N806
+        "carina.imports.agents.file_agent.BlobServiceClient", autospec=True
+    )
+    mock_blob_service_client = mocker.MagicMock(spec=BlobServiceClient)
+    MockBlobServiceClient.from_connection_string.return_value = mock_blob_service_client
+
+    reward_agent = RewardUpdatesAgent()
+    container_client = mocker.patch.object(reward_agent, "container_client", spec=ContainerClient)
+    mock_process_updates = mocker.patch.object(reward_agent, "_process_updates")
+    mock_move_blob = mocker.patch.object(reward_agent, "move_blob")
+    container_client.list_blobs = mocker.MagicMock(return_value=[blob])
+    mock_blob_client = mock_blob_service_client.get_blob_client.return_value
+    # the corrected row's length differs from the failed one, the applied rows are skipped by count
+    mock_blob_client.download_blob.return_value.chunks.return_value = [
+        b"TSTCD1234,2021-07-30,redeemed\r\n",
+        b"TSTCD5678,2021-09-13,cancelled\r\n",
+    ]
+
+    reward_agent.process_blobs(reward_config.retailer, db_session=db_session)
+
+    mock_blob_client.download_blob.assert_called_once_with(offset=0, lease=mock_blob_client.acquire_lease.return_value)
+    mock_process_updates.assert_called_once()
+    assert list(mock_process_updates.call_args.kwargs["reward_update_rows_by_code"]) == ["TSTCD5678"]
+    db_session.refresh(reward_file_log)
+    assert reward_file_log.status == RewardFileLogStatuses.COMPLETED
+    assert reward_file_log.blob_etag == blob.etag
+    assert reward_file_log.rows_processed == 2
+    mock_move_blob.assert_called_once()
+    assert mock_move_blob.call_args[0][0] == settings.BLOB_ARCHIVE_CONTAINER
+
+
+@pytest.mark.parametrize(
+    ("file_name", "content_encoding", "compress"),
+    [
+        ("test-retailer/rewards.update.update.csv.gz", None, gzip.compress),
+        ("test-retailer/rewards.update.update.csv", "gzip", gzip.compress),
+        ("test-retailer/rewards.update.update.csv.zst", None, zstandard.ZstdCompressor().compress),
+    ],
+)
+def test_process_blobs_compressed(
+    setup: SetupType,
+    mocker: MockerFixture,
+    file_name: str,
+    content_encoding: str | None,
+    compress: Callable[[bytes], bytes],
+) -> None:
+    db_session, reward_config, _ = setup
+    MockBlobServiceClient = mocker.patch(  # noqa: N806
+        "carina.imports.agents.file_agent.BlobServiceClient", autospec=True
+    )
+    mock_blob_service_client = mocker.MagicMock(spec=BlobServiceClient)
+    MockBlobServiceClient.from_connection_string.return_value = mock_blob_service_client
+
+    reward_agent = RewardUpdatesAgent()
+    container_client = mocker.patch.object(reward_agent, "container_client", spec=ContainerClient)
+    mock_process_updates = mocker.patch.object(reward_agent, "_process_updates")
+    mock_move_blob = mocker.patch.object(reward_agent, "move_blob")
+    container_client.list_blobs = mocker.MagicMock(return_value=[Blob(file_name, content_encoding=content_encoding)])
+    compressed = compress(b"TSTCD1234,2021-07-30,redeemed\nTSTCD5678,2021-07-30,cancelled\n")
+    mock_blob_client = mock_blob_service_client.get_blob_client.return_value
+    mock_blob_client.download_blob.return_value.chunks.return_value = [compressed[:10], compressed[10:]]
+
+    reward_agent.process_blobs(reward_config.retailer, db_session=db_session)
+
+    mock_blob_client.download_blob.assert_called_once_with(offset=0, lease=mock_blob_client.acquire_lease.return_value)
+    mock_process_updates.assert_called_once()
+    assert list(mock_process_updates.call_args.kwargs["reward_update_rows_by_code"]) == ["TSTCD1234", "TSTCD5678"]
+    mock_move_blob.assert_called_once()
+    assert mock_move_blob.call_args[0][0] == settings.BLOB_ARCHIVE_CONTAINER
+
+
+def test_process_blobs_corrupt_compressed_file(capture: LogCapture, setup: SetupType, mocker: MockerFixture) -> None:
+    db_session, reward_config, _ = setup
+    MockBlobServiceClient = mocker.patch(  # noqa: N806
+        "carina.imports.agents.file_agent.BlobServiceClient", autospec=True
+    )
+    mock_blob_service_client = mocker.MagicMock(spec=BlobServiceClient)
+    MockBlobServiceClient.from_connection_string.return_value = mock_blob_service_client
+
+    reward_agent = RewardUpdatesAgent()
+    container_client = mocker.patch.object(reward_agent, "container_client", spec=ContainerClient)
+    mock_process_updates = mocker.patch.object(reward_agent, "_process_updates")
+    mock_move_blob = mocker.patch.object(reward_agent, "move_blob")
+    blob_filename = "test-retailer/rewards.update.update.csv.gz"
+    container_client.list_blobs = mocker.MagicMock(return_value=[Blob(blob_filename)])
+    mock_blob_service_client.get_blob_client.return_value.download_blob.return_value.chunks.return_value = [
+        gzip.compress(b"TSTCD1234,2021-07-30,redeemed\n")[:-8]
+    ]
+
+    reward_agent.process_blobs(reward_config.retailer, db_session=db_session)
+
+    assert not mock_process_updates.called
+    assert any(f"Problem decompressing blob {blob_filename}" in record.msg for record in capture.records)
+    mock_move_blob.assert_called_once()
+    assert mock_move_blob.call_args[0][0] == settings.BLOB_ERROR_CONTAINER
+
+
 def test_process_blobs_not_csv(setup: SetupType, mocker: MockerFixture) -> None:
     db_session, reward_config, _ = setup
     MockBlobServiceClient = mocker.patch(  # noqa: N806
@@ -791,6 +1323,110 @@ def test_process_blobs_filename_is_duplicate(setup: SetupType, mocker: MockerFix
     mock_process_csv.assert_not_called()
 
 
+def test_process_blobs_content_is_duplicate(setup: SetupType, mocker: MockerFixture) -> None:
+    db_session, reward_config, _ = setup
+    content = b"TSTCD1234,2021-07-30,redeemed\n"
+    db_session.add(
+        RewardFileLog(
+            file_name="test-retailer/rewards.update.original.csv",
+            file_agent_type=FileAgentType.UPDATE,
+            status=RewardFileLogStatuses.COMPLETED,
+            content_digest=hashlib.md5(content).hexdigest(),  # noqa: S324
+        )
+    )
+    db_session.commit()
+    MockBlobServiceClient = mocker.patch(  # noqa: N806
+        "carina.imports.agents.file_agent.BlobServiceClient", autospec=True
+    )
+    mock_blob_service_client = mocker.MagicMock(spec=BlobServiceClient)
+    MockBlobServiceClient.from_connection_string.return_value = mock_blob_service_client
+    from carina.imports.agents.file_agent import sentry_sdk
+
+    capture_message_spy = mocker.spy(sentry_sdk, "capture_message")
+
+    reward_agent = RewardUpdatesAgent()
+    mock_process_csv = mocker.patch.object(reward_agent, "process_csv")
+    container_client = mocker.patch.object(reward_agent, "container_client", spec=ContainerClient)
+    mock_move_blob = mocker.patch.object(reward_agent, "move_blob")
+    container_client.list_blobs = mocker.MagicMock(
+        return_value=[
+            Blob("test-retailer/rewards.update.renamed.csv", content_md5=hashlib.md5(content).digest()),  # noqa: S324
+        ]
+    )
+    mock_blob_client = mocker.MagicMock(spec=BlobClient)
+    mock_blob_service_client.get_blob_client.return_value = mock_blob_client
+    mock_settings = mocker.patch("carina.imports.agents.file_agent.settings")
+    mock_settings.BLOB_ERROR_CONTAINER = "ERROR-CONTAINER"
+
+    reward_agent.process_blobs(reward_config.retailer, db_session=db_session)
+
+    assert capture_message_spy.call_args.args[0] == (
+        "test-retailer/rewards.update.renamed.csv has the same content as the already imported "
+        "test-retailer/rewards.update.original.csv. Moving to ERROR-CONTAINER for checking"
+    )
+    mock_move_blob.assert_called_once()
+    assert mock_move_blob.call_args[0][0] == "ERROR-CONTAINER"
+    mock_blob_client.download_blob.assert_not_called()
+    mock_process_csv.assert_not_called()
+
+
+def test_process_blobs_records_content_digest(setup: SetupType, mocker: MockerFixture) -> None:
+    db_session, reward_config, _ = setup
+    MockBlobServiceClient = mocker.patch(  # noqa: N806
+        "carina.imports.agents.file_agent.BlobServiceClient", autospec=True
+    )
+    mock_blob_service_client = mocker.MagicMock(spec=BlobServiceClient)
+    MockBlobServiceClient.from_connection_string.return_value = mock_blob_service_client
+
+    reward_agent = RewardUpdatesAgent()
+    container_client = mocker.patch.object(reward_agent, "container_client", spec=ContainerClient)
+    mocker.patch.object(reward_agent, "_process_updates")
+    mocker.patch.object(reward_agent, "move_blob")
+    file_name = "test-retailer/rewards.update.update.csv"
+    container_client.list_blobs = mocker.MagicMock(return_value=[Blob(file_name)])
+    chunks = [b"TSTCD1234,2021-07-30,redeemed\n", b"TSTCD5678,2021-07-30,cancelled\n"]
+    mock_blob_service_client.get_blob_client.return_value.download_blob.return_value.chunks.return_value = chunks
+
+    reward_agent.process_blobs(reward_config.retailer, db_session=db_session)
+
+    reward_file_log = db_session.execute(select(RewardFileLog).where(RewardFileLog.file_name == file_name)).scalar_one()
+    assert reward_file_log.status == RewardFileLogStatuses.COMPLETED
+    assert reward_file_log.content_digest == hashlib.md5(b"".join(chunks)).hexdigest()  # noqa: S324
+
+
+def test_process_blobs_tag_mode_skips_processed_blobs(setup: SetupType, mocker: MockerFixture) -> None:
+    db_session, reward_config, _ = setup
+    mocker.patch.object(settings, "BLOB_IMPORT_STORAGE_MODE", "tag")
+    MockBlobServiceClient = mocker.patch(  # noqa: N806
+        "carina.imports.agents.file_agent.BlobServiceClient", autospec=True
+    )
+    mock_blob_service_client = mocker.MagicMock(spec=BlobServiceClient)
+    MockBlobServiceClient.from_connection_string.return_value = mock_blob_service_client
+
+    reward_agent = RewardUpdatesAgent()
+    mock_process_csv = mocker.patch.object(reward_agent, "process_csv")
+    container_client = mocker.patch.object(reward_agent, "container_client", spec=ContainerClient)
+    mock_move_blob = mocker.patch.object(reward_agent, "move_blob")
+    container_client.list_blobs = mocker.MagicMock(
+        return_value=[
+            Blob("test-retailer/rewards.update.archived.csv", tags={"carina_state": "archived"}),
+            Blob("test-retailer/rewards.update.new.csv", tags={"owner": "retailer"}),
+        ]
+    )
+    mock_blob_client = mocker.MagicMock(spec=BlobClient)
+    mock_blob_service_client.get_blob_client.return_value = mock_blob_client
+
+    reward_agent.process_blobs(reward_config.retailer, db_session=db_session)
+
+    container_client.list_blobs.assert_called_once_with(
+        name_starts_with="test-retailer/rewards.update.", include=["tags"]
+    )
+    mock_blob_client.acquire_lease.assert_called_once()
+    mock_process_csv.assert_called_once()
+    assert mock_process_csv.call_args.kwargs["reward_file_log"].file_name == "test-retailer/rewards.update.new.csv"
+    mock_move_blob.assert_called_once()
+
+
 def test_process_blobs_filename_is_not_duplicate(setup: SetupType, mocker: MockerFixture) -> None:
     """A filename exists in the log, but the file agent type is different"""
     db_session, reward_config, _ = setup
@@ -864,6 +1500,55 @@ def test_move_blob(mocker: MockerFixture) -> None:
     mock_dst_blob_client.start_copy_from_url.assert_called_once_with("https://a-blob-url")
     mock_src_blob_client.delete_blob.assert_called_once()
 
+    reward_agent.move_blob("DESTINATION-CONTAINER", mock_src_blob_client, src_blob_lease_client)
+    blob_service_client.create_container.assert_called_once_with("DESTINATION-CONTAINER")
+
+
+def test_move_blob_tag_mode(mocker: MockerFixture) -> None:
+    MockBlobServiceClient = mocker.patch(  # noqa: N806
+        "carina.imports.agents.file_agent.BlobServiceClient", autospec=True
+    )
+    MockBlobServiceClient.from_connection_string.return_value = mocker.MagicMock(spec=BlobServiceClient)
+    mock_src_blob_client = mocker.MagicMock(spec=BlobClient)
+    src_blob_lease_client = mocker.MagicMock(spec=BlobLeaseClient)
+    mocker.patch.object(settings, "BLOB_IMPORT_STORAGE_MODE", "tag")
+
+    reward_agent = RewardUpdatesAgent()
+    blob_service_client = mocker.patch.object(reward_agent, "blob_service_client")
+
+    reward_agent.move_blob(settings.BLOB_ERROR_CONTAINER, mock_src_blob_client, src_blob_lease_client)
+    reward_agent.move_blob(settings.BLOB_ARCHIVE_CONTAINER, mock_src_blob_client, src_blob_lease_client)
+
+    assert mock_src_blob_client.set_blob_tags.call_args_list == [
+        mock.call({"carina_state": state, "carina_processed_at": mock.ANY}, lease=src_blob_lease_client)
+        for state in ("error", "archived")
+    ]
+    assert not blob_service_client.method_calls
+    mock_src_blob_client.delete_blob.assert_not_called()
+
+
+def test_updates_agent__group_blobs_in_upload_order(mocker: MockerFixture) -> None:
+    mocker.patch("carina.imports.agents.file_agent.BlobServiceClient")
+    blobs = [mocker.MagicMock(creation_time=datetime(2022, 9, 8, hour, tzinfo=timezone.utc)) for hour in (12, 10, 11)]
+    for blob, name in zip(blobs, ("a", "b", "c"), strict=True):
+        blob.name = f"test-retailer/rewards.update.{name}.csv"
+
+    assert RewardUpdatesAgent().group_blobs(blobs) == [[blobs[1]], [blobs[2]], [blobs[0]]]
+
+
+def test_updates_agent__process_blobs_stops_at_leased_blob(setup: SetupType, mocker: MockerFixture) -> None:
+    db_session, reward_config, _ = setup
+    mocker.patch("carina.imports.agents.file_agent.BlobServiceClient")
+    updates_agent = RewardUpdatesAgent()
+    blobs = [mocker.MagicMock(creation_time=datetime(2022, 9, 8, hour, tzinfo=timezone.utc)) for hour in (10, 11, 12)]
+    mocker.patch.object(updates_agent, "list_blobs", return_value=blobs)
+    # the second blob is leased by another process
+    mock_process_blob = mocker.patch.object(updates_agent, "process_blob", side_effect=[True, False, True])
+
+    updates_agent.process_blobs(reward_config.retailer, db_session)
+
+    assert [call.args[1] for call in mock_process_blob.call_args_list] == blobs[:2]
+
 
 def test_enqueue_reward_updates(
     setup: SetupType, mocker: MockerFixture, reward_status_adjustment_task_type: TaskType
@@ -876,13 +1561,9 @@ def test_enqueue_reward_updates(
     mock_redis = mocker.patch("carina.imports.agents.file_agent.redis_raw")
 
     today = datetime.now(tz=timezone.utc).date()
-    reward_update = RewardUpdate(
-        reward=reward,
-        date=today,
-        status=RewardUpdateStatuses.REDEEMED,
-    )
+    reward_update = RewardUpdateValues(reward_uuid=reward.id, date=today, status=RewardUpdateStatuses.REDEEMED)
 
-    RewardUpdatesAgent.enqueue_reward_updates(db_session, [reward_update])
+    RewardUpdatesAgent.enqueue_reward_updates(db_session, retailer_slug="test-retailer", reward_updates=[reward_update])
     mock_sync_create_many_tasks.assert_called_once_with(
         db_session,
         params_list=[
@@ -913,13 +1594,30 @@ def test_enqueue_reward_updates_exception(
     mock_enqueue_many_retry_tasks.side_effect = error
     today = datetime.now(tz=timezone.utc).date()
 
-    reward_update = RewardUpdate(
-        reward=reward,
-        date=today,
-        status=RewardUpdateStatuses.REDEEMED,
-    )
+    reward_update = RewardUpdateValues(reward_uuid=reward.id, date=today, status=RewardUpdateStatuses.REDEEMED)
 
-    RewardUpdatesAgent.enqueue_reward_updates(db_session, [reward_update])
+    RewardUpdatesAgent.enqueue_reward_updates(
+        db_session, retailer_slug="test-retailer", reward_updates=[reward_update, reward_update]
+    )
 
     mock_sentry_sdk.capture_exception.assert_called_once_with(error)
     assert db_session.execute(select(func.count()).select_from(RetryTask)).scalar_one() == 0
+
+
+def test_enqueue_reward_updates_in_chunks(
+    setup: SetupType, mocker: MockerFixture, reward_status_adjustment_task_type: TaskType
+) -> None:
+    db_session, _, reward = setup
+
+    mocker.patch.object(settings, "REWARD_STATUS_ADJUSTMENT_TASKS_CHUNK_SIZE", 2)
+    mock_enqueue_many_retry_tasks = mocker.patch("carina.imports.agents.file_agent.enqueue_many_retry_tasks")
+    today = datetime.now(tz=timezone.utc).date()
+    reward_updates = [
+        RewardUpdateValues(reward_uuid=reward.id, date=today, status=status)
+        for status in (RewardUpdateStatuses.ISSUED, RewardUpdateStatuses.REDEEMED, RewardUpdateStatuses.CANCELLED)
+    ]
+
+    RewardUpdatesAgent.enqueue_reward_updates(db_session, retailer_slug="test-retailer", reward_updates=reward_updates)
+
+    assert [len(call.kwargs["retry_tasks_ids"]) for call in mock_enqueue_many_retry_tasks.call_args_list] == [2, 1]
+    assert db_session.execute(select(func.count()).select_from(RetryTask)).scalar_one() == 3
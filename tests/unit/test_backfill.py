@@ -0,0 +1,13 @@
+from carina.imports.backfill import partition_codes
+
+
+def test_partition_codes() -> None:
+    row_nums_by_code = {f"CODE{i}": [i] for i in range(1, 101)}
+
+    partitions = partition_codes(row_nums_by_code, 4)
+
+    assert len(partitions) == 4
+    assert {code: row_nums for partition in partitions for code, row_nums in partition.items()} == row_nums_by_code
+    # a code repeated in a later batch is loaded by the same partition
+    partition = next(i for i, partition in enumerate(partitions) if "CODE1" in partition)
+    assert partition_codes({"CODE1": [200]}, 4)[partition] == {"CODE1": [200]}
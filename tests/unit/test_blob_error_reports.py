@@ -0,0 +1,81 @@
+from pathlib import Path
+
+from azure.core.exceptions import HttpResponseError
+from azure.storage.blob import BlobClient, BlobServiceClient
+from pytest_mock import MockerFixture
+
+from carina.core.config import settings
+from carina.imports.agents import error_reports
+from carina.imports.agents.error_reports import ErrorReason, ErrorReport
+
+
+def test_error_report(mocker: MockerFixture) -> None:
+    mocker.patch.object(error_reports, "REPORT_SPOOL_MAX_SIZE", 64)
+    mocker.patch.object(settings, "SENTRY_DSN", "SENTRY_DSN")
+    mock_sentry_sdk = mocker.patch.object(error_reports, "sentry_sdk")
+    mock_blob_service_client = mocker.MagicMock(spec=BlobServiceClient)
+    mock_report_blob_client = mocker.MagicMock(spec=BlobClient, url="https://a-report-url")
+    mock_blob_service_client.get_blob_client.return_value = mock_report_blob_client
+    uploaded: list[bytes] = []
+    mock_report_blob_client.upload_blob.side_effect = lambda data, **_: uploaded.append(data.read())
+
+    report = ErrorReport("test-retailer/rewards.update.test.csv")
+    for row_num in range(1, 11):
+        report.add(ErrorReason.UNKNOWN_CODE, row_num, code=f"CODE{row_num}", status="redeemed")
+    report.add(ErrorReason.INVALID_ROW, 11, detail="IndexError('list index out of range')")
+
+    report.send(mock_blob_service_client, "carina-archive", "2023/01/16/1200/test-retailer/rewards.update.test.csv")
+
+    mock_blob_service_client.get_blob_client.assert_called_once_with(
+        "carina-archive", "2023/01/16/1200/test-retailer/rewards.update.test.csv.errors.csv"
+    )
+    # the report is spilled to disk past its spool size and uploaded whole
+    assert uploaded == [report.getvalue().encode()]
+    lines = report.getvalue().splitlines()
+    assert lines[0] == "row_num,code,reason,status,detail"
+    assert lines[1] == "1,CODE1,unknown code,redeemed,"
+    assert lines[-1] == "11,,invalid row,,IndexError('list index out of range')"
+    mock_sentry_sdk.capture_message.assert_called_once_with(
+        "Problems found while processing test-retailer/rewards.update.test.csv (unknown code: 10, invalid row: 1), "
+        "report: https://a-report-url"
+    )
+
+
+def test_error_report_not_stored(mocker: MockerFixture) -> None:
+    mocker.patch.object(settings, "SENTRY_DSN", "SENTRY_DSN")
+    mock_sentry_sdk = mocker.patch.object(error_reports, "sentry_sdk")
+    mock_blob_service_client = mocker.MagicMock(spec=BlobServiceClient)
+    mock_blob_service_client.get_blob_client.return_value.upload_blob.side_effect = HttpResponseError("nope")
+
+    report = ErrorReport("test-retailer/rewards.import.test.csv")
+    report.add(ErrorReason.PRE_EXISTING_CODE, 1, code="CODE1")
+    report.send(mock_blob_service_client, "carina-archive", "test-retailer/rewards.import.test.csv")
+
+    mock_sentry_sdk.capture_message.assert_called_once_with(
+        "Problems found while processing test-retailer/rewards.import.test.csv (pre-existing code: 1), "
+        "report: not stored"
+    )
+
+
+def test_error_report_no_problems(mocker: MockerFixture) -> None:
+    mock_sentry_sdk = mocker.patch.object(error_reports, "sentry_sdk")
+    mock_blob_service_client = mocker.MagicMock(spec=BlobServiceClient)
+
+    ErrorReport("test-retailer/rewards.import.test.csv").send(
+        mock_blob_service_client, "carina-archive", "test-retailer/rewards.import.test.csv"
+    )
+
+    mock_blob_service_client.get_blob_client.assert_not_called()
+    mock_sentry_sdk.capture_message.assert_not_called()
+
+
+def test_error_report_save(tmp_path: Path) -> None:
+    report = ErrorReport("test-retailer/rewards.import.test.csv")
+    report.add(ErrorReason.PRE_EXISTING_CODE, 1, code="CODE1")
+    report_path = tmp_path / "rewards.import.test.csv.errors.csv"
+
+    report.save(report_path)
+    report.add(ErrorReason.PRE_EXISTING_CODE, 2, code="CODE2")
+
+    assert report_path.read_text().splitlines() == ["row_num,code,reason,status,detail", "1,CODE1,pre-existing code,,"]
+    assert report.getvalue().splitlines()[-1] == "2,CODE2,pre-existing code,,"
@@ -0,0 +1,138 @@
+import base64
+import json
+
+from unittest import mock
+
+import pytest
+
+from pytest_mock import MockerFixture
+
+from carina.imports.agents.blob_events import BlobCreatedEvent, BlobEventListener, parse_blob_created_event
+
+BLOB_CREATED_EVENT = {
+    "topic": "/subscriptions/id/resourceGroups/rg/providers/Microsoft.Storage/storageAccounts/account",
+    "subject": "/blobServices/default/containers/carina-imports/blobs/test-retailer/rewards.import.test.csv",
+    "eventType": "Microsoft.Storage.BlobCreated",
+    "data": {"api": "PutBlob", "contentLength": 1024},
+}
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        json.dumps(BLOB_CREATED_EVENT),
+        json.dumps([BLOB_CREATED_EVENT]),
+        base64.b64encode(json.dumps(BLOB_CREATED_EVENT).encode()).decode(),
+    ],
+)
+def test_parse_blob_created_event(content: str) -> None:
+    assert parse_blob_created_event(content) == BlobCreatedEvent(
+        container_name="carina-imports", blob_name="test-retailer/rewards.import.test.csv"
+    )
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "not an event",
+        json.dumps(BLOB_CREATED_EVENT | {"eventType": "Microsoft.Storage.BlobDeleted"}),
+        json.dumps(BLOB_CREATED_EVENT | {"subject": "/blobServices/default/containers/carina-imports"}),
+        json.dumps([BLOB_CREATED_EVENT, BLOB_CREATED_EVENT]),
+    ],
+)
+def test_parse_blob_created_event_other_messages(content: str) -> None:
+    assert parse_blob_created_event(content) is None
+
+
+def _agent(mocker: MockerFixture, blob_path_template: str) -> mock.MagicMock:
+    agent = mocker.MagicMock(container_name="carina-imports")
+    agent.blob_path_template.substitute.side_effect = lambda retailer_slug: blob_path_template.format(retailer_slug)
+    return agent
+
+
+def test_process_event_agent_matching(mocker: MockerFixture) -> None:
+    import_agent = _agent(mocker, "{}/rewards.import.")
+    updates_agent = _agent(mocker, "{}/rewards.update.")
+    listener = BlobEventListener([import_agent, updates_agent], queue_client=mocker.MagicMock())
+
+    assert listener._get_agent(BlobCreatedEvent("carina-imports", "test-retailer/rewards.update.test.csv")) == (
+        updates_agent,
+        "test-retailer",
+    )
+    assert listener._get_agent(BlobCreatedEvent("carina-imports", "test-retailer/rewards.import.test.csv")) == (
+        import_agent,
+        "test-retailer",
+    )
+    assert listener._get_agent(BlobCreatedEvent("carina-imports", "test-retailer/ERRORS/rewards.update.csv")) is None
+    assert listener._get_agent(BlobCreatedEvent("other-container", "test-retailer/rewards.update.test.csv")) is None
+    assert listener._get_agent(BlobCreatedEvent("carina-imports", "rewards.update.test.csv")) is None
+
+
+def test_handle_message(mocker: MockerFixture) -> None:
+    mock_queue_client = mocker.MagicMock()
+    listener = BlobEventListener([], queue_client=mock_queue_client)
+    mock_process_event = mocker.patch.object(listener, "process_event")
+    message = mocker.MagicMock(content=json.dumps(BLOB_CREATED_EVENT), dequeue_count=1)
+
+    listener.handle_message(message)
+
+    mock_process_event.assert_called_once_with(
+        BlobCreatedEvent(container_name="carina-imports", blob_name="test-retailer/rewards.import.test.csv")
+    )
+    mock_queue_client.delete_message.assert_called_once_with(message)
+
+
+def test_handle_message_other_message(mocker: MockerFixture) -> None:
+    mock_queue_client = mocker.MagicMock()
+    listener = BlobEventListener([], queue_client=mock_queue_client)
+    mock_process_event = mocker.patch.object(listener, "process_event")
+    message = mocker.MagicMock(content="not an event", dequeue_count=1)
+
+    listener.handle_message(message)
+
+    mock_process_event.assert_not_called()
+    mock_queue_client.delete_message.assert_called_once_with(message)
+
+
+@pytest.mark.parametrize(("dequeue_count", "deleted"), [(1, False), (5, True)])
+def test_handle_message_failure(mocker: MockerFixture, dequeue_count: int, deleted: bool) -> None:
+    mock_settings = mocker.patch("carina.imports.agents.blob_events.settings")
+    mock_settings.BLOB_IMPORT_EVENTS_MAX_DEQUEUE_COUNT = 5
+    mock_sentry = mocker.patch("carina.imports.agents.blob_events.sentry_sdk")
+    mock_queue_client = mocker.MagicMock()
+    listener = BlobEventListener([], queue_client=mock_queue_client)
+    error = ValueError("oops")
+    mocker.patch.object(listener, "process_event", side_effect=error)
+    message = mocker.MagicMock(content=json.dumps(BLOB_CREATED_EVENT), dequeue_count=dequeue_count)
+
+    listener.handle_message(message)
+
+    mock_sentry.capture_exception.assert_called_once_with(error)
+    assert mock_queue_client.delete_message.called is deleted
+
+
+def test_poll(mocker: MockerFixture) -> None:
+    mock_queue_client = mocker.MagicMock()
+    messages = [mocker.MagicMock(), mocker.MagicMock()]
+    mock_queue_client.receive_messages.return_value = iter(messages)
+    listener = BlobEventListener([], queue_client=mock_queue_client)
+    mock_handle_message = mocker.patch.object(listener, "handle_message")
+
+    assert listener.poll() == 2
+    assert mock_handle_message.call_args_list == [mock.call(message) for message in messages]
+
+
+@pytest.mark.parametrize("in_order", [True, False])
+def test_process_event_retailer_blobs_in_order(mocker: MockerFixture, in_order: bool) -> None:
+    mocker.patch("carina.imports.agents.blob_events.SyncSessionMaker")
+    agent = _agent(mocker, "{}/rewards.update.")
+    agent.process_retailer_blobs_in_order = in_order
+    listener = BlobEventListener([agent], queue_client=mocker.MagicMock())
+    retailer = mocker.MagicMock()
+    mocker.patch.object(listener, "_get_retailer", return_value=retailer)
+
+    listener.process_event(BlobCreatedEvent("carina-imports", "test-retailer/rewards.update.test.csv"))
+
+    # update files are applied in upload order, whichever blob the event is for
+    assert agent.process_blobs.called is in_order
+    assert agent.process_blob.called is not in_order
@@ -0,0 +1,38 @@
+import threading
+
+from azure.core.exceptions import HttpResponseError
+from azure.storage.blob import BlobLeaseClient
+from pytest_mock import MockerFixture
+
+from carina.imports.agents.leases import auto_renew_lease
+
+
+def test_auto_renew_lease(mocker: MockerFixture) -> None:
+    mock_lease = mocker.MagicMock(spec=BlobLeaseClient, id="lease-id")
+    renewed = threading.Event()
+    mock_lease.renew.side_effect = lambda: renewed.set()
+
+    with auto_renew_lease(mock_lease, interval=0.01):
+        assert renewed.wait(timeout=5)
+
+    call_count = mock_lease.renew.call_count
+    assert call_count >= 1
+    renewed.clear()
+    assert not renewed.wait(timeout=0.05)
+    assert mock_lease.renew.call_count == call_count
+
+
+def test_auto_renew_lease_renewal_failure(mocker: MockerFixture) -> None:
+    mock_lease = mocker.MagicMock(spec=BlobLeaseClient, id="lease-id")
+    failed = threading.Event()
+
+    def _renew() -> None:
+        failed.set()
+        raise HttpResponseError("lease expired")
+
+    mock_lease.renew.side_effect = _renew
+
+    with auto_renew_lease(mock_lease, interval=0.01):
+        assert failed.wait(timeout=5)
+
+    mock_lease.renew.assert_called_once_with()
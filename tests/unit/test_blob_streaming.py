@@ -0,0 +1,103 @@
+import gzip
+import hashlib
+
+import pytest
+import zstandard
+
+from carina.imports.agents.streaming import (
+    DecompressionError,
+    HashedChunks,
+    TrackedLines,
+    batched,
+    iter_decoded_lines,
+    iter_decompressed,
+    skip_bytes,
+)
+
+CONTENT = "".join(f"code{i},2021-07-30,redeemed\n" for i in range(1000)).encode()
+
+
+def _chunked(content: bytes, chunk_size: int) -> list[bytes]:
+    return [content[i : i + chunk_size] for i in range(0, len(content), chunk_size)]
+
+
+def test_iter_decoded_lines() -> None:
+    content = "code1\ncödé2\r\n\ncode3"
+    encoded = content.encode("utf-8")
+    for chunk_size in (1, 2, 3, 5, len(encoded)):
+        chunks = [encoded[i : i + chunk_size] for i in range(0, len(encoded), chunk_size)]
+        assert list(iter_decoded_lines(chunks)) == ["code1\n", "cödé2\r\n", "\n", "code3"]
+
+
+def test_iter_decoded_lines_invalid_bytes() -> None:
+    lines = iter_decoded_lines([b"code1\n", b"\xca,2021,09,13,cancelled\n"])
+
+    assert next(lines) == "code1\n"
+    with pytest.raises(UnicodeDecodeError):
+        next(lines)
+
+
+def test_iter_decoded_lines_truncated_character() -> None:
+    with pytest.raises(UnicodeDecodeError):
+        list(iter_decoded_lines(["cöde".encode()[:2]]))
+
+
+def test_batched() -> None:
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert not list(batched([], 2))
+
+
+def test_tracked_lines() -> None:
+    content = "code1\ncödé2\r\n\ncode3"
+    lines = TrackedLines(iter_decoded_lines([content.encode("utf-8")]), offset=10)
+
+    assert next(lines) == "code1\n"
+    assert lines.offset == 16
+    assert next(lines) == "cödé2\r\n"
+    assert lines.offset == 16 + len("cödé2\r\n".encode())
+    assert list(lines) == ["\n", "code3"]
+    assert lines.offset == 10 + len(content.encode())
+
+
+def test_iter_decompressed_gzip() -> None:
+    # concatenated gzip members are decompressed in turn, as by `gzip.decompress`
+    compressed = gzip.compress(CONTENT[:100]) + gzip.compress(CONTENT[100:])
+    for chunk_size in (1, 3, 1024, len(compressed)):
+        assert b"".join(iter_decompressed(_chunked(compressed, chunk_size))) == CONTENT
+
+
+def test_iter_decompressed_zstd() -> None:
+    compressor = zstandard.ZstdCompressor()
+    compressed = compressor.compress(CONTENT[:100]) + compressor.compress(CONTENT[100:])
+    for chunk_size in (1, 3, 1024, len(compressed)):
+        assert b"".join(iter_decompressed(_chunked(compressed, chunk_size))) == CONTENT
+
+
+def test_iter_decompressed_uncompressed() -> None:
+    chunks = _chunked(CONTENT, 1024)
+    assert list(iter_decompressed(chunks)) == chunks
+    assert not list(iter_decompressed([]))
+
+
+@pytest.mark.parametrize(
+    "compressed",
+    [gzip.compress(CONTENT)[:-8], b"\x1f\x8b" + CONTENT],
+    ids=["truncated", "corrupt"],
+)
+def test_iter_decompressed_invalid(compressed: bytes) -> None:
+    with pytest.raises(DecompressionError):
+        list(iter_decompressed(_chunked(compressed, 1024)))
+
+
+def test_skip_bytes() -> None:
+    assert b"".join(skip_bytes([b"code1\n", b"code2\n", b"code3"], 8)) == b"de2\ncode3"
+    assert list(skip_bytes([b"code1\n", b"code2\n"], 12)) == []
+
+
+def test_hashed_chunks() -> None:
+    chunks = HashedChunks(_chunked(CONTENT, 1024))
+
+    assert next(chunks) == CONTENT[:1024]
+    assert chunks.hexdigest() is None
+    assert b"".join(chunks) == CONTENT[1024:]
+    assert chunks.hexdigest() == hashlib.md5(CONTENT).hexdigest()  # noqa: S324
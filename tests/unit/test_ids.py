@@ -0,0 +1,35 @@
+import uuid
+
+from pytest_mock import MockerFixture
+
+from carina.core import ids
+from carina.core.ids import UUID7Generator
+
+
+def test_uuid7(mocker: MockerFixture) -> None:
+    mocker.patch.object(ids.time, "time_ns", return_value=1_700_000_000_123_456_789)
+    uuid7 = UUID7Generator()
+
+    generated = [uuid7() for _ in range(3)]
+
+    assert all(generated_uuid.version == 7 for generated_uuid in generated)
+    assert all(generated_uuid.variant == uuid.RFC_4122 for generated_uuid in generated)
+    assert all(generated_uuid.int >> 80 == 1_700_000_000_123 for generated_uuid in generated)
+    assert generated == sorted(generated)
+    assert len(set(generated)) == 3
+
+
+def test_uuid7_ordered_across_milliseconds(mocker: MockerFixture) -> None:
+    mock_time_ns = mocker.patch.object(ids.time, "time_ns", return_value=1_700_000_000_123_000_000)
+    mocker.patch.object(ids.secrets, "randbits", side_effect=lambda bits: (1 << bits) - 1)
+    uuid7 = UUID7Generator()
+
+    first = uuid7()
+    # the counter overflows into the next millisecond
+    overflowed = [uuid7() for _ in range(ids.COUNTER_MAX - (1 << ids.COUNTER_SEED_BITS) + 2)]
+    # the clock going back does not break the order
+    mock_time_ns.return_value -= 5_000_000
+    after_clock_change = uuid7()
+
+    assert overflowed[-1].int >> 80 == (first.int >> 80) + 1
+    assert [first, *overflowed, after_clock_change] == sorted([first, *overflowed, after_clock_change])
@@ -0,0 +1,69 @@
+import logging
+
+from prometheus_client import REGISTRY
+from pytest import LogCaptureFixture
+from pytest_mock import MockerFixture
+
+from carina.core.config import settings
+from carina.core.memory_profiling import memory_delta, memory_profiled, memory_snapshot
+from carina.tasks.prometheus import METRIC_NAME_PREFIX
+
+
+def test_memory_profiled(mocker: MockerFixture, caplog: LogCaptureFixture) -> None:
+    mocker.patch.object(settings, "MEMORY_PROFILING_ENABLED", True)
+    caplog.set_level(logging.INFO, logger="memory-profiling")
+
+    @memory_profiled("mock-job")
+    def mock_job() -> int:
+        with memory_snapshot("mock-inner-job"):
+            data = [str(i) * 10 for i in range(100_000)]
+
+        return len(data)
+
+    assert mock_job() == 100_000
+
+    labels = {"app": settings.PROJECT_NAME, "job_name": "mock-job"}
+    inner_labels = {"app": settings.PROJECT_NAME, "job_name": "mock-inner-job"}
+    traced_peak = REGISTRY.get_sample_value(f"{METRIC_NAME_PREFIX}job_traced_memory_peak_bytes", labels=labels)
+    inner_traced_peak = REGISTRY.get_sample_value(
+        f"{METRIC_NAME_PREFIX}job_traced_memory_peak_bytes", labels=inner_labels
+    )
+    assert inner_traced_peak > 1_000_000
+    assert traced_peak >= inner_traced_peak
+    assert REGISTRY.get_sample_value(f"{METRIC_NAME_PREFIX}job_peak_rss_bytes", labels=labels) > 0
+    assert "Top allocation sites for mock-job" in caplog.text
+
+
+def test_memory_profiled_disabled(mocker: MockerFixture) -> None:
+    mocker.patch.object(settings, "MEMORY_PROFILING_ENABLED", False)
+    mock_take_snapshot = mocker.patch("carina.core.memory_profiling.tracemalloc.take_snapshot")
+
+    @memory_profiled("mock-disabled-job")
+    def mock_job() -> str:
+        return "done"
+
+    assert mock_job() == "done"
+    mock_take_snapshot.assert_not_called()
+
+
+def test_memory_delta_keeps_enclosing_peaks(mocker: MockerFixture, caplog: LogCaptureFixture) -> None:
+    mocker.patch.object(settings, "MEMORY_PROFILING_ENABLED", True)
+    caplog.set_level(logging.INFO, logger="memory-profiling")
+
+    with memory_snapshot("mock-run"):
+        with memory_delta("mock-blob"):
+            data = [str(i) * 10 for i in range(100_000)]
+
+        del data
+        with memory_delta("mock-other-blob"):
+            pass
+
+    labels = {"app": settings.PROJECT_NAME, "job_name": "mock-run"}
+    blob_labels = {"app": settings.PROJECT_NAME, "job_name": "mock-blob"}
+    assert REGISTRY.get_sample_value(f"{METRIC_NAME_PREFIX}job_traced_memory_peak_bytes", labels=labels) > 1_000_000
+    assert (
+        REGISTRY.get_sample_value(f"{METRIC_NAME_PREFIX}job_approximate_traced_memory_delta_bytes", labels=blob_labels)
+        > 1_000_000
+    )
+    assert "mock-blob took" in caplog.text
+    assert "approximate traced memory delta" in caplog.text
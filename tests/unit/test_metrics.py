@@ -1,9 +1,19 @@
+import itertools
 import random
 
-from prometheus_client import REGISTRY
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from prometheus_client import REGISTRY, Gauge
+from pytest_mock import MockerFixture
 
 from carina.core.config import settings
+from carina.enums import FileAgentType
+from carina.imports.agents import metrics as blob_metrics
+from carina.scheduled_tasks.queue_age import report_oldest_job_age
 from carina.tasks.prometheus import METRIC_NAME_PREFIX, task_processing_time_callback_fn
+from carina.tasks.queue_latency import track_queue_latency
+from carina.tasks.stage_timing import add_stage_timings_to_audit, stage, track_stages
 
 
 def test_metrics_callback_fn_multiple_metrics() -> None:
@@ -24,3 +34,148 @@ def test_metrics_callback_fn_multiple_metrics() -> None:
 
     assert metric_count == num_of_metrics
     assert metric_value == sum(mock_task_processing_times)
+
+
+def test_track_stages_metrics_and_audit(mocker: MockerFixture, run_task_with_metrics: None) -> None:
+    metric_name = f"{METRIC_NAME_PREFIX}tasks_stage_processing_time"
+    mock_task_name = "mock-stages-task-name"
+    mocker.patch.object(settings, "TASK_STAGE_TIMINGS_AUDIT_SAMPLE_RATE", 1.0)
+
+    @track_stages(mock_task_name)
+    def mock_task() -> dict:
+        with stage("first"):
+            pass
+        with stage("second"):
+            pass
+        with stage("first"):
+            pass
+
+        return add_stage_timings_to_audit({"timestamp": "now"})
+
+    response_audit = mock_task()
+
+    assert response_audit["timestamp"] == "now"
+    assert set(response_audit["stage_timings"]) == {"first", "second"}
+    for stage_name, count in (("first", 2), ("second", 1)):
+        metric_labels = {"app": settings.PROJECT_NAME, "task_name": mock_task_name, "stage": stage_name}
+        assert REGISTRY.get_sample_value(name=f"{metric_name}_count", labels=metric_labels) == count
+
+
+def test_track_stages_not_sampled(mocker: MockerFixture) -> None:
+    mocker.patch.object(settings, "TASK_STAGE_TIMINGS_AUDIT_SAMPLE_RATE", 0.0)
+
+    @track_stages("mock-task-name")
+    def mock_task() -> dict:
+        with stage("first"):
+            pass
+
+        return add_stage_timings_to_audit({})
+
+    assert mock_task() == {}
+    # stages outside of a tracked task are a no-op
+    with stage("untracked"):
+        pass
+
+    assert add_stage_timings_to_audit({}) == {}
+
+
+def test_track_queue_latency(mocker: MockerFixture, run_task_with_metrics: None) -> None:
+    now = datetime.now(tz=timezone.utc).replace(tzinfo=None)
+    mock_job = mock.MagicMock(origin="mock-queue", enqueued_at=now - timedelta(seconds=30), started_at=now)
+    mocker.patch("carina.tasks.queue_latency.get_current_job", return_value=mock_job)
+
+    @track_queue_latency("mock-latency-task-name")
+    def mock_task() -> str:
+        return "done"
+
+    assert mock_task() == "done"
+
+    metric_labels = {"app": settings.PROJECT_NAME, "queue_name": "mock-queue", "task_name": "mock-latency-task-name"}
+    wait_time = REGISTRY.get_sample_value(name=f"{METRIC_NAME_PREFIX}tasks_queue_wait_time_sum", labels=metric_labels)
+    assert wait_time == 30
+    assert REGISTRY.get_sample_value(name=f"{METRIC_NAME_PREFIX}tasks_run_time_count", labels=metric_labels) == 1
+
+
+def test_track_queue_latency_outside_of_a_job(mocker: MockerFixture, run_task_with_metrics: None) -> None:
+    mocker.patch("carina.tasks.queue_latency.get_current_job", return_value=None)
+    mock_histogram = mocker.patch("carina.tasks.queue_latency.tasks_run_time_histogram")
+
+    @track_queue_latency("mock-task-name")
+    def mock_task() -> str:
+        return "done"
+
+    assert mock_task() == "done"
+    mock_histogram.labels.assert_not_called()
+
+
+def test_report_oldest_job_age(mocker: MockerFixture) -> None:
+    now = datetime.now(tz=timezone.utc).replace(tzinfo=None)
+    mock_queue_cls = mocker.patch("carina.scheduled_tasks.queue_age.Queue")
+    mock_queue_cls.side_effect = lambda queue_name, **_: mock.MagicMock(
+        get_jobs=mock.MagicMock(
+            return_value=[mock.MagicMock(enqueued_at=now - timedelta(minutes=5))] if queue_name == "busy" else []
+        )
+    )
+    gauge = Gauge("test_job_queue_oldest_job_age", "test", labelnames=("app", "queue_name"), registry=None)
+
+    report_oldest_job_age(mock.MagicMock(), "carina", ["busy", "empty"], gauge)
+
+    assert gauge.labels(app="carina", queue_name="busy")._value.get() >= 300
+    assert gauge.labels(app="carina", queue_name="empty")._value.get() == 0
+
+
+def test_track_blob_metrics(mocker: MockerFixture) -> None:
+    # stages are timed exclusively of the stages nested in them
+    mocker.patch.object(blob_metrics.time, "perf_counter", side_effect=itertools.count())
+    labels = {"app": settings.PROJECT_NAME, "agent_type": "import", "retailer_slug": "metrics-retailer"}
+
+    with blob_metrics.track_blob_metrics(FileAgentType.IMPORT, "metrics-retailer") as tracked:
+        for chunk in blob_metrics.timed_iter(blob_metrics.timed_download([b"abc", b"de"]), "parse"):
+            assert chunk
+            blob_metrics.count_rows("parsed", 2)
+        blob_metrics.count_rows("invalid", 0)
+        blob_metrics.count_blob("archived")
+
+    # each chunk read, and the end of the chunks, takes a second of parsing around a second of downloading
+    assert tracked.durations == {"parse": 6, "download": 3}
+    for stage_name, duration in tracked.durations.items():
+        metric_name = f"{METRIC_NAME_PREFIX}blob_import_stage_duration"
+        assert REGISTRY.get_sample_value(f"{metric_name}_sum", labels=labels | {"stage": stage_name}) == duration
+
+    assert REGISTRY.get_sample_value(f"{METRIC_NAME_PREFIX}blob_import_downloaded_bytes_total", labels=labels) == 5
+    assert (
+        REGISTRY.get_sample_value(f"{METRIC_NAME_PREFIX}blob_import_rows_total", labels=labels | {"result": "parsed"})
+        == 4
+    )
+    assert (
+        REGISTRY.get_sample_value(f"{METRIC_NAME_PREFIX}blob_import_rows_total", labels=labels | {"result": "invalid"})
+        is None
+    )
+    assert (
+        REGISTRY.get_sample_value(
+            f"{METRIC_NAME_PREFIX}blob_import_blobs_total", labels=labels | {"outcome": "archived"}
+        )
+        == 1
+    )
+
+
+def test_blob_metrics_outside_of_a_tracked_blob(mocker: MockerFixture) -> None:
+    mock_rows_total = mocker.patch.object(blob_metrics, "blob_import_rows_total")
+    mock_blobs_total = mocker.patch.object(blob_metrics, "blob_import_blobs_total")
+
+    with blob_metrics.stage("untracked"):
+        blob_metrics.count_rows("parsed", 1)
+        blob_metrics.count_blob("archived")
+    assert list(blob_metrics.timed_download([b"abc"])) == [b"abc"]
+    mock_rows_total.labels.assert_not_called()
+    mock_blobs_total.labels.assert_not_called()
+
+    # listing is counted regardless
+    assert list(blob_metrics.count_listed_blobs(["blob1", "blob2"], FileAgentType.UPDATE, "metrics-retailer")) == [
+        "blob1",
+        "blob2",
+    ]
+    mock_blobs_total.labels.assert_called_once_with(
+        app=settings.PROJECT_NAME, agent_type="update", retailer_slug="metrics-retailer", outcome="listed"
+    )
+    assert mock_blobs_total.labels.return_value.inc.call_count == 2
@@ -0,0 +1,58 @@
+import threading
+import time
+
+from pathlib import Path
+
+from pytest_mock import MockerFixture
+
+from carina.core.config import settings
+from carina.core.profiling import SamplingProfiler
+
+
+def _wait_for(event: threading.Event) -> None:
+    event.wait(timeout=5)
+
+
+def test_sample_labelled_threads_and_flush(mocker: MockerFixture, tmp_path: Path) -> None:
+    mocker.patch.object(settings, "PROFILER_OUTPUT_DIR", str(tmp_path))
+    profiler = SamplingProfiler()
+    profiler.process_name = "test"
+    profiler.enabled = True
+    profiler.register_code_label(_wait_for, "GET /test")
+    started, done = threading.Event(), threading.Event()
+
+    def labelled_job() -> None:
+        with profiler.label_thread("mock-queue:mock_job"):
+            started.set()
+            done.wait(timeout=5)
+
+    threads = [threading.Thread(target=labelled_job), threading.Thread(target=_wait_for, args=(done,))]
+    for thread in threads:
+        thread.start()
+
+    started.wait(timeout=5)
+    for _ in range(100):
+        profiler.sample()
+        if len({stack.split(";")[1] for stack in profiler._stacks}) == 2:
+            break
+        time.sleep(0.01)
+
+    done.set()
+    for thread in threads:
+        thread.join()
+
+    profiler.flush()
+    lines = (tmp_path / "test.folded").read_text().splitlines()
+    labels = {line.split(";")[1] for line in lines}
+    assert labels == {"mock-queue:mock_job", "GET /test"}
+    assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines)
+    assert not profiler.thread_labels
+
+
+def test_label_thread_disabled() -> None:
+    profiler = SamplingProfiler()
+
+    with profiler.label_thread("mock-label"):
+        assert not profiler.thread_labels
+
+    profiler.flush()
@@ -0,0 +1,42 @@
+from datetime import date
+
+from carina.enums import RewardUpdateStatuses
+from carina.imports.agents.update_parser import RewardUpdateData, RewardUpdateRow, parse_reward_update_rows
+
+
+def test_parse_reward_update_rows() -> None:
+    rows = [
+        (1, ["TEST12345678", "2021-07-30", "cancelled"]),
+        (2, [" TEST87654321 ", " 2021-07-21 ", " REDEEMED "]),
+        (3, ["TEST12345678", "2021-07-30", "redeemed"]),
+    ]
+
+    reward_update_rows_by_code, invalid_rows = parse_reward_update_rows(rows)
+
+    assert not invalid_rows
+    assert reward_update_rows_by_code == {
+        "TEST12345678": [
+            RewardUpdateRow(RewardUpdateData("TEST12345678", date(2021, 7, 30), RewardUpdateStatuses.CANCELLED), 1),
+            RewardUpdateRow(RewardUpdateData("TEST12345678", date(2021, 7, 30), RewardUpdateStatuses.REDEEMED), 3),
+        ],
+        "TEST87654321": [
+            RewardUpdateRow(RewardUpdateData("TEST87654321", date(2021, 7, 21), RewardUpdateStatuses.REDEEMED), 2),
+        ],
+    }
+
+
+def test_parse_reward_update_rows_invalid_rows() -> None:
+    rows = [
+        (1, ["TEST12345678", "20210830", "redeemed"]),
+        (2, ["TEST87654321", "2021-07-30", "nosuchstatus"]),
+        (3, ["TEST87654322", "2021-07-30"]),
+        (4, ["TEST87654323", "2021-07-30", "issued"]),
+    ]
+
+    reward_update_rows_by_code, invalid_rows = parse_reward_update_rows(rows)
+
+    assert list(reward_update_rows_by_code) == ["TEST87654323"]
+    assert [row_num for row_num, _ in invalid_rows] == [1, 2, 3]
+    assert "time data '20210830' does not match format '%Y-%m-%d'" in repr(invalid_rows[0][1])
+    assert "'nosuchstatus' is not a valid RewardUpdateStatuses" in repr(invalid_rows[1][1])
+    assert repr(invalid_rows[2][1]) == "IndexError('list index out of range')"
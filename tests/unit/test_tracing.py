@@ -0,0 +1,87 @@
+from collections.abc import Generator
+from typing import TYPE_CHECKING
+
+import pytest
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import SpanKind
+from pytest_mock import MockerFixture
+
+from carina.core import tracing
+from carina.core.config import settings
+from carina.core.tracing import TRACEPARENT_TASK_PARAM, current_traceparent, flush_spans, setup_tracing, traced_task
+
+if TYPE_CHECKING:
+    from retry_tasks_lib.db.models import RetryTask
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+SPAN_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture()
+def span_exporter(mocker: MockerFixture) -> Generator[InMemorySpanExporter, None, None]:
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    mocker.patch.object(tracing, "tracer", provider.get_tracer("test"))
+    mocker.patch.object(settings, "TRACING_ENABLED", True)
+    yield exporter
+    provider.shutdown()
+
+
+def test_setup_tracing_disabled(mocker: MockerFixture) -> None:
+    mocker.patch.object(settings, "TRACING_ENABLED", False)
+    mock_set_tracer_provider = mocker.patch("carina.core.tracing.trace.set_tracer_provider")
+
+    setup_tracing()
+
+    mock_set_tracer_provider.assert_not_called()
+    assert current_traceparent() is None
+
+
+def test_traced_task_continues_trace_from_task_params(
+    mocker: MockerFixture, span_exporter: InMemorySpanExporter
+) -> None:
+    retry_task = mocker.MagicMock(retry_task_id=1, attempts=2)
+    retry_task.get_params.return_value = {TRACEPARENT_TASK_PARAM: f"00-{TRACE_ID}-{SPAN_ID}-01"}
+    traceparents: list[str | None] = []
+
+    @traced_task("test-task")
+    def task(retry_task: "RetryTask", db_session: None) -> None:
+        traceparents.append(current_traceparent())
+
+    task(retry_task, None)
+
+    (span,) = span_exporter.get_finished_spans()
+    assert span.name == "test-task"
+    assert span.kind == SpanKind.CONSUMER
+    assert span.context.trace_id == int(TRACE_ID, 16)
+    assert span.parent is not None
+    assert span.parent.span_id == int(SPAN_ID, 16)
+    assert span.attributes == {"retry_task_id": 1, "attempts": 2}
+    assert traceparents == [f"00-{TRACE_ID}-{span.context.span_id:016x}-01"]
+
+
+def test_traced_task_tracing_disabled(mocker: MockerFixture, span_exporter: InMemorySpanExporter) -> None:
+    mocker.patch.object(settings, "TRACING_ENABLED", False)
+    retry_task = mocker.MagicMock()
+
+    @traced_task("test-task")
+    def task(retry_task: "RetryTask", db_session: None) -> str:
+        return "done"
+
+    assert task(retry_task, None) == "done"
+    assert span_exporter.get_finished_spans() == ()
+    retry_task.get_params.assert_not_called()
+
+
+def test_flush_spans_is_bounded(mocker: MockerFixture) -> None:
+    mocker.patch.object(settings, "TRACING_FLUSH_TIMEOUT_SECONDS", 1.5)
+    provider = mocker.MagicMock(spec=TracerProvider)
+    mocker.patch("carina.core.tracing.trace.get_tracer_provider", return_value=provider)
+
+    flush_spans()
+
+    provider.force_flush.assert_called_once_with(timeout_millis=1500)